@@ -0,0 +1,363 @@
+import collections
+import hashlib
+import json
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+
+def erro_transitorio(erro):
+    """
+    Indica se vale tentar a chamada de novo: cota excedida (429), erro do servidor (5xx)
+    ou falha de rede. Erros da API do Google trazem o status HTTP em `code`.
+    """
+    for atributo in ("code", "status_code"):
+        codigo = getattr(erro, atributo, None)
+        if isinstance(codigo, int):
+            return codigo == 429 or 500 <= codigo < 600
+    return isinstance(erro, (TimeoutError, ConnectionError))
+
+
+class BaldeTokens:
+    """
+    Limitador de taxa por balde de tokens: `taxa` chamadas por segundo em média,
+    com rajadas de até `capacidade` chamadas seguidas.
+    """
+
+    def __init__(self, taxa, capacidade):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self._tokens = capacidade
+        self._atualizado_em = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consumir(self):
+        """
+        Retira um token, esperando o tempo necessário para que ele exista.
+        """
+        with self._lock:
+            agora = time.monotonic()
+            self._tokens = min(self.capacidade, self._tokens + (agora - self._atualizado_em) * self.taxa)
+            self._atualizado_em = agora
+            # O token é reservado já (o saldo pode ficar negativo), então quem chega depois espera mais
+            self._tokens -= 1
+            espera = -self._tokens / self.taxa if self._tokens < 0 else 0
+        if espera > 0:
+            time.sleep(espera)
+
+
+_FIM_DO_FLUXO = object()
+
+# Prioridades das chamadas: a pergunta que o analista está vendo passa à frente da pré-busca,
+# e a pré-busca passa à frente das perguntas especulativas (que podem nem ser feitas)
+PRIORIDADE_ATUAL = 0
+PRIORIDADE_PRE_BUSCA = 1
+PRIORIDADE_ESPECULATIVA = 2
+
+
+def encadear(futuro, transformar, resultado=None):
+    """
+    Retorna um Future com `transformar(resultado)` do `futuro`, ou a sua exceção.
+    Cancelar o Future retornado cancela o `futuro`, se ele ainda estiver na fila.
+    Com `resultado`, o valor vai para esse Future (já entregue a quem espera) em vez de um novo.
+    """
+    resultado = Future() if resultado is None else resultado
+
+    def repassar_resultado(origem):
+        if origem.cancelled():
+            resultado.cancel()
+            return
+        try:
+            valor = transformar(origem.result())
+        except BaseException as e:
+            if not resultado.done():
+                resultado.set_exception(e)
+            return
+        if not resultado.done(): # Quem pediu pode ter cancelado enquanto a chamada rodava
+            resultado.set_result(valor)
+
+    def repassar_cancelamento(destino):
+        if destino.cancelled():
+            futuro.cancel()
+
+    resultado.add_done_callback(repassar_cancelamento)
+    futuro.add_done_callback(repassar_resultado)
+    return resultado
+
+
+class _Pedido:
+    __slots__ = ("chave", "historico", "esquema_json", "prioridade", "futuros", "iniciado", "partes", "cancelado")
+
+    def __init__(self, chave, historico, esquema_json, prioridade, fluxo=False):
+        self.chave = chave
+        self.historico = historico
+        self.esquema_json = esquema_json
+        self.prioridade = prioridade
+        self.futuros = [] # Um Future por quem pediu (várias sessões podem pedir a mesma chamada)
+        self.iniciado = False # Retirado da fila por uma thread (ou descartado por estar cancelado)
+        # No modo streaming as partes da resposta passam por esta fila até quem pediu
+        self.partes = queue.Queue() if fluxo else None
+        self.cancelado = threading.Event()
+
+
+class AgendadorLLM:
+    """
+    Cliente do modelo de linguagem compartilhado por todas as sessões do processo.
+    As chamadas entram em filas por prioridade e, dentro de cada prioridade, por sessão,
+    atendidas em rodízio (uma sessão com muitas perguntas na pré-busca não atrasa as demais,
+    e a pergunta atual de qualquer sessão passa à frente das pré-buscas). São enviadas por no
+    máximo `max_em_voo` threads, dentro do limite de `requisicoes_por_minuto` do balde de tokens.
+    Erros transitórios (429, 5xx) são repetidos com espera exponencial e jitter, e a
+    mesma requisição pedida por várias sessões ao mesmo tempo vira uma única chamada.
+    `enviar` não bloqueia: retorna um Future, e cancelá-lo retira o pedido da fila se ninguém
+    mais o aguarda. Tem a mesma interface dos backends (`nome_modelo`, `gerar` e `gerar_fluxo`).
+    """
+
+    def __init__(self, backend, requisicoes_por_minuto=60, rajada=10, max_em_voo=4,
+                 max_tentativas=5, espera_inicial=1.0, espera_maxima=30.0, metricas=None):
+        self.backend = backend
+        self.metricas = metricas # RegistroMetricas opcional: latência das chamadas, erros e novas tentativas
+        self.nome_modelo = backend.nome_modelo
+        self.max_tentativas = max_tentativas
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self._balde = BaldeTokens(requisicoes_por_minuto / 60.0, rajada)
+        # Uma fila de rodízio por prioridade: sessão -> deque de pedidos
+        self._filas = [collections.OrderedDict() for _ in range(PRIORIDADE_ESPECULATIVA + 1)]
+        self._pendentes = {} # chave da requisição -> pedido na fila ou em andamento
+        self._condicao = threading.Condition()
+        self._encerrado = False
+        self._threads = [
+            threading.Thread(target=self._trabalhar, name=f"agendador_llm_{numero}", daemon=True)
+            for numero in range(max_em_voo)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def para_sessao(self, sessao):
+        """
+        Visão do agendador com a interface de backend, cujas chamadas entram na fila da sessão.
+        """
+        return BackendSessao(self, sessao)
+
+    def enviar(self, historico, esquema_json=None, sessao=None, prioridade=PRIORIDADE_ATUAL):
+        """
+        Enfileira a chamada na fila da sessão e retorna um Future com a resposta, sem esperar.
+        O Future termina com a exceção do backend se a chamada falhar (após as novas tentativas,
+        se transitória). Pedir de novo uma chamada ainda na fila com prioridade maior a adianta.
+        """
+        chave = hashlib.sha256(json.dumps([historico, esquema_json], sort_keys=True).encode("utf-8")).hexdigest()
+        futuro = Future()
+        with self._condicao:
+            if self._encerrado:
+                raise RuntimeError("O agendador foi encerrado")
+            pedido = self._pendentes.get(chave)
+            if pedido is None:
+                pedido = _Pedido(chave, historico, esquema_json, prioridade)
+                self._pendentes[chave] = pedido
+                self._enfileirar(pedido, sessao)
+            elif pedido.iniciado:
+                futuro.set_running_or_notify_cancel() # A chamada já está em andamento
+            elif prioridade < pedido.prioridade:
+                # Entra também na fila mais prioritária; a entrada antiga é ignorada quando sair
+                pedido.prioridade = prioridade
+                self._enfileirar(pedido, sessao)
+            pedido.futuros.append(futuro)
+        return futuro
+
+    def gerar(self, historico, esquema_json=None, sessao=None):
+        """
+        Como `enviar`, com a prioridade da pergunta atual, mas espera pela resposta.
+        Levanta a exceção do backend se a chamada falhar.
+        """
+        return self.enviar(historico, esquema_json=esquema_json, sessao=sessao).result()
+
+    def gerar_fluxo(self, historico, sessao=None):
+        """
+        Como `gerar`, mas retorna as partes da resposta à medida que chegam. A chamada passa
+        pela mesma fila, limite de taxa e limite de chamadas simultâneas, e só é repetida se
+        o erro transitório vier antes da primeira parte. Fechar o gerador cancela a geração.
+        """
+        pedido = _Pedido(None, historico, None, PRIORIDADE_ATUAL, fluxo=True) # Fluxos não são compartilhados
+        with self._condicao:
+            if self._encerrado:
+                raise RuntimeError("O agendador foi encerrado")
+            self._enfileirar(pedido, sessao)
+        try:
+            while True:
+                parte = pedido.partes.get()
+                if parte is _FIM_DO_FLUXO:
+                    break
+                if isinstance(parte, BaseException):
+                    raise parte
+                yield parte
+        finally:
+            pedido.cancelado.set()
+
+    def _enfileirar(self, pedido, sessao):
+        # Chamado com self._condicao adquirida
+        self._filas[pedido.prioridade].setdefault(sessao, collections.deque()).append(pedido)
+        self._condicao.notify()
+
+    def _proximo(self):
+        """
+        Próximo pedido a executar: a maior prioridade com pedidos, em rodízio entre as sessões.
+        Pedidos cancelados são descartados aqui. Retorna None quando o agendador é encerrado.
+        """
+        with self._condicao:
+            while True:
+                if self._encerrado:
+                    return None
+                for filas in self._filas:
+                    while filas:
+                        sessao, fila = next(iter(filas.items()))
+                        pedido = fila.popleft()
+                        if fila:
+                            filas.move_to_end(sessao) # A sessão volta para o fim do rodízio
+                        else:
+                            del filas[sessao]
+                        if self._iniciar(pedido):
+                            return pedido
+                self._condicao.wait()
+
+    def _iniciar(self, pedido):
+        # Chamado com self._condicao adquirida. Retorna False se o pedido não deve ser executado.
+        if pedido.iniciado:
+            return False # Já saiu por outra fila (a prioridade foi aumentada depois de enfileirado)
+        pedido.iniciado = True
+        if pedido.partes is not None:
+            return not pedido.cancelado.is_set() # Fluxo fechado antes de começar
+        # Só os futuros não cancelados continuam esperando; sem nenhum, a chamada não é feita
+        pedido.futuros = [futuro for futuro in pedido.futuros if futuro.set_running_or_notify_cancel()]
+        if pedido.futuros:
+            return True
+        del self._pendentes[pedido.chave]
+        if self.metricas is not None:
+            self.metricas.incrementar("sbmn_llm_canceladas_total")
+        return False
+
+    def _trabalhar(self):
+        while True:
+            pedido = self._proximo()
+            if pedido is None:
+                return
+            if pedido.partes is not None:
+                self._transmitir(pedido)
+                continue
+            try:
+                resposta, erro = self._chamar(pedido), None
+            except BaseException as e:
+                resposta, erro = None, e
+            with self._condicao:
+                # Depois de sair de _pendentes ninguém mais se junta a este pedido
+                del self._pendentes[pedido.chave]
+                futuros = pedido.futuros
+            for futuro in futuros:
+                if erro is None:
+                    futuro.set_result(resposta)
+                else:
+                    futuro.set_exception(erro)
+
+    def encerrar(self):
+        """
+        Encerra o agendador: cancela os pedidos ainda na fila, espera as chamadas em
+        andamento terminarem e as threads saírem. Novos pedidos levantam RuntimeError.
+        """
+        descartados = []
+        with self._condicao:
+            self._encerrado = True
+            for filas in self._filas:
+                for fila in filas.values():
+                    for pedido in fila:
+                        if not pedido.iniciado:
+                            pedido.iniciado = True
+                            descartados.append(pedido)
+                filas.clear()
+            for pedido in descartados:
+                if pedido.chave is not None:
+                    del self._pendentes[pedido.chave]
+            self._condicao.notify_all()
+        # Fora do lock: cancelar chama os callbacks de quem pediu
+        for pedido in descartados:
+            if pedido.partes is not None:
+                pedido.partes.put(RuntimeError("O agendador foi encerrado"))
+            for futuro in pedido.futuros:
+                futuro.cancel()
+        for thread in self._threads:
+            thread.join()
+
+    def _transmitir(self, pedido):
+        tentativa = 0
+        while not pedido.cancelado.is_set():
+            self._balde.consumir()
+            inicio = time.perf_counter()
+            recebeu = False
+            try:
+                partes = self.backend.gerar_fluxo(pedido.historico)
+                try:
+                    for parte in partes:
+                        recebeu = True
+                        pedido.partes.put(parte)
+                        if pedido.cancelado.is_set():
+                            break # Quem pediu já tem a resposta: o resto da geração é descartado
+                finally:
+                    partes.close()
+                self._medir(inicio, "ok", modo="streaming")
+                break
+            except Exception as e:
+                self._medir(inicio, "erro", modo="streaming")
+                tentativa += 1
+                if recebeu or tentativa >= self.max_tentativas or not erro_transitorio(e):
+                    pedido.partes.put(e)
+                    return
+                if self.metricas is not None:
+                    self.metricas.incrementar("sbmn_llm_novas_tentativas_total")
+                time.sleep(random.uniform(0, min(self.espera_maxima, self.espera_inicial * 2 ** tentativa)))
+        pedido.partes.put(_FIM_DO_FLUXO)
+
+    def _chamar(self, pedido):
+        tentativa = 0
+        while True:
+            self._balde.consumir() # Cada tentativa conta para a cota
+            inicio = time.perf_counter()
+            try:
+                resposta = self.backend.gerar(pedido.historico, esquema_json=pedido.esquema_json)
+                self._medir(inicio, "ok")
+                return resposta
+            except Exception as e:
+                self._medir(inicio, "erro")
+                tentativa += 1
+                if tentativa >= self.max_tentativas or not erro_transitorio(e):
+                    raise
+                if self.metricas is not None:
+                    self.metricas.incrementar("sbmn_llm_novas_tentativas_total")
+                # Espera exponencial com jitter completo, para as sessões não tentarem todas juntas
+                time.sleep(random.uniform(0, min(self.espera_maxima, self.espera_inicial * 2 ** tentativa)))
+
+    def _medir(self, inicio, resultado, modo="completo"):
+        if self.metricas is not None:
+            self.metricas.observar("sbmn_llm_chamada_segundos", time.perf_counter() - inicio,
+                                   resultado=resultado, modo=modo)
+
+
+
+class BackendSessao:
+    """
+    Backend de uma sessão: repassa as chamadas ao agendador compartilhado, na fila da sessão.
+    """
+
+    def __init__(self, agendador, sessao):
+        self.agendador = agendador
+        self.sessao = sessao
+        self.nome_modelo = agendador.nome_modelo
+
+    def enviar(self, historico, esquema_json=None, prioridade=PRIORIDADE_ATUAL):
+        return self.agendador.enviar(historico, esquema_json=esquema_json, sessao=self.sessao, prioridade=prioridade)
+
+    def gerar(self, historico, esquema_json=None):
+        return self.agendador.gerar(historico, esquema_json=esquema_json, sessao=self.sessao)
+
+    def gerar_fluxo(self, historico):
+        return self.agendador.gerar_fluxo(historico, sessao=self.sessao)
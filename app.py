@@ -1,12 +1,83 @@
 import streamlit as st
-import google.generativeai as genai
-import itertools # Para gerar pares de AFOs
 import json # Para salvar e carregar o estado, se necessário
+import os
+import tempfile
+import time
+import uuid
+import functools
+import math
+import motor_sbmn # Motor da entrevista (perguntas, máquina de estados, especialista IA)
+from cache_respostas import CacheRespostas # Cache das respostas da IA (memória + disco)
+from pre_busca import PreBuscaPerguntas # Pré-busca das próximas perguntas em segundo plano
+from repositorio_relacoes import RepositorioRelacoes # Relações SBMN com índices por par e por tipo
+from inconsistencias import DetectorInconsistencias # Detector incremental de inconsistências SBMN
+from inferencia import MotorInferencia # Regras que deduzem respostas já determinadas
+from persistencia import DiarioEntrevista # Diário e snapshots para retomar entrevistas
+from agendador_llm import AgendadorLLM # Limite de taxa, novas tentativas e filas por sessão para o Gemini
+import tabela_relacoes # Tabela paginada e exportação do modelo na fase de encerramento
+from metricas import RegistroMetricas, servir_metricas # Latências, tokens, cache e custo dos reruns
+from base_conhecimento import BaseConhecimento # Respostas validadas em entrevistas anteriores do mesmo domínio
 
 # --- Configuração da API Gemini ---
+MODELO_GEMINI = 'gemini-2.0-flash'
+
+# --- Métricas de Desempenho ---
+# Registro único por processo, somando as sessões. Com METRICAS_PORTA nos secrets, também
+# fica disponível em http://<endereço>:<porta>/metrics (Prometheus) e /metrics.jsonl; o endereço
+# padrão só aceita conexões locais (METRICAS_ENDERECO = "0.0.0.0" expõe para a rede).
+# Limpar o cache cria um registro novo, que passa a ser servido pelo mesmo servidor HTTP.
+@st.cache_resource
+def obter_metricas():
+    registro = RegistroMetricas()
+    porta = st.secrets.get("METRICAS_PORTA")
+    if porta:
+        servir_metricas(registro, int(porta), st.secrets.get("METRICAS_ENDERECO", "127.0.0.1"))
+    return registro
+
+# --- Cache das Respostas da IA ---
+# Criado uma única vez por processo e compartilhado entre todas as sessões,
+# para que a mesma pergunta não seja enviada de novo a cada rerun do Streamlit.
+@st.cache_resource
+def obter_cache_respostas():
+    return CacheRespostas(
+        diretorio=st.secrets.get("CACHE_DIR", ".cache_sbmn"),
+        capacidade_memoria=int(st.secrets.get("CACHE_CAPACIDADE_MEMORIA", 1024)),
+        max_entradas_disco=int(st.secrets.get("CACHE_MAX_ENTRADAS_DISCO", 50000)),
+        ttl_segundos=int(st.secrets.get("CACHE_TTL_SEGUNDOS", 7 * 24 * 3600)),
+        intervalo_limpeza=int(st.secrets.get("CACHE_INTERVALO_LIMPEZA", 100)),
+    )
+
+# Cliente do Gemini criado uma única vez por processo, atrás de um agendador que limita
+# a taxa e as chamadas simultâneas, repete erros 429/5xx e reveza as filas das sessões
 # A chave da API será carregada de forma segura pelo Streamlit
-genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-model = genai.GenerativeModel('gemini-2.0-flash')
+@st.cache_resource
+def obter_agendador_llm():
+    backend = motor_sbmn.BackendGemini(MODELO_GEMINI, api_key=st.secrets["GEMINI_API_KEY"], metricas=obter_metricas())
+    return AgendadorLLM(
+        backend,
+        metricas=obter_metricas(),
+        requisicoes_por_minuto=int(st.secrets.get("LLM_REQUISICOES_POR_MINUTO", 60)),
+        rajada=int(st.secrets.get("LLM_RAJADA", 10)),
+        max_em_voo=int(st.secrets.get("LLM_MAX_EM_VOO", 4)),
+        max_tentativas=int(st.secrets.get("LLM_MAX_TENTATIVAS", 5)),
+    )
+
+def obter_especialista():
+    """
+    Especialista (IA) da sessão: as chamadas vão para a fila desta sessão no agendador compartilhado.
+    """
+    backend = obter_agendador_llm().para_sessao(st.session_state.id_sessao)
+    return motor_sbmn.EspecialistaIA(backend, cache=obter_cache_respostas(), metricas=obter_metricas())
+
+# Base de conhecimento compartilhada: respostas validadas pelos analistas em todas as entrevistas
+@st.cache_resource
+def obter_base_conhecimento():
+    if not st.secrets.get("BASE_CONHECIMENTO", True):
+        return None
+    return BaseConhecimento(
+        st.secrets.get("BASE_CONHECIMENTO_DIR", ".base_conhecimento_sbmn"),
+        limiar_similaridade=float(st.secrets.get("BASE_CONHECIMENTO_SIMILARIDADE", 0.8)),
+    )
 
 # --- Variáveis de Estado do Streamlit ---
 # st.session_state é como a "memória" do seu aplicativo.
@@ -21,7 +92,7 @@ if 'dominio_processo' not in st.session_state:
 if 'afos' not in st.session_state:
     st.session_state.afos = [] # Lista de Atividades e Eventos Iniciais (AFOs)
 if 'relacoes' not in st.session_state:
-    st.session_state.relacoes = [] # Lista de relações SBMN identificadas (DEP, DEPC, XOR, UNI)
+    st.session_state.relacoes = RepositorioRelacoes() # Relações SBMN identificadas (DEP, DEPC, XOR, UNI), indexadas por par e tipo
 if 'pares_pendentes' not in st.session_state:
     st.session_state.pares_pendentes = [] # Pares de AFOs que ainda precisam ser questionados (tuplas: AFO_A, AFO_B)
 if 'indice_par_atual' not in st.session_state:
@@ -37,6 +108,32 @@ if 'uni_apenas_b_ocorre' not in st.session_state:
     st.session_state.uni_apenas_b_ocorre = False
 if 'uni_ambos_ocorrem' not in st.session_state:
     st.session_state.uni_ambos_ocorrem = False
+if 'pre_busca' not in st.session_state:
+    st.session_state.pre_busca = None # Pré-busca das próximas perguntas da IA (criada ao iniciar a entrevista)
+if 'detector_inconsistencias' not in st.session_state:
+    st.session_state.detector_inconsistencias = DetectorInconsistencias() # Grafo de dependências para achar inconsistências
+if 'motor_inferencia' not in st.session_state:
+    # Deduz respostas a partir das relações já validadas, consultando o grafo de dependências do detector
+    st.session_state.motor_inferencia = MotorInferencia(st.session_state.detector_inconsistencias.dependencias)
+if 'diario' not in st.session_state:
+    st.session_state.diario = None # Diário da entrevista em disco (permite retomar após queda ou recarga)
+if 'quadro_relacoes' not in st.session_state:
+    st.session_state.quadro_relacoes = None # (chave, DataFrame) das relações, para não remontar a tabela a cada rerun
+# Marcas de tempo das métricas da sessão
+if 'inicio_rerun' not in st.session_state:
+    st.session_state.inicio_rerun = None # Início da execução atual do script
+if 'fase_medida' not in st.session_state:
+    st.session_state.fase_medida = None # (fase, início) da fase em que a sessão está
+if 'inicio_par' not in st.session_state:
+    st.session_state.inicio_par = None # (índice do par, início) do par de AFOs atual
+if 'pergunta_exibida' not in st.session_state:
+    st.session_state.pergunta_exibida = None # ((afo_a, afo_b, tipo), instante em que a resposta da IA apareceu)
+if 'propostas' not in st.session_state:
+    st.session_state.propostas = {} # (afo_a, afo_b, tipo) -> resposta validada em outra entrevista do domínio
+if 'dicas' not in st.session_state:
+    st.session_state.dicas = {} # (afo_a, afo_b, tipo) -> resposta validada para um par de nomes só parecidos
+if 'id_sessao' not in st.session_state:
+    st.session_state.id_sessao = uuid.uuid4().hex # Identifica a fila desta sessão no agendador do Gemini
 
 
 # --- Funções Auxiliares ---
@@ -44,127 +141,346 @@ if 'uni_ambos_ocorrem' not in st.session_state:
 def avancar_fase(proxima_fase):
     """
     Função para mudar a fase da entrevista e forçar o Streamlit a atualizar a interface.
+    A transição é medida no início do próximo rerun (medir_fase), junto com as feitas pelo motor.
     """
     st.session_state.fase = proxima_fase
     st.rerun() # Recarrega a página para mostrar a nova fase
 
-def avancar_pergunta_sbm_para_proximo_par():
+def iniciar_estado_entrevista(nome_processo, dominio_processo, afos):
+    """
+    Prepara o estado de uma entrevista nova (ou a ser retomada do diário) a partir dos dados da Fase 1.
+    """
+    motor_sbmn.iniciar_entrevista(st.session_state, nome_processo, dominio_processo, afos)
+    # Perguntas já validadas em outras entrevistas do domínio, para os mesmos nomes de AFO, vêm preenchidas
+    # e não vão para a IA; as validadas para nomes apenas parecidos aparecem só como dica
+    base = obter_base_conhecimento()
+    encontradas = {}
+    if base is not None:
+        with obter_metricas().cronometrar("sbmn_base_conhecimento_busca_segundos"):
+            encontradas = base.propostas(dominio_processo, afos)
+    st.session_state.propostas = {chave: proposta for chave, proposta in encontradas.items()
+                                  if proposta["similaridade"] == 1}
+    st.session_state.dicas = {chave: proposta for chave, proposta in encontradas.items()
+                              if proposta["similaridade"] < 1}
+    if st.session_state.pre_busca is not None:
+        st.session_state.pre_busca.cancelar_tudo()
+    st.session_state.pre_busca = criar_pre_busca() # Nova pré-busca para o processo informado
+
+def aplicar_resposta_confirmada(evento):
     """
-    Controla o fluxo das perguntas SBMN (DEP_INICIAL, DEP_COMPLEMENTAR, XOR, UNI)
-    e avança para o próximo par de AFOs quando todas as perguntas são feitas.
+    Aplica uma resposta confirmada pelo analista: registra, avança e pula as perguntas inferidas.
+    Usada tanto pelo botão de confirmação quanto ao reaplicar o diário de uma entrevista retomada.
     """
-    # Resetar os estados das checkboxes da UNI para o próximo par
+    # Resetar os estados das checkboxes da UNI para a próxima pergunta
     st.session_state.uni_apenas_a_ocorre = False
     st.session_state.uni_apenas_b_ocorre = False
     st.session_state.uni_ambos_ocorrem = False
+    motor_sbmn.aplicar_resposta_confirmada(st.session_state, evento)
 
-    if st.session_state.pergunta_tipo == "DEP_INICIAL":
-        if st.session_state.resposta_dep_inicial == "Sim":
-            st.session_state.pergunta_tipo = "DEP_COMPLEMENTAR"
-        else: # Respondeu "Não" para a DEP_INICIAL, então não há DEPC. Vai direto para XOR.
-            st.session_state.pergunta_tipo = "XOR"
-    elif st.session_state.pergunta_tipo == "DEP_COMPLEMENTAR":
-        st.session_state.pergunta_tipo = "XOR"
-    elif st.session_state.pergunta_tipo == "XOR":
-        st.session_state.pergunta_tipo = "UNI"
-    elif st.session_state.pergunta_tipo == "UNI":
-        # Todas as perguntas para o par atual foram feitas, avança para o próximo par
-        st.session_state.indice_par_atual += 1
-        st.session_state.pergunta_tipo = "DEP_INICIAL" # Reinicia o ciclo de perguntas para o novo par
-        st.session_state.resposta_dep_inicial = None # Reset para o novo par
-
-    # Verifica se ainda há pares antes de tentar acessar
+def criar_diario(id_entrevista):
+    return DiarioEntrevista(
+        st.secrets.get("DIARIO_DIR", ".entrevistas_sbmn"), id_entrevista,
+        intervalo_snapshot=int(st.secrets.get("SNAPSHOT_INTERVALO", 50)),
+    )
+
+def estado_para_snapshot():
+    """
+    Estado da entrevista gravado no snapshot. Os pares de AFOs não entram:
+    são regenerados a partir da lista de AFOs, e o cursor indica onde parar.
+    """
+    return {
+        "nome_processo": st.session_state.nome_processo,
+        "dominio_processo": st.session_state.dominio_processo,
+        "afos": st.session_state.afos,
+        "indice_par_atual": st.session_state.indice_par_atual,
+        "pergunta_tipo": st.session_state.pergunta_tipo,
+        "resposta_dep_inicial": st.session_state.resposta_dep_inicial,
+        "relacoes": st.session_state.relacoes,
+        "motor_inferencia": st.session_state.motor_inferencia,
+        "detector_inconsistencias": st.session_state.detector_inconsistencias,
+    }
+
+def retomar_entrevista(id_entrevista):
+    """
+    Reconstrói a sessão a partir do último snapshot e reaplica só as respostas posteriores do diário.
+    Levanta ValueError (ID inválido, snapshot ilegível ou de outra versão, linha corrompida ou
+    diário sem os dados iniciais completos) ou FileNotFoundError (entrevista inexistente).
+    """
+    diario = criar_diario(id_entrevista)
+    estado, eventos = diario.carregar()
+    if estado is None:
+        inicio = eventos.pop(0) # Sem snapshot: o diário começa pelos dados da Fase 1
+        iniciar_estado_entrevista(inicio["nome_processo"], inicio["dominio_processo"], inicio["afos"])
+    else:
+        campos = ("nome_processo", "dominio_processo", "afos", "indice_par_atual", "pergunta_tipo",
+                  "resposta_dep_inicial", "relacoes", "motor_inferencia", "detector_inconsistencias")
+        if not isinstance(estado, dict) or any(campo not in estado for campo in campos):
+            raise ValueError(f"O snapshot da entrevista {id_entrevista} é de outra versão do aplicativo")
+        iniciar_estado_entrevista(estado["nome_processo"], estado["dominio_processo"], estado["afos"])
+        for chave in campos[3:]:
+            st.session_state[chave] = estado[chave]
+
+    for evento in eventos:
+        if evento["evento"] == "resposta":
+            aplicar_resposta_confirmada(evento)
+    st.session_state.diario = diario
+    st.query_params["entrevista"] = id_entrevista # Recarregar a página retoma a mesma entrevista
     if st.session_state.indice_par_atual >= len(st.session_state.pares_pendentes):
         st.session_state.fase = "encerramento"
-        st.rerun()
-
-def verificar_inconsistencia(relacao):
-    """
-    Função de placeholder para verificação de inconsistências SBMN.
-    Em um sistema real, esta lógica seria muito mais complexa e robusta,
-    envolvendo a análise de um grafo de dependências.
-    Aqui, vamos simular uma detecção de DEP (estrita) e XOR para o mesmo par,
-    que é uma inconsistência comum.
-    """
-    afo1 = relacao['afo1']
-    afo2 = relacao['afo2']
-    tipo = relacao['tipo']
-    resposta_validada = relacao['sua_validacao']
-
-    # Exemplo simples: Detecção de DEP e XOR para o mesmo par (Equivalent Operators)
-    # Se uma DEP estrita foi validada E uma XOR também foi validada para o mesmo par.
-    if resposta_validada == "Sim":
-        if tipo == 'DEP': 
-            for r in st.session_state.relacoes:
-                # Verifica se a relação existente é XOR e foi validada como Sim
-                if r['tipo'] == 'XOR' and r['sua_validacao'] == 'Não': # 'Não' para "podem ocorrer juntas?" significa que É XOR.
-                    # Verifica se os AFOs são os mesmos, em qualquer ordem
-                    if (r['afo1'] == afo1 and r['afo2'] == afo2) or \
-                       (r['afo1'] == afo2 and r['afo2'] == afo1):
-                        st.warning(
-                            f"**Inconsistência detectada (Equivalent Operators):** "
-                            f"As tarefas '{afo1}' e '{afo2}' possuem uma Dependência Estrita E uma Não-Coexistência (XOR). "
-                            "Isso significa que uma depende da outra E elas não podem ocorrer juntas, o que é contraditório. "
-                            "Por favor, reavalie a relação para esse par."
-                        )
-                        break
-        elif tipo == 'XOR': # Se uma XOR foi validada E uma DEP estrita também foi validada para o mesmo par.
-             for r in st.session_state.relacoes:
-                # Verifica se a relação existente é DEP e foi validada como Sim
-                if r['tipo'] == 'DEP' and r['sua_validacao'] == 'Sim': 
-                    # Verifica se os AFOs são os mesmos, em qualquer ordem
-                    if (r['afo1'] == afo1 and r['afo2'] == afo2) or \
-                       (r['afo1'] == afo2 and r['afo2'] == afo1):
-                        st.warning(
-                            f"**Inconsistência detectada (Equivalent Operators):** "
-                            f"As tarefas '{afo1}' e '{afo2}' possuem uma Dependência Estrita E uma Não-Coexistência (XOR). "
-                            "Isso significa que uma depende da outra E elas não podem ocorrer juntas, o que é contraditório. "
-                            "Por favor, reavalie a relação para esse par."
-                        )
-                        break
-
-    # Você adicionaria mais lógica aqui para outros tipos de inconsistências SBMN
-    # (Ex: Ciclos de dependência, Bloqueio de dependência indireta, Promiscuidade, Dependência Dual)
-
-def obter_resposta_ia(pergunta_ao_especialista, tipo_pergunta_sbm):
-    """
-    Função para chamar a API do Gemini (LLM) para atuar como o "especialista de domínio".
-    Ele vai responder às perguntas SBMN (Sim/Não ou explicação concisa para UNI).
+    else:
+        st.session_state.fase = "entrevista"
+
+def formatar_inconsistencia(inconsistencia):
+    relacoes = ", ".join(f"#{i}" for i in inconsistencia['relacoes'])
+    return (
+        f"**Inconsistência detectada ({inconsistencia['tipo']}):** {inconsistencia['descricao']} "
+        f"Relações envolvidas: {relacoes}. Por favor, reavalie essas relações."
+    )
+
+def criar_pre_busca():
     """
-    try:
-        # O prompt de sistema orienta a IA sobre seu papel
-        system_prompt = (
-            f"Você é um especialista de domínio do processo '{st.session_state.nome_processo}' "
-            f"no setor de '{st.session_state.dominio_processo}'. "
-            "Eu farei perguntas sobre dependências e exclusões de tarefas (AFOs) para modelar um processo. "
+    Cria a pré-busca da sessão para o processo atual.
+    No modo em lote (MODO_LOTE nos secrets), cada bloco de LOTE_PARES pares vira uma única chamada à IA.
+    """
+    especialista = obter_especialista()
+    consultar = functools.partial(
+        especialista.consultar_futuro, st.session_state.nome_processo, st.session_state.dominio_processo,
+    )
+    consultar_lote = None
+    if st.secrets.get("MODO_LOTE", False):
+        consultar_lote = functools.partial(
+            especialista.consultar_lote_futuro, st.session_state.nome_processo, st.session_state.dominio_processo,
         )
-        
-        # Ajusta a instrução para a IA dependendo do tipo de pergunta
-        if tipo_pergunta_sbm == "UNI":
-            # Para UNI, a IA deve responder com uma combinação das opções
-            system_prompt += "Para a próxima pergunta, você deve responder indicando quais das opções são possíveis: 'apenas A', 'apenas B', 'ambos A e B', ou uma combinação dessa (por exemplo, 'apenas A e ambos')."
-        else:
-            # Para DEP e XOR, a IA deve responder Sim ou Não
-            system_prompt += "Responda apenas 'Sim' ou 'Não' quando a pergunta for binária. Se precisar de mais contexto ou achar a pergunta ambígua, peça esclarecimentos."
-        
-        # Histórico da conversa para manter o contexto
-        chat_history = [
-            {"role": "user", "parts": [{ "text": system_prompt }]},
-            {"role": "model", "parts": [{ "text": "Entendido. Estou pronto para ajudar como especialista de domínio." }]}
-        ]
-        
-        # Adiciona a pergunta atual
-        chat_history.append({"role": "user", "parts": [{ "text": pergunta_ao_especialista }]})
+    return PreBuscaPerguntas(
+        consultar, motor_sbmn.formular_pergunta,
+        profundidade=int(st.secrets.get("PRE_BUSCA_PROFUNDIDADE", 4)),
+        consultar_lote=consultar_lote,
+        pares_por_lote=int(st.secrets.get("LOTE_PARES", 1)),
+    )
+
+def obter_resposta_ia(afo_a, afo_b, tipo_pergunta_sbm, area_streaming=None):
+    """
+    Função para obter a resposta do Gemini (LLM) atuando como o "especialista de domínio".
+    Ele vai responder às perguntas SBMN (Sim/Não ou explicação concisa para UNI).
+    Antes de esperar pela resposta atual, agenda a pré-busca das próximas perguntas.
+    Com `area_streaming`, a resposta atual (se ainda não foi pré-buscada) é pedida em
+    streaming e mostrada nessa área à medida que chega. Se já foi pré-buscada e ainda
+    está em andamento, a espera mostra o mesmo spinner do modo sem streaming.
+    Retorna None se a IA não respondeu (mesmo após as novas tentativas do agendador).
+    """
+    if st.session_state.pre_busca is None:
+        st.session_state.pre_busca = criar_pre_busca()
+    pre_busca = st.session_state.pre_busca
 
-        # Faz a chamada à API do Gemini
-        response = model.generate_content(chat_history)
-        
-        # Extrai a resposta do modelo
-        resposta_especialista = response.text.strip()
-        return resposta_especialista
+    try:
+        # Perguntas com resposta inferida ou proposta pela base de conhecimento não vão para a IA
+        motor = st.session_state.motor_inferencia
+        propostas = st.session_state.propostas
+        pular = lambda a, b, tipo: (a, b, tipo) in propostas or motor.resposta_inferida(a, b, tipo) is not None
+        pre_busca.atualizar(st.session_state.pares_pendentes, st.session_state.indice_par_atual, tipo_pergunta_sbm,
+                            pular=pular, incluir_atual=area_streaming is None)
+        if area_streaming is not None and not pre_busca.agendada(afo_a, afo_b, tipo_pergunta_sbm):
+            with obter_metricas().cronometrar("sbmn_resposta_ia_segundos", origem="streaming"):
+                resposta_ia, _ = obter_especialista().consultar_fluxo(
+                    st.session_state.nome_processo, st.session_state.dominio_processo, afo_a, afo_b, tipo_pergunta_sbm,
+                    ao_receber=lambda parcial: area_streaming.info(f"Resposta do Especialista (IA): {parcial} ▌"),
+                )
+            return resposta_ia
+        # Inclui só a espera que restou: a pré-busca pode ter começado a pergunta reruns antes
+        with obter_metricas().cronometrar("sbmn_resposta_ia_segundos", origem="pre_busca"), \
+                st.spinner("Aguardando resposta do especialista (IA)..."):
+            return pre_busca.obter(afo_a, afo_b, tipo_pergunta_sbm)
     except Exception as e:
+        obter_metricas().incrementar("sbmn_resposta_ia_falhas_total")
+        # A falha não vira resposta: o analista pode validar sem ela ou tentar de novo
         st.error(f"Erro ao comunicar com a Inteligência Artificial: {e}")
-        return "Erro na comunicação com o especialista."
+        return None
+
+def obter_quadro_relacoes():
+    """
+    DataFrame das relações, montado uma vez e reaproveitado enquanto o repositório não muda.
+    """
+    relacoes = st.session_state.relacoes
+    chave = (id(relacoes), len(relacoes))
+    if st.session_state.quadro_relacoes is None or st.session_state.quadro_relacoes[0] != chave:
+        st.session_state.quadro_relacoes = (chave, tabela_relacoes.quadro_relacoes(relacoes))
+    return st.session_state.quadro_relacoes[1]
+
+@st.fragment
+def exibir_relacoes():
+    """
+    Tabela das relações com contagem por tipo, filtros e paginação. Por ser um fragmento,
+    mudar filtro ou página só reexecuta esta parte, e só a página atual vai para o navegador.
+    """
+    quadro = obter_quadro_relacoes()
+    contagem = tabela_relacoes.contagem_por_tipo(quadro)
+    for coluna, (tipo, quantidade) in zip(st.columns(len(contagem)), contagem.items()):
+        coluna.metric(tipo, int(quantidade))
+
+    filtro_tipos = st.multiselect("Filtrar por tipo:", options=list(contagem.index))
+    filtro_afos = st.multiselect("Filtrar por AFO:", options=st.session_state.afos)
+    filtrado = tabela_relacoes.filtrar_relacoes(quadro, tipos=filtro_tipos, afos=filtro_afos)
+
+    coluna_tamanho, coluna_pagina = st.columns(2)
+    tamanho_pagina = coluna_tamanho.selectbox("Relações por página:", options=[50, 100, 500], index=1)
+    total_paginas = max(1, math.ceil(len(filtrado) / tamanho_pagina))
+    numero_pagina = coluna_pagina.number_input("Página:", min_value=1, max_value=total_paginas, value=1)
+    st.caption(f"{len(filtrado)} relações (página {numero_pagina} de {total_paginas}). "
+               "Relações inferidas trazem na justificativa as relações das quais foram deduzidas.")
+    st.dataframe(tabela_relacoes.pagina(filtrado, numero_pagina, tamanho_pagina), hide_index=True,
+                 use_container_width=True)
+
+def preparar_exportacao(formato):
+    """
+    Grava o modelo em um arquivo temporário, trecho a trecho, no formato pedido (csv, json ou jsonl),
+    e retorna o caminho do arquivo.
+    """
+    relacoes = st.session_state.relacoes
+    if formato == "csv":
+        trechos = tabela_relacoes.exportar_csv(relacoes)
+    elif formato == "jsonl":
+        trechos = tabela_relacoes.exportar_jsonl(relacoes)
+    else:
+        trechos = tabela_relacoes.exportar_json(
+            relacoes, st.session_state.nome_processo, st.session_state.dominio_processo, st.session_state.afos,
+            st.session_state.detector_inconsistencias.inconsistencias,
+        )
+    descritor, caminho = tempfile.mkstemp(prefix="modelo_sbmn_", suffix=f".{formato}")
+    os.close(descritor)
+    tabela_relacoes.gravar_exportacao(trechos, caminho)
+    return caminho
+
+@st.fragment
+def exibir_exportacao():
+    """
+    Exportação do modelo. O Streamlit não serve arquivos em fluxo: o st.download_button lê o
+    arquivo inteiro para a memória do servidor, mesmo recebendo o arquivo aberto. Por isso o
+    botão só aparece no rerun em que o arquivo foi preparado (e o arquivo é apagado em seguida);
+    por ser um fragmento, esse rerun não reexecuta o resto da página.
+    """
+    formato = st.radio("Formato do arquivo:", options=["csv", "json", "jsonl"], horizontal=True)
+    if st.button("Preparar Arquivo"):
+        caminho = preparar_exportacao(formato)
+        tipos_mime = {"csv": "text/csv", "json": "application/json", "jsonl": "application/jsonl"}
+        try:
+            with open(caminho, "rb") as arquivo:
+                st.download_button(f"Baixar Modelo ({formato.upper()})", data=arquivo,
+                                   file_name=f"modelo_sbmn.{formato}", mime=tipos_mime[formato])
+        finally:
+            os.remove(caminho)
+
+def medir_inicio_rerun():
+    """
+    Marca o início da execução do script. Uma execução interrompida por st.rerun() não chega
+    ao fim do script, então a sua duração é medida aqui, no início da execução seguinte.
+    """
+    agora = time.perf_counter()
+    if st.session_state.inicio_rerun is not None:
+        obter_metricas().observar("sbmn_rerun_segundos", agora - st.session_state.inicio_rerun[1],
+                                  fase=st.session_state.inicio_rerun[0], fim="st_rerun")
+    st.session_state.inicio_rerun = (st.session_state.fase, agora)
+
+def medir_fim_rerun():
+    fase, inicio = st.session_state.inicio_rerun
+    obter_metricas().observar("sbmn_rerun_segundos", time.perf_counter() - inicio, fase=fase, fim="completo")
+    st.session_state.inicio_rerun = None
+
+def medir_fase():
+    """
+    Registra a transição quando a fase mudou desde o último rerun, com o tempo passado na fase anterior.
+    """
+    fase_medida = st.session_state.fase_medida
+    if fase_medida is not None and fase_medida[0] == st.session_state.fase:
+        return
+    agora = time.perf_counter()
+    if fase_medida is not None:
+        metricas = obter_metricas()
+        metricas.observar("sbmn_fase_segundos", agora - fase_medida[1], fase=fase_medida[0])
+        metricas.incrementar("sbmn_transicoes_fase_total", de=fase_medida[0], para=st.session_state.fase)
+    st.session_state.fase_medida = (st.session_state.fase, agora)
+
+def medir_resposta_confirmada(chave_pergunta):
+    """
+    Tempo do analista validando a resposta e, quando o par termina, o tempo total gasto no par.
+    """
+    metricas = obter_metricas()
+    agora = time.perf_counter()
+    exibida = st.session_state.pergunta_exibida
+    if exibida is not None and exibida[0] == chave_pergunta:
+        metricas.observar("sbmn_validacao_analista_segundos", agora - exibida[1], tipo=chave_pergunta[2])
+    inicio_par = st.session_state.inicio_par
+    if inicio_par is not None and inicio_par[0] != st.session_state.indice_par_atual:
+        metricas.observar("sbmn_par_segundos", agora - inicio_par[1])
+        st.session_state.inicio_par = None
+
+def exibir_painel_metricas():
+    """
+    Painel de administração com as métricas do processo (todas as sessões).
+    Mostra dados de todas as sessões, então só aparece com PAINEL_ADMIN = true nos secrets.
+    """
+    metricas = obter_metricas()
+    contadores = metricas.contadores()
+    tokens_prompt = contadores.get(("sbmn_llm_tokens_total", (("tipo", "prompt"),)), 0)
+    tokens_resposta = contadores.get(("sbmn_llm_tokens_total", (("tipo", "resposta"),)), 0)
+    acertos = contadores.get(("sbmn_cache_consultas_total", (("resultado", "acerto"),)), 0)
+    faltas = contadores.get(("sbmn_cache_consultas_total", (("resultado", "falta"),)), 0)
+    coluna_tokens_prompt, coluna_tokens_resposta, coluna_cache, coluna_tentativas = st.columns(4)
+    coluna_tokens_prompt.metric("Tokens do prompt", tokens_prompt)
+    coluna_tokens_resposta.metric("Tokens das respostas", tokens_resposta)
+    coluna_cache.metric("Acertos no cache", f"{acertos / (acertos + faltas):.0%}" if acertos + faltas else "-")
+    coluna_tentativas.metric("Novas tentativas", contadores.get(("sbmn_llm_novas_tentativas_total", ()), 0))
+
+    linhas = []
+    for (nome, rotulos), histograma in sorted(metricas.histogramas().items()):
+        linhas.append({
+            "métrica": nome,
+            "rótulos": ", ".join(f"{chave}={valor}" for chave, valor in rotulos),
+            "n": histograma.total,
+            "média (ms)": histograma.soma / histograma.total * 1000,
+            "p50 (ms)": histograma.quantil(0.50) * 1000,
+            "p95 (ms)": histograma.quantil(0.95) * 1000,
+            "p99 (ms)": histograma.quantil(0.99) * 1000,
+        })
+    if linhas:
+        st.dataframe(linhas, hide_index=True, use_container_width=True)
+    st.dataframe(
+        [{"contador": nome, "rótulos": ", ".join(f"{chave}={valor}" for chave, valor in rotulos), "valor": valor}
+         for (nome, rotulos), valor in sorted(contadores.items())],
+        hide_index=True, use_container_width=True,
+    )
+
+    coluna_jsonl, coluna_prometheus = st.columns(2)
+    coluna_jsonl.download_button("Baixar Métricas (JSONL)", data="".join(metricas.como_jsonl()),
+                                 file_name="metricas_sbmn.jsonl", mime="application/jsonl")
+    coluna_prometheus.download_button("Baixar Métricas (Prometheus)", data=metricas.como_prometheus(),
+                                      file_name="metricas_sbmn.prom", mime="text/plain")
+    if st.secrets.get("METRICAS_PORTA"):
+        st.caption(f"Também disponíveis em /metrics e /metrics.jsonl na porta {st.secrets['METRICAS_PORTA']}.")
+
+def citar_proposta(proposta):
+    """
+    Origem de uma resposta proposta pela base de conhecimento, registrada no lugar da resposta da IA.
+    """
+    texto = (
+        f"Base de conhecimento: '{proposta['resposta']}', validada na entrevista {proposta['id_entrevista']} "
+        f"(processo '{proposta['nome_processo']}', par '{proposta['afo_a_original']}' / '{proposta['afo_b_original']}'"
+    )
+    if proposta["similaridade"] < 1:
+        texto += f", nomes {proposta['similaridade']:.0%} parecidos"
+    return texto + ")"
+
+# --- Medição do Rerun ---
+medir_inicio_rerun()
+medir_fase()
+
+# --- Retomada da Entrevista ---
+# Após recarregar a página (ou uma nova sessão com o mesmo link), a entrevista indicada na URL é retomada
+if st.session_state.diario is None and "entrevista" in st.query_params:
+    try:
+        retomar_entrevista(st.query_params["entrevista"])
+    except (ValueError, FileNotFoundError) as e:
+        st.query_params.clear()
+        st.error(f"Não foi possível retomar a entrevista: {e}")
 
 # --- Interface do Streamlit ---
 
@@ -183,30 +499,45 @@ if st.session_state.fase == "introducao":
 
     if st.button("Iniciar Entrevista"):
         if nome_proc and dominio_proc and afos_input:
-            st.session_state.nome_processo = nome_proc
-            st.session_state.dominio_processo = dominio_proc
             # Processa a lista de AFOs, removendo espaços extras e vazios
-            st.session_state.afos = [afo.strip() for afo in afos_input.split(',') if afo.strip()]
+            afos = [afo.strip() for afo in afos_input.split(',') if afo.strip()]
             
-            if len(st.session_state.afos) < 2:
+            if len(afos) < 2:
                 st.error("Por favor, liste pelo menos duas AFOs para iniciar as perguntas sobre relações.")
             else:
-                # Gera todos os pares possíveis (A, B) para as perguntas de dependência/exclusão
-                # itertools.permutations(lista, 2) cria pares ordenados (A,B) e (B,A)
-                st.session_state.pares_pendentes = list(itertools.permutations(st.session_state.afos, 2))
-                st.session_state.indice_par_atual = 0
-                st.session_state.pergunta_tipo = "DEP_INICIAL" # Começa com a primeira pergunta para o primeiro par
-                st.session_state.resposta_dep_inicial = None # Reseta a resposta inicial da DEP
+                iniciar_estado_entrevista(nome_proc, dominio_proc, afos)
+                # Cada entrevista tem um diário em disco; o ID fica na URL para retomá-la
+                st.session_state.diario = criar_diario(DiarioEntrevista.novo_id())
+                st.session_state.diario.registrar_inicio(nome_proc, dominio_proc, afos)
+                st.query_params["entrevista"] = st.session_state.diario.id_entrevista
                 avancar_fase("entrevista") # Avança para a próxima fase
         else:
             st.error("Por favor, preencha todos os campos para iniciar a entrevista.")
 
+    st.markdown("---")
+    id_para_retomar = st.text_input("Ou informe o ID de uma entrevista anterior para retomá-la:")
+    if st.button("Retomar Entrevista"):
+        try:
+            retomar_entrevista(id_para_retomar.strip())
+            st.rerun()
+        except (ValueError, FileNotFoundError) as e:
+            st.error(f"Não foi possível retomar a entrevista: {e}")
+
 # --- Fase 2: Entrevista Baseada em Situações SBMN ---
 elif st.session_state.fase == "entrevista":
     st.header("Fase 2: Entrevista Baseada em Situações SBMN (Coleta de Restrições Declarativas)")
     st.write(f"**Processo:** {st.session_state.nome_processo} | **Domínio:** {st.session_state.dominio_processo}")
+    if st.session_state.diario is not None:
+        st.caption(f"ID da entrevista (para retomá-la): `{st.session_state.diario.id_entrevista}`")
     st.markdown("---")
 
+    # As inconsistências ficam visíveis até o fim da entrevista (as mais recentes primeiro)
+    inconsistencias = st.session_state.detector_inconsistencias.inconsistencias
+    if inconsistencias:
+        with st.expander(f"Inconsistências detectadas ({len(inconsistencias)})", expanded=True):
+            for inconsistencia in reversed(inconsistencias[-20:]):
+                st.warning(formatar_inconsistencia(inconsistencia))
+
     # Verifica se ainda há pares de AFOs para questionar
     if st.session_state.indice_par_atual >= len(st.session_state.pares_pendentes):
         st.session_state.fase = "encerramento"
@@ -217,34 +548,56 @@ elif st.session_state.fase == "entrevista":
         tipo_relacao_actual = st.session_state.pergunta_tipo
 
         st.write(f"**Analisando o par:** `{afo_a}` e `{afo_b}`")
+        if st.session_state.inicio_par is None or st.session_state.inicio_par[0] != st.session_state.indice_par_atual:
+            st.session_state.inicio_par = (st.session_state.indice_par_atual, time.perf_counter())
 
         # Formula a pergunta com base no tipo de relação SBMN
         if tipo_relacao_actual == "DEP_INICIAL":
             st.subheader("2.1. Verificação de Dependência com Classificação (Pergunta Inicial)")
-            pergunta_ao_ia = f"A tarefa '{afo_b}' depende de '{afo_a}' para ocorrer?"
         elif tipo_relacao_actual == "DEP_COMPLEMENTAR":
             st.subheader("2.1. Verificação de Dependência com Classificação (Pergunta Complementar)")
-            pergunta_ao_ia = f"Essa dependência é obrigatória? Ou seja, '{afo_b}' só pode começar se '{afo_a}' tiver ocorrido?"
         elif tipo_relacao_actual == "XOR":
             st.subheader("2.3. Não-Coexistência (XOR)")
-            pergunta_ao_ia = f"As tarefas '{afo_a}' e '{afo_b}' **podem ocorrer juntas** no mesmo fluxo de processo?"
         elif tipo_relacao_actual == "UNI":
             st.subheader("2.4. União Inclusiva (UNI)")
-            pergunta_ao_ia = (
-                f"Considerando as tarefas '{afo_a}' e '{afo_b}', por favor, me diga qual (ou quais) das seguintes situações são possíveis neste processo: \n"
-                f"- Apenas '{afo_a}' ocorre \n"
-                f"- Apenas '{afo_b}' ocorre \n"
-                f"- Ambos '{afo_a}' e '{afo_b}' ocorrem"
-            )
-            # A instrução para a IA fica no `obter_resposta_ia`, aqui para o usuário, podemos ser mais diretos.
+            # A instrução para a IA fica no `EspecialistaIA.consultar`, aqui para o usuário, podemos ser mais diretos.
             # st.caption("Você pode me dizer 'apenas A', 'apenas B', 'ambos', ou uma combinação delas (ex: 'apenas A e ambos').")
+        pergunta_ao_ia = motor_sbmn.formular_pergunta(afo_a, afo_b, tipo_relacao_actual)
 
         st.write(pergunta_ao_ia)
 
         # Chama a IA para obter a resposta do "especialista de domínio"
-        with st.spinner("Aguardando resposta do especialista (IA)..."):
-            resposta_ia = obter_resposta_ia(pergunta_ao_ia, tipo_relacao_actual)
-        st.info(f"Resposta do Especialista (IA): **{resposta_ia}**")
+        area_resposta = st.empty()
+        proposta = st.session_state.propostas.get((afo_a, afo_b, tipo_relacao_actual))
+        if proposta is not None:
+            # Já validada em outra entrevista do domínio: a IA não é consultada, o analista só confirma
+            obter_metricas().incrementar("sbmn_base_conhecimento_propostas_total")
+            resposta_ia = citar_proposta(proposta)
+        elif st.secrets.get("MODO_STREAMING", False):
+            # A resposta aparece enquanto é gerada e a geração para assim que Sim/Não ou as opções da UNI são conhecidas
+            resposta_ia = obter_resposta_ia(afo_a, afo_b, tipo_relacao_actual, area_streaming=area_resposta)
+        else:
+            resposta_ia = obter_resposta_ia(afo_a, afo_b, tipo_relacao_actual)
+        if resposta_ia is None:
+            area_resposta.warning("O especialista (IA) não respondeu a esta pergunta. Você pode validar mesmo assim.")
+            if st.button("Tentar novamente"):
+                st.rerun() # A pré-busca descarta a chamada que falhou e pergunta de novo
+            resposta_ia = ""
+        elif proposta is not None:
+            area_resposta.info(f"Resposta proposta pela base de conhecimento: **{proposta['resposta']}**")
+            st.caption(resposta_ia)
+        else:
+            area_resposta.info(f"Resposta do Especialista (IA): **{resposta_ia}**")
+        dica = st.session_state.dicas.get((afo_a, afo_b, tipo_relacao_actual))
+        if proposta is None and dica is not None:
+            st.caption(f"Dica: {citar_proposta(dica)}")
+        chave_pergunta = (afo_a, afo_b, tipo_relacao_actual)
+        if st.session_state.pergunta_exibida is None or st.session_state.pergunta_exibida[0] != chave_pergunta:
+            st.session_state.pergunta_exibida = (chave_pergunta, time.perf_counter()) # Início da validação do analista
+            if proposta is not None and proposta["opcoes_uni"] is not None:
+                # Na primeira exibição da pergunta, as checkboxes da UNI vêm marcadas como na proposta
+                (st.session_state.uni_apenas_a_ocorre, st.session_state.uni_apenas_b_ocorre,
+                 st.session_state.uni_ambos_ocorrem) = proposta["opcoes_uni"]
 
         st.markdown("---")
         st.subheader("Sua Validação (Analista):")
@@ -260,20 +613,14 @@ elif st.session_state.fase == "entrevista":
                                                               value=st.session_state.uni_ambos_ocorrem)
             
             # A resposta para registro será construída a partir do estado das checkboxes
-            resposta_para_registro = []
-            if st.session_state.uni_apenas_a_ocorre:
-                resposta_para_registro.append(f"Apenas {afo_a}")
-            if st.session_state.uni_apenas_b_ocorre:
-                resposta_para_registro.append(f"Apenas {afo_b}")
-            if st.session_state.uni_ambos_ocorrem:
-                resposta_para_registro.append(f"Ambos {afo_a} e {afo_b}")
-            
-            # Converte a lista para uma string para armazenamento
-            resposta_para_registro = ", ".join(resposta_para_registro) if resposta_para_registro else "Nenhuma das opções selecionadas"
+            resposta_para_registro = motor_sbmn.texto_opcoes_uni(afo_a, afo_b, (st.session_state.uni_apenas_a_ocorre,
+                                                                                st.session_state.uni_apenas_b_ocorre,
+                                                                                st.session_state.uni_ambos_ocorrem))
 
         else: # Para DEP e XOR, mantém o radio button
             sua_resposta_validacao = st.radio("Essa resposta do especialista (IA) está correta para o processo real?", 
                                                  options=["Sim", "Não"], 
+                                                 index=1 if proposta is not None and proposta["resposta"] == "Não" else 0,
                                                  key=f"resp_bin_{afo_a}_{afo_b}_{tipo_relacao_actual}")
             resposta_para_registro = sua_resposta_validacao # "Sim" ou "Não"
 
@@ -281,46 +628,30 @@ elif st.session_state.fase == "entrevista":
                                   key=f"obs_{afo_a}_{afo_b}_{tipo_relacao_actual}")
 
         if st.button("Confirmar e Próxima Pergunta"):
-            relacao_registrada = {
-                "afo1": afo_a,
-                "afo2": afo_b,
-                "tipo": "", # O tipo SBMN será classificado abaixo
+            opcoes_uni = None
+            if tipo_relacao_actual == "UNI":
+                opcoes_uni = (st.session_state.uni_apenas_a_ocorre, st.session_state.uni_apenas_b_ocorre,
+                              st.session_state.uni_ambos_ocorrem)
+            evento = {
+                "indice_par": st.session_state.indice_par_atual,
+                "tipo_pergunta": tipo_relacao_actual,
                 "resposta_ia": resposta_ia,
-                "sua_validacao": resposta_para_registro, # A string construída das checkboxes ou Sim/Não
-                "observacao": observacao
+                "resposta": resposta_para_registro,
+                "observacao": observacao,
+                "opcoes_uni": opcoes_uni,
             }
-            
-            # Lógica para classificar o tipo de relação SBMN e registrar
-            if tipo_relacao_actual == "DEP_INICIAL":
-                st.session_state.resposta_dep_inicial = resposta_para_registro # Armazena a resposta para a próxima etapa
-                if resposta_para_registro == "Não":
-                    relacao_registrada["tipo"] = "SEM_DEPENDÊNCIA"
-                    st.session_state.relacoes.append(relacao_registrada)
-            elif tipo_relacao_actual == "DEP_COMPLEMENTAR":
-                if resposta_para_registro == "Sim":
-                    relacao_registrada["tipo"] = "DEP" # Dependência Estrita
-                else:
-                    relacao_registrada["tipo"] = "DEPC" # Dependência Circunstancial
-                st.session_state.relacoes.append(relacao_registrada)
-                verificar_inconsistencia(relacao_registrada) # Verifica inconsistências após registrar DEP/DEPC
-            elif tipo_relacao_actual == "XOR":
-                # 'Sim' para "podem ocorrer juntas?" significa que NÃO é XOR.
-                # 'Não' para "podem ocorrer juntas?" significa que É XOR.
-                if resposta_para_registro == "Não": 
-                    relacao_registrada["tipo"] = "XOR"
-                else: 
-                    relacao_registrada["tipo"] = "NÃO_XOR" # AFOs podem coexistir
-                st.session_state.relacoes.append(relacao_registrada)
-                verificar_inconsistencia(relacao_registrada) # Verifica inconsistências após registrar XOR
-            elif tipo_relacao_actual == "UNI":
-                # A classificação da UNI agora depende do estado das checkboxes
-                if st.session_state.uni_apenas_a_ocorre and st.session_state.uni_apenas_b_ocorre and st.session_state.uni_ambos_ocorrem:
-                    relacao_registrada["tipo"] = "UNI"
-                else:
-                    relacao_registrada["tipo"] = "NÃO_UNI" # Não é uma UNI completa
-                st.session_state.relacoes.append(relacao_registrada)
-
-            avancar_pergunta_sbm_para_proximo_par()
+            # Primeiro o diário, depois o estado: após uma queda a resposta é reaplicada na retomada
+            if st.session_state.diario is not None:
+                st.session_state.diario.registrar_resposta(evento)
+            base = obter_base_conhecimento()
+            if base is not None and st.session_state.diario is not None:
+                base.registrar(st.session_state.dominio_processo, st.session_state.nome_processo,
+                               st.session_state.diario.id_entrevista, afo_a, afo_b, tipo_relacao_actual,
+                               resposta_para_registro, opcoes_uni)
+            aplicar_resposta_confirmada(evento)
+            medir_resposta_confirmada(chave_pergunta)
+            if st.session_state.diario is not None and st.session_state.diario.precisa_snapshot():
+                st.session_state.diario.salvar_snapshot(estado_para_snapshot())
             st.rerun() # Recarrega para mostrar a próxima pergunta/fase
 
 
@@ -331,26 +662,39 @@ elif st.session_state.fase == "encerramento":
     
     st.write("### Modelo SBMN Mapeado (Relações Validadas por Você):")
     if st.session_state.relacoes:
-        for rel in st.session_state.relacoes:
-            tipo_display = rel['tipo'] # O tipo já vem classificado
-            
-            st.write(f"- `{rel['afo1']}` **{tipo_display}** `{rel['afo2']}` (Resposta IA: '{rel['resposta_ia']}', Validado por você: '{rel['sua_validacao']}')")
-            if rel['observacao']:
-                st.caption(f"  Obs: {rel['observacao']}")
+        exibir_relacoes()
+
+        st.write("### Exportar o Modelo:")
+        exibir_exportacao()
     else:
         st.info("Nenhuma relação foi validada e registrada durante esta entrevista.")
 
+    inconsistencias = st.session_state.detector_inconsistencias.inconsistencias
+    if inconsistencias:
+        st.write("### Inconsistências Detectadas:")
+        for inconsistencia in inconsistencias:
+            st.warning(formatar_inconsistencia(inconsistencia))
+
     st.write("---")
     st.write("### Resumo das Atividades e Eventos Iniciais (AFOs):")
     st.write(", ".join(st.session_state.afos))
 
+    if st.secrets.get("PAINEL_ADMIN", False):
+        with st.expander("Painel de Administração: Métricas de Desempenho"):
+            exibir_painel_metricas()
+
     st.write("---")
     st.subheader("4.2. Confirmação Final:")
     final_confirm = st.text_area("Há mais alguma atividade, evento ou restrição importante que devemos considerar para este processo?")
     st.write(f"Sua resposta: {final_confirm}")
 
     if st.button("Reiniciar Entrevista"):
+        if st.session_state.pre_busca is not None:
+            st.session_state.pre_busca.cancelar_tudo()
         # Limpa todas as variáveis de estado para começar do zero
         for key in st.session_state.keys():
             del st.session_state[key]
-        st.rerun() # Recarrega a página
\ No newline at end of file
+        st.query_params.clear() # A próxima recarga não deve retomar a entrevista encerrada
+        st.rerun() # Recarrega a página
+
+medir_fim_rerun() # Só é alcançado pelas execuções que não terminaram em st.rerun()
@@ -0,0 +1,193 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+
+def normalizar_nome(texto):
+    """
+    Forma canônica de nomes de AFO e domínios: sem acentos, minúscula, só letras,
+    dígitos e espaços simples ("Emitir Nota-Fiscal " -> "emitir nota fiscal").
+    """
+    sem_acentos = "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", sem_acentos.lower()).split())
+
+def trigramas(nome_normalizado):
+    texto = f"  {nome_normalizado} " # As bordas também contam, como no pg_trgm
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+# Palavras que invertem o sentido do nome ("nao aprovar pedido" não é "aprovar pedido")
+_NEGACOES = frozenset({"nao", "sem", "nunca", "nem", "jamais", "nenhum", "nenhuma"})
+
+def negacoes(nome_normalizado):
+    return _NEGACOES.intersection(nome_normalizado.split())
+
+
+class IndiceNgramas:
+    """
+    Índice invertido de trigramas dos nomes de AFO de um domínio, para achar nomes
+    quase iguais ("Aprovar pedido" / "Aprovar o pedido") pelo coeficiente de Dice.
+    Só os nomes que compartilham algum trigrama com a busca são comparados, e nomes com
+    palavras de negação diferentes ("Não aprovar pedido") nunca são considerados parecidos.
+    """
+
+    def __init__(self):
+        self._nomes = [] # id -> nome normalizado
+        self._tamanhos = [] # id -> quantidade de trigramas do nome
+        self._ids = {} # nome normalizado -> id
+        self._por_trigrama = {} # trigrama -> [ids dos nomes que o contêm]
+
+    def __len__(self):
+        return len(self._nomes)
+
+    def adicionar(self, nome_normalizado):
+        if nome_normalizado in self._ids:
+            return
+        id_nome = len(self._nomes)
+        grams = trigramas(nome_normalizado)
+        self._ids[nome_normalizado] = id_nome
+        self._nomes.append(nome_normalizado)
+        self._tamanhos.append(len(grams))
+        for gram in grams:
+            self._por_trigrama.setdefault(gram, []).append(id_nome)
+
+    def mais_parecido(self, nome_normalizado, limiar=0.8):
+        """
+        Retorna (nome conhecido, similaridade) do nome mais parecido com similaridade
+        de pelo menos `limiar`, ou None. Um nome idêntico tem similaridade 1.
+        """
+        if nome_normalizado in self._ids:
+            return nome_normalizado, 1.0
+        grams = trigramas(nome_normalizado)
+        negadas = negacoes(nome_normalizado)
+        comuns = {}
+        for gram in grams:
+            for id_nome in self._por_trigrama.get(gram, ()):
+                comuns[id_nome] = comuns.get(id_nome, 0) + 1
+        melhor = None
+        for id_nome, quantidade in comuns.items():
+            similaridade = 2 * quantidade / (len(grams) + self._tamanhos[id_nome])
+            if similaridade >= limiar and (melhor is None or similaridade > melhor[1]) \
+                    and negacoes(self._nomes[id_nome]) == negadas:
+                melhor = (self._nomes[id_nome], similaridade)
+        return melhor
+
+
+class BaseConhecimento:
+    """
+    Base local e persistente (SQLite) das respostas validadas pelos analistas, de todas as
+    entrevistas, indexada por domínio e pelos nomes normalizados das AFOs.
+    Ao iniciar uma entrevista, as perguntas cujo par de AFOs (ou um par de nomes quase iguais,
+    pelo índice de trigramas) já foi validado no mesmo domínio recebem uma resposta proposta,
+    que cita a entrevista de origem. Só as propostas com nomes idênticos após a normalização
+    (similaridade 1) devem dispensar a IA; as de nomes parecidos servem apenas de dica.
+    """
+
+    def __init__(self, diretorio, limiar_similaridade=0.8):
+        self.limiar_similaridade = limiar_similaridade
+        self._indices = {} # domínio normalizado -> IndiceNgramas (carregado na primeira busca)
+        # O Streamlit atende cada sessão em uma thread própria, então todo acesso passa por este lock
+        self._lock = threading.Lock()
+
+        os.makedirs(diretorio, exist_ok=True)
+        self._conexao = sqlite3.connect(os.path.join(diretorio, "conhecimento.sqlite3"),
+                                        check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        # Uma linha por pergunta validada em cada entrevista; a chave primária também serve
+        # de índice para buscar as respostas de um domínio a partir da primeira AFO do par
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS respostas_validadas ("
+            "dominio TEXT NOT NULL, afo_a TEXT NOT NULL, afo_b TEXT NOT NULL, tipo_pergunta TEXT NOT NULL, "
+            "id_entrevista TEXT NOT NULL, resposta TEXT NOT NULL, opcoes_uni TEXT, "
+            "nome_processo TEXT NOT NULL, afo_a_original TEXT NOT NULL, afo_b_original TEXT NOT NULL, "
+            "validado_em REAL NOT NULL, "
+            "PRIMARY KEY (dominio, afo_a, afo_b, tipo_pergunta, id_entrevista))"
+        )
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS afos (dominio TEXT NOT NULL, nome TEXT NOT NULL, PRIMARY KEY (dominio, nome))"
+        )
+        self._conexao.commit()
+
+    def registrar(self, dominio, nome_processo, id_entrevista, afo_a, afo_b, tipo_pergunta, resposta,
+                  opcoes_uni=None):
+        """
+        Guarda uma resposta validada pelo analista. Validar de novo a mesma pergunta na
+        mesma entrevista substitui a anterior.
+        """
+        dominio_normalizado = normalizar_nome(dominio)
+        nome_a, nome_b = normalizar_nome(afo_a), normalizar_nome(afo_b)
+        with self._lock:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO respostas_validadas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (dominio_normalizado, nome_a, nome_b, tipo_pergunta, id_entrevista, resposta,
+                 None if opcoes_uni is None else json.dumps(list(opcoes_uni)),
+                 nome_processo, afo_a, afo_b, time.time()),
+            )
+            self._conexao.executemany("INSERT OR IGNORE INTO afos VALUES (?, ?)",
+                                      [(dominio_normalizado, nome_a), (dominio_normalizado, nome_b)])
+            self._conexao.commit()
+            indice = self._indices.get(dominio_normalizado)
+            if indice is not None:
+                indice.adicionar(nome_a)
+                indice.adicionar(nome_b)
+
+    def propostas(self, dominio, afos):
+        """
+        Respostas propostas para as perguntas da nova entrevista, a partir das validadas no
+        mesmo domínio. Retorna {(afo_a, afo_b, tipo_pergunta): proposta}, onde a proposta tem
+        resposta, opcoes_uni, id_entrevista, nome_processo, as AFOs originais e a similaridade.
+        Quando o mesmo par foi validado em várias entrevistas, vale a validação mais recente.
+        Cada nome conhecido corresponde a no máximo uma AFO da nova entrevista (a mais parecida),
+        para que várias AFOs não herdem as mesmas relações.
+        """
+        dominio_normalizado = normalizar_nome(dominio)
+        with self._lock:
+            indice = self._indice(dominio_normalizado)
+            afos_por_nome = {} # nome conhecido -> [(AFO da nova entrevista, similaridade)], com uma só AFO
+            for afo in afos:
+                encontrado = indice.mais_parecido(normalizar_nome(afo), self.limiar_similaridade)
+                if encontrado is None:
+                    continue
+                nome, similaridade = encontrado
+                if nome not in afos_por_nome or similaridade > afos_por_nome[nome][0][1]:
+                    afos_por_nome[nome] = [(afo, similaridade)]
+            # Só a validação mais recente de cada pergunta (no SQLite, as colunas vêm da linha do MAX)
+            nomes = json.dumps(list(afos_por_nome))
+            linhas = self._conexao.execute(
+                "SELECT afo_a, afo_b, tipo_pergunta, resposta, opcoes_uni, id_entrevista, nome_processo, "
+                "afo_a_original, afo_b_original, MAX(validado_em) FROM respostas_validadas "
+                "WHERE dominio = ? AND afo_a IN (SELECT value FROM json_each(?)) "
+                "AND afo_b IN (SELECT value FROM json_each(?)) "
+                "GROUP BY afo_a, afo_b, tipo_pergunta",
+                (dominio_normalizado, nomes, nomes),
+            ).fetchall()
+
+        propostas = {}
+        for (nome_a, nome_b, tipo_pergunta, resposta, opcoes_uni, id_entrevista, nome_processo,
+             afo_a_original, afo_b_original, _) in linhas:
+            for afo_a, similaridade_a in afos_por_nome[nome_a]:
+                for afo_b, similaridade_b in afos_por_nome[nome_b]:
+                    if afo_a == afo_b:
+                        continue
+                    propostas[(afo_a, afo_b, tipo_pergunta)] = {
+                        "resposta": resposta,
+                        "opcoes_uni": None if opcoes_uni is None else tuple(json.loads(opcoes_uni)),
+                        "id_entrevista": id_entrevista,
+                        "nome_processo": nome_processo,
+                        "afo_a_original": afo_a_original,
+                        "afo_b_original": afo_b_original,
+                        "similaridade": min(similaridade_a, similaridade_b),
+                    }
+        return propostas
+
+    def _indice(self, dominio_normalizado):
+        indice = self._indices.get(dominio_normalizado)
+        if indice is None:
+            indice = IndiceNgramas()
+            for (nome,) in self._conexao.execute("SELECT nome FROM afos WHERE dominio = ?", (dominio_normalizado,)):
+                indice.adicionar(nome)
+            self._indices[dominio_normalizado] = indice
+        return indice
@@ -0,0 +1,322 @@
+"""
+Benchmark e teste de carga da entrevista SBMN, sem interface e sem a API do Gemini.
+
+Conduz entrevistas com o mesmo motor, pré-busca, agendador e cache usados pelo app,
+contra um modelo falso configurável (latência, erros e distribuição das respostas).
+Cada passo do laço corresponde a um rerun do app após "Confirmar e Próxima Pergunta".
+Para cada quantidade de AFOs (e de sessões simultâneas) registra perguntas por minuto,
+latência por rerun, tempo em verificar_inconsistencia, tamanho do estado da sessão e o
+custo de gerar pares_pendentes. O resultado é gravado em JSON, para comparar execuções.
+
+Uso:
+    python benchmark_entrevista.py resultado.json
+    python benchmark_entrevista.py resultado.json --afos 10 50 --sessoes 20 --latencia 0.3 --taxa-erros 0.05
+    python benchmark_entrevista.py novo.json --comparar anterior.json
+"""
+import argparse
+import functools
+import hashlib
+import itertools
+import json
+import pickle
+import platform
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import motor_sbmn
+from agendador_llm import AgendadorLLM
+from cache_respostas import CacheRespostas
+from entrevistas_lote import interpretar_resposta
+from inconsistencias import DetectorInconsistencias
+from inferencia import MotorInferencia
+from pre_busca import PreBuscaPerguntas
+
+RESPOSTAS_UNI = ["apenas A", "apenas B", "ambos A e B", "apenas A e ambos"]
+
+
+class ErroModeloFalso(Exception):
+    code = 503 # Tratado como transitório pelo agendador, como um 5xx do Gemini
+
+
+class ModeloFalso:
+    """
+    Modelo de linguagem falso para benchmark. A latência, os erros e as respostas são
+    sorteados a partir do texto pedido e da semente, então execuções iguais se repetem.
+    """
+
+    def __init__(self, latencia=0.0, variacao_latencia=0.0, taxa_erros=0.0, prob_sim=0.5,
+                 dist_uni=(0.25, 0.25, 0.25, 0.25), semente=0):
+        self.nome_modelo = f"falso-{semente}"
+        self.latencia = latencia
+        self.variacao_latencia = variacao_latencia
+        self.taxa_erros = taxa_erros
+        self.prob_sim = prob_sim
+        self.dist_uni = dist_uni
+        self.semente = semente
+        self.chamadas = 0
+        self.erros = 0
+        self._tentativas = {} # texto -> número de chamadas já feitas com ele
+        self._lock = threading.Lock()
+
+    def _sorteio(self, *partes):
+        resumo = hashlib.sha256(":".join(str(parte) for parte in (self.semente,) + partes).encode("utf-8")).digest()
+        return int.from_bytes(resumo[:8], "big") / 2 ** 64
+
+    def _responder(self, pergunta, tipo):
+        sorteio = self._sorteio("resposta", pergunta)
+        if tipo != "UNI":
+            return "Sim" if sorteio < self.prob_sim else "Não"
+        acumulado = 0.0
+        for resposta, probabilidade in zip(RESPOSTAS_UNI, self.dist_uni):
+            acumulado += probabilidade
+            if sorteio < acumulado:
+                return resposta
+        return RESPOSTAS_UNI[-1]
+
+    def gerar(self, historico, esquema_json=None):
+        pergunta = historico[-1]["parts"][0]["text"]
+        with self._lock:
+            tentativa = self._tentativas.get(pergunta, 0)
+            self._tentativas[pergunta] = tentativa + 1
+            self.chamadas += 1
+        variacao = (2 * self._sorteio("latencia", pergunta, tentativa) - 1) * self.variacao_latencia
+        time.sleep(max(0.0, self.latencia + variacao))
+        if self._sorteio("erro", pergunta, tentativa) < self.taxa_erros:
+            with self._lock:
+                self.erros += 1
+            raise ErroModeloFalso("Erro simulado do modelo")
+        if esquema_json is not None:
+            return json.dumps({"respostas": [
+                {"id": item["id"], "resposta": self._responder(item["pergunta"], item["tipo"])}
+                for item in json.loads(pergunta)["perguntas"]
+            ]}, ensure_ascii=False)
+        tipo = "UNI" if "'apenas A'" in historico[0]["parts"][0]["text"] else "BINARIA"
+        return self._responder(pergunta, tipo)
+
+    def gerar_fluxo(self, historico):
+        yield self.gerar(historico)
+
+
+class DetectorCronometrado(DetectorInconsistencias):
+    """
+    Detector de inconsistências que acumula o tempo gasto em cada verificação.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.duracoes = []
+
+    def registrar(self, relacao, opcoes_uni=None):
+        inicio = time.perf_counter()
+        try:
+            return super().registrar(relacao, opcoes_uni)
+        finally:
+            self.duracoes.append(time.perf_counter() - inicio)
+
+
+def resumo_duracoes(duracoes, escala=1000.0):
+    """
+    Média, percentis e máximo de uma lista de durações em segundos (em ms, por padrão).
+    """
+    if not duracoes:
+        return {"n": 0}
+    ordenadas = sorted(duracoes)
+    percentil = lambda p: ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))] * escala
+    return {
+        "n": len(ordenadas),
+        "media": sum(ordenadas) / len(ordenadas) * escala,
+        "p50": percentil(0.50),
+        "p95": percentil(0.95),
+        "p99": percentil(0.99),
+        "max": ordenadas[-1] * escala,
+    }
+
+def medir_pares_pendentes(afos):
+    """
+    Tempo e memória da geração de pares_pendentes, como em iniciar_entrevista.
+    """
+    inicio = time.perf_counter()
+    pares = list(itertools.permutations(afos, 2))
+    duracao = time.perf_counter() - inicio
+    tamanho = sys.getsizeof(pares) + sum(sys.getsizeof(par) for par in pares)
+    return {"pares": len(pares), "tempo_ms": duracao * 1000, "bytes": tamanho}
+
+def executar_sessao(numero, afos, agendador, cache, profundidade, max_perguntas):
+    """
+    Uma entrevista, do início até o fim ou até `max_perguntas` perguntas ao especialista.
+    Segue o fluxo do app: atualiza a pré-busca, espera a resposta atual e aplica a validação.
+    """
+    nome, dominio = f"Processo {numero}", "Benchmark"
+    estado = motor_sbmn.EstadoEntrevista()
+    motor_sbmn.iniciar_entrevista(estado, nome, dominio, afos)
+    estado.detector_inconsistencias = DetectorCronometrado()
+    estado.motor_inferencia = MotorInferencia(estado.detector_inconsistencias.dependencias)
+    motor_sbmn.aplicar_respostas_inferidas(estado)
+
+    especialista = motor_sbmn.EspecialistaIA(agendador.para_sessao(numero), cache=cache)
+    pre_busca = PreBuscaPerguntas(functools.partial(especialista.consultar_futuro, nome, dominio),
+                                  motor_sbmn.formular_pergunta, profundidade=profundidade)
+    pular = lambda a, b, tipo: estado.motor_inferencia.resposta_inferida(a, b, tipo) is not None
+
+    reruns, falhas, sem_resposta = [], 0, 0
+    while len(reruns) < max_perguntas:
+        atual = motor_sbmn.pergunta_atual(estado)
+        if atual is None:
+            break
+        afo_a, afo_b, tipo = atual
+        inicio = time.perf_counter()
+        pre_busca.atualizar(estado.pares_pendentes, estado.indice_par_atual, tipo, pular=pular)
+        try:
+            resposta_ia = pre_busca.obter(afo_a, afo_b, tipo)
+        except Exception:
+            falhas += 1 # No app o analista valida sem a resposta da IA
+            resposta_ia = ""
+        resposta, opcoes_uni = interpretar_resposta(resposta_ia, tipo, afo_a, afo_b)
+        if resposta is None:
+            sem_resposta += 1 # Como na CLI em lote, nenhuma resposta é inventada
+            motor_sbmn.pular_pergunta(estado)
+        else:
+            motor_sbmn.aplicar_resposta_confirmada(estado, {
+                "indice_par": estado.indice_par_atual, "tipo_pergunta": tipo, "resposta_ia": resposta_ia,
+                "resposta": resposta, "observacao": "", "opcoes_uni": opcoes_uni,
+            })
+        reruns.append(time.perf_counter() - inicio)
+    pre_busca.cancelar_tudo()
+
+    return {
+        "reruns": reruns,
+        "verificacoes": estado.detector_inconsistencias.duracoes,
+        "falhas": falhas,
+        "sem_resposta": sem_resposta,
+        "relacoes": len(estado.relacoes),
+        "inferidas": len([r for r in estado.relacoes if r["origem"] == "inferido"]),
+        "inconsistencias": len(estado.detector_inconsistencias.inconsistencias),
+        "estado_bytes": len(pickle.dumps(vars(estado), protocol=pickle.HIGHEST_PROTOCOL)),
+    }
+
+def executar_cenario(quantidade_afos, sessoes, argumentos):
+    """
+    Executa `sessoes` entrevistas simultâneas com `quantidade_afos` AFOs cada, compartilhando
+    o agendador e o cache, como as sessões de um mesmo servidor.
+    """
+    afos = [f"Atividade {i}" for i in range(quantidade_afos)]
+    modelo = ModeloFalso(argumentos.latencia, argumentos.variacao_latencia, argumentos.taxa_erros,
+                         argumentos.prob_sim, tuple(argumentos.dist_uni), argumentos.semente)
+    agendador = AgendadorLLM(modelo, requisicoes_por_minuto=argumentos.rpm, rajada=argumentos.rpm,
+                             max_em_voo=argumentos.max_em_voo, espera_inicial=argumentos.espera_inicial)
+
+    with tempfile.TemporaryDirectory() as diretorio_cache:
+        cache = None if argumentos.sem_cache else CacheRespostas(diretorio_cache)
+        inicio = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=sessoes) as sessoes_em_paralelo:
+                resultados = list(sessoes_em_paralelo.map(
+                    lambda numero: executar_sessao(numero, afos, agendador, cache,
+                                                   argumentos.profundidade, argumentos.max_perguntas),
+                    range(sessoes),
+                ))
+            duracao = time.perf_counter() - inicio
+        finally:
+            # Cada cenário tem o seu agendador; as threads dele não devem sobrar para o próximo
+            agendador.encerrar()
+
+    perguntas = sum(len(r["reruns"]) for r in resultados)
+    verificacoes = [d for r in resultados for d in r["verificacoes"]]
+    return {
+        "afos": quantidade_afos,
+        "sessoes": sessoes,
+        "duracao_s": duracao,
+        "perguntas": perguntas,
+        "perguntas_por_minuto": perguntas / duracao * 60 if duracao else 0.0,
+        "rerun_ms": resumo_duracoes([d for r in resultados for d in r["reruns"]]),
+        "verificar_inconsistencia": {
+            "total_ms": sum(verificacoes) * 1000,
+            "por_chamada_us": resumo_duracoes(verificacoes, escala=1e6),
+        },
+        "estado_sessao_bytes": max(r["estado_bytes"] for r in resultados),
+        "pares_pendentes": medir_pares_pendentes(afos),
+        "relacoes": sum(r["relacoes"] for r in resultados),
+        "relacoes_inferidas": sum(r["inferidas"] for r in resultados),
+        "inconsistencias": sum(r["inconsistencias"] for r in resultados),
+        "chamadas_modelo": modelo.chamadas,
+        "erros_modelo": modelo.erros,
+        "falhas_apos_tentativas": sum(r["falhas"] for r in resultados),
+        "sem_resposta": sum(r["sem_resposta"] for r in resultados),
+    }
+
+def comparar(atual, anterior):
+    """
+    Variação percentual das métricas principais em relação a uma execução anterior.
+    """
+    cenarios_anteriores = {(c["afos"], c["sessoes"]): c for c in anterior["cenarios"]}
+    metricas = [
+        ("perguntas_por_minuto", lambda c: c["perguntas_por_minuto"]),
+        ("rerun_p95_ms", lambda c: c["rerun_ms"].get("p95")),
+        ("verificar_inconsistencia_ms", lambda c: c["verificar_inconsistencia"]["total_ms"]),
+        ("estado_sessao_bytes", lambda c: c["estado_sessao_bytes"]),
+        ("pares_pendentes_ms", lambda c: c["pares_pendentes"]["tempo_ms"]),
+    ]
+    linhas = []
+    for cenario in atual["cenarios"]:
+        base = cenarios_anteriores.get((cenario["afos"], cenario["sessoes"]))
+        if base is None:
+            continue
+        for nome, extrair in metricas:
+            novo, antigo = extrair(cenario), extrair(base)
+            if novo is None or not antigo:
+                continue
+            linhas.append(f"{cenario['afos']:>4} AFOs x {cenario['sessoes']:>3} sessões  {nome:<28} "
+                          f"{antigo:>12.2f} -> {novo:>12.2f} ({(novo - antigo) / antigo:+.1%})")
+    return linhas
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da entrevista SBMN com um modelo falso.")
+    parser.add_argument("saida", help="Arquivo JSON com os resultados")
+    parser.add_argument("--afos", type=int, nargs="+", default=[10, 50, 200, 500], help="Quantidades de AFOs")
+    parser.add_argument("--sessoes", type=int, nargs="+", default=[1], help="Sessões simultâneas por cenário")
+    parser.add_argument("--max-perguntas", type=int, default=2000,
+                        help="Limite de perguntas por sessão (as entrevistas grandes têm centenas de milhares)")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Latência média do modelo, em segundos")
+    parser.add_argument("--variacao-latencia", type=float, default=0.0, help="Variação máxima da latência (+/-)")
+    parser.add_argument("--taxa-erros", type=float, default=0.0, help="Fração das chamadas que falham (5xx)")
+    parser.add_argument("--prob-sim", type=float, default=0.5, help="Probabilidade de 'Sim' nas perguntas binárias")
+    parser.add_argument("--dist-uni", type=float, nargs=4, default=[0.25, 0.25, 0.25, 0.25],
+                        metavar=("APENAS_A", "APENAS_B", "AMBOS", "APENAS_A_E_AMBOS"),
+                        help="Distribuição das respostas da UNI")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--rpm", type=int, default=1_000_000, help="Limite de requisições por minuto do agendador")
+    parser.add_argument("--max-em-voo", type=int, default=8, help="Chamadas simultâneas ao modelo")
+    parser.add_argument("--espera-inicial", type=float, default=0.01, help="Espera antes da primeira nova tentativa")
+    parser.add_argument("--profundidade", type=int, default=4, help="Perguntas pré-buscadas à frente")
+    parser.add_argument("--sem-cache", action="store_true", help="Não usa o cache de respostas")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior, para mostrar a variação")
+    argumentos = parser.parse_args(argv)
+
+    cenarios = []
+    for quantidade_afos, sessoes in itertools.product(argumentos.afos, argumentos.sessoes):
+        cenario = executar_cenario(quantidade_afos, sessoes, argumentos)
+        cenarios.append(cenario)
+        print(f"{quantidade_afos:>4} AFOs x {sessoes:>3} sessões: {cenario['perguntas_por_minuto']:.0f} perguntas/min, "
+              f"rerun p95 {cenario['rerun_ms'].get('p95', 0):.2f} ms", file=sys.stderr)
+
+    resultado = {
+        "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "ambiente": {"python": platform.python_version(), "plataforma": platform.platform()},
+        "configuracao": {chave: valor for chave, valor in vars(argumentos).items() if chave not in ("saida", "comparar")},
+        "cenarios": cenarios,
+    }
+    with open(argumentos.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+
+    if argumentos.comparar:
+        with open(argumentos.comparar, encoding="utf-8") as arquivo:
+            for linha in comparar(resultado, json.load(arquivo)):
+                print(linha, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheRespostas:
+    """
+    Cache das respostas do especialista (IA) em dois níveis:
+    um LRU em memória e um SQLite em disco, ambos com expiração (TTL).
+    Assim cada pergunta vai para a API no máximo uma vez, mesmo entre
+    reruns do Streamlit, recarregamentos do navegador e entrevistas reiniciadas.
+    """
+
+    def __init__(self, diretorio, capacidade_memoria=1024, max_entradas_disco=50000,
+                 ttl_segundos=7 * 24 * 3600, intervalo_limpeza=100):
+        self.capacidade_memoria = capacidade_memoria
+        self.max_entradas_disco = max_entradas_disco
+        self.ttl_segundos = ttl_segundos
+        # A remoção por TTL e por tamanho no disco roda a cada `intervalo_limpeza` gravações,
+        # então o disco pode passar do limite em até esse número de entradas
+        self.intervalo_limpeza = max(1, intervalo_limpeza)
+        self._gravacoes_desde_limpeza = 0
+        self._memoria = OrderedDict() # chave -> (resposta, criado_em)
+        # O Streamlit atende cada sessão em uma thread própria, então todo acesso passa por este lock
+        self._lock = threading.Lock()
+
+        os.makedirs(diretorio, exist_ok=True)
+        self._conexao = sqlite3.connect(os.path.join(diretorio, "respostas.sqlite3"),
+                                        check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS respostas ("
+            "chave TEXT PRIMARY KEY, resposta TEXT NOT NULL, "
+            "criado_em REAL NOT NULL, acessado_em REAL NOT NULL)"
+        )
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_acessado_em ON respostas (acessado_em)")
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_criado_em ON respostas (criado_em)")
+        self._conexao.commit()
+
+    @staticmethod
+    def gerar_chave(nome_processo, dominio_processo, pergunta, tipo_pergunta, modelo):
+        """
+        Gera a chave do cache a partir de tudo que influencia a resposta da IA.
+        """
+        conteudo = json.dumps([nome_processo, dominio_processo, pergunta, tipo_pergunta, modelo],
+                              ensure_ascii=False)
+        return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+    def _expirado(self, criado_em, agora):
+        return self.ttl_segundos is not None and agora - criado_em > self.ttl_segundos
+
+    def obter(self, chave):
+        """
+        Retorna a resposta guardada para a chave, ou None se não existir ou tiver expirado.
+        """
+        agora = time.time()
+        with self._lock:
+            # 1º nível: memória
+            if chave in self._memoria:
+                resposta, criado_em = self._memoria[chave]
+                if not self._expirado(criado_em, agora):
+                    self._memoria.move_to_end(chave)
+                    return resposta
+                del self._memoria[chave]
+
+            # 2º nível: disco
+            linha = self._conexao.execute(
+                "SELECT resposta, criado_em FROM respostas WHERE chave = ?", (chave,)
+            ).fetchone()
+            if linha is None:
+                return None
+            resposta, criado_em = linha
+            if self._expirado(criado_em, agora):
+                self._conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+                self._conexao.commit()
+                return None
+            self._conexao.execute("UPDATE respostas SET acessado_em = ? WHERE chave = ?", (agora, chave))
+            self._conexao.commit()
+            self._guardar_em_memoria(chave, resposta, criado_em)
+            return resposta
+
+    def guardar(self, chave, resposta):
+        """
+        Guarda a resposta nos dois níveis e, a cada `intervalo_limpeza` gravações,
+        aplica a remoção por tamanho e por TTL no disco.
+        """
+        agora = time.time()
+        with self._lock:
+            self._guardar_em_memoria(chave, resposta, agora)
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO respostas (chave, resposta, criado_em, acessado_em) VALUES (?, ?, ?, ?)",
+                (chave, resposta, agora, agora),
+            )
+            self._gravacoes_desde_limpeza += 1
+            if self._gravacoes_desde_limpeza >= self.intervalo_limpeza:
+                self._remover_excedentes_disco(agora)
+                self._gravacoes_desde_limpeza = 0
+            self._conexao.commit()
+
+    def limpar(self):
+        """
+        Remove todas as respostas guardadas (memória e disco).
+        """
+        with self._lock:
+            self._memoria.clear()
+            self._conexao.execute("DELETE FROM respostas")
+            self._conexao.commit()
+
+    def _guardar_em_memoria(self, chave, resposta, criado_em):
+        self._memoria[chave] = (resposta, criado_em)
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.capacidade_memoria:
+            self._memoria.popitem(last=False) # Remove a entrada usada há mais tempo
+
+    def _remover_excedentes_disco(self, agora):
+        if self.ttl_segundos is not None:
+            self._conexao.execute("DELETE FROM respostas WHERE criado_em < ?", (agora - self.ttl_segundos,))
+        (total,) = self._conexao.execute("SELECT COUNT(*) FROM respostas").fetchone()
+        excedente = total - self.max_entradas_disco
+        if excedente > 0:
+            self._conexao.execute(
+                "DELETE FROM respostas WHERE chave IN "
+                "(SELECT chave FROM respostas ORDER BY acessado_em ASC LIMIT ?)",
+                (excedente,),
+            )
@@ -0,0 +1,90 @@
+import json
+
+# Esquema JSON exigido da IA no modo em lote (uma resposta por pergunta, identificada pelo id)
+ESQUEMA_RESPOSTA_LOTE = {
+    "type": "object",
+    "properties": {
+        "respostas": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "resposta": {"type": "string"},
+                },
+                "required": ["id", "resposta"],
+            },
+        },
+    },
+    "required": ["respostas"],
+}
+
+INSTRUCAO_LOTE = (
+    "Você receberá várias perguntas de uma só vez, numeradas por 'id'. "
+    "Para as perguntas dos tipos DEP_INICIAL, DEP_COMPLEMENTAR e XOR responda apenas 'Sim' ou 'Não'. "
+    "Para as perguntas do tipo UNI responda indicando quais das opções são possíveis: "
+    "'apenas A', 'apenas B', 'ambos A e B', ou uma combinação dessas (por exemplo, 'apenas A e ambos'). "
+    "Responda somente com um JSON no formato "
+    '{"respostas": [{"id": <id da pergunta>, "resposta": "<sua resposta>"}]}, '
+    "com exatamente uma resposta para cada pergunta."
+)
+
+
+def montar_pedido_lote(itens):
+    """
+    Monta o texto do pedido em lote a partir de uma lista de (pergunta, tipo).
+    O id de cada pergunta é a sua posição na lista.
+    """
+    perguntas = [
+        {"id": indice, "tipo": tipo, "pergunta": pergunta}
+        for indice, (pergunta, tipo) in enumerate(itens)
+    ]
+    return json.dumps({"perguntas": perguntas}, ensure_ascii=False)
+
+
+def normalizar_sim_nao(resposta):
+    """
+    Normaliza uma resposta binária para "Sim" ou "Não". Retorna None se não for possível.
+    """
+    texto = resposta.strip().strip(".!").strip().lower()
+    if texto == "sim":
+        return "Sim"
+    if texto in ("não", "nao"):
+        return "Não"
+    return None
+
+
+def interpretar_resposta_lote(texto, itens, afos):
+    """
+    Valida a resposta JSON da IA contra o esquema do lote.
+    `afos` traz o par (afo_a, afo_b) de cada item, para reconhecer as opções das respostas UNI.
+    Retorna um dicionário {posição do item: resposta} apenas com os itens válidos;
+    os itens ausentes ou malformados devem seguir pelo caminho de pergunta individual.
+    """
+    from motor_sbmn import extrair_opcoes_uni # motor_sbmn importa este módulo
+    try:
+        dados = json.loads(texto)
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(dados, dict) or not isinstance(dados.get("respostas"), list):
+        return {}
+
+    validas = {}
+    for item in dados["respostas"]:
+        if not isinstance(item, dict):
+            continue
+        indice, resposta = item.get("id"), item.get("resposta")
+        if isinstance(indice, bool) or not isinstance(indice, int) or not 0 <= indice < len(itens):
+            continue
+        if not isinstance(resposta, str) or not resposta.strip() or indice in validas:
+            continue
+        tipo = itens[indice][1]
+        if tipo == "UNI":
+            if not any(extrair_opcoes_uni(resposta, *afos[indice])):
+                continue # Nenhuma opção reconhecível: a resposta seria inútil no cache
+        else:
+            resposta = normalizar_sim_nao(resposta)
+            if resposta is None:
+                continue
+        validas[indice] = resposta.strip()
+    return validas
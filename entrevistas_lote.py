@@ -0,0 +1,293 @@
+"""
+Executa entrevistas SBMN sem interface, em paralelo, para um catálogo de processos.
+
+Cada linha do arquivo de entrada é um JSON {"nome_processo", "dominio_processo", "afos"}.
+As respostas do especialista (IA) são tomadas como validação provisória, a mesma máquina
+de estados e o mesmo motor de inferência do app são aplicados, e cada processo concluído
+vira uma linha no arquivo de saída (JSONL). Com o mesmo diretório de cache do app, as
+respostas pré-computadas são aproveitadas na entrevista e o analista só valida. Para isso o
+cache precisa caber todas elas até as entrevistas: um processo com N AFOs tem até 4·N·(N-1)
+perguntas, então ajuste --cache-max-entradas e --cache-ttl (e CACHE_MAX_ENTRADAS_DISCO e
+CACHE_TTL_SEGUNDOS nos secrets do app) ao tamanho do catálogo.
+Respostas que não começam com Sim/Não (ou sem nenhuma opção da UNI) não viram relação:
+ficam em "sem_resposta", para o analista responder.
+
+Uso:
+    python entrevistas_lote.py processos.jsonl resultados.jsonl --concorrencia 8
+    python entrevistas_lote.py processos.jsonl resultados.jsonl --backend simulado --parquet resultados.parquet
+    python entrevistas_lote.py processos.jsonl resultados.jsonl --cache-max-entradas 2000000 --cache-ttl 0
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import motor_sbmn
+from agendador_llm import AgendadorLLM
+from cache_respostas import CacheRespostas
+
+
+def chave_processo(processo):
+    return json.dumps([processo["nome_processo"], processo["dominio_processo"]], ensure_ascii=False)
+
+
+def interpretar_resposta(resposta_ia, tipo, afo_a, afo_b):
+    """
+    Converte a resposta livre da IA na validação provisória: retorna (resposta, opcoes_uni),
+    ou (None, None) se ela não começar com Sim/Não nem indicar alguma opção da UNI.
+    """
+    if tipo == "UNI":
+        opcoes_uni = motor_sbmn.extrair_opcoes_uni(resposta_ia, afo_a, afo_b)
+        if not any(opcoes_uni):
+            return None, None
+        return motor_sbmn.texto_opcoes_uni(afo_a, afo_b, opcoes_uni), opcoes_uni
+    return motor_sbmn.extrair_sim_nao(resposta_ia), None
+
+
+def executar_entrevista(especialista, processo, pares_por_lote=0):
+    """
+    Conduz uma entrevista completa usando as respostas da IA como validação provisória.
+    Com `pares_por_lote`, as perguntas de cada bloco de pares são pedidas em uma chamada só.
+    Retorna o registro do processo com as respostas, as que não puderam ser interpretadas
+    (e ficam para o analista), as relações e as inconsistências.
+    """
+    nome, dominio = processo["nome_processo"], processo["dominio_processo"]
+    estado = motor_sbmn.EstadoEntrevista()
+    motor_sbmn.iniciar_entrevista(estado, nome, dominio, processo["afos"])
+    motor_sbmn.aplicar_respostas_inferidas(estado)
+
+    respostas = []
+    sem_resposta = [] # Respostas da IA que não puderam ser interpretadas
+    inconsistencias = []
+    bloco_pedido = -1
+    while True:
+        atual = motor_sbmn.pergunta_atual(estado)
+        if atual is None:
+            break
+        afo_a, afo_b, tipo = atual
+
+        if pares_por_lote and estado.indice_par_atual // pares_por_lote != bloco_pedido:
+            bloco_pedido = estado.indice_par_atual // pares_por_lote
+            inicio = bloco_pedido * pares_por_lote
+            itens = [
+                (a, b, t)
+                for a, b in estado.pares_pendentes[inicio:inicio + pares_por_lote]
+                for t in motor_sbmn.TIPOS_PERGUNTA
+            ]
+            try:
+                especialista.consultar_lote(nome, dominio, itens)
+            except Exception:
+                pass # As perguntas seguem pelo caminho individual
+
+        pergunta = motor_sbmn.formular_pergunta(afo_a, afo_b, tipo)
+        resposta_ia = especialista.consultar(nome, dominio, pergunta, tipo)
+        respostas.append({
+            "afo_a": afo_a, "afo_b": afo_b, "tipo_pergunta": tipo,
+            "pergunta": pergunta, "resposta_ia": resposta_ia,
+        })
+        resposta, opcoes_uni = interpretar_resposta(resposta_ia, tipo, afo_a, afo_b)
+        if resposta is None:
+            # Sem Sim/Não ou opções reconhecíveis nada é registrado: a pergunta fica para o analista
+            sem_resposta.append(respostas[-1])
+            inconsistencias += motor_sbmn.pular_pergunta(estado)
+            continue
+        evento = {
+            "indice_par": estado.indice_par_atual, "tipo_pergunta": tipo, "resposta_ia": resposta_ia,
+            "resposta": resposta, "observacao": "", "opcoes_uni": opcoes_uni,
+        }
+        inconsistencias += motor_sbmn.aplicar_resposta_confirmada(estado, evento, origem="especialista")
+
+    return {
+        "nome_processo": nome,
+        "dominio_processo": dominio,
+        "afos": processo["afos"],
+        "modelo": especialista.backend.nome_modelo,
+        "respostas": respostas,
+        "sem_resposta": sem_resposta,
+        "relacoes": estado.relacoes.como_lista(),
+        "inconsistencias": inconsistencias,
+    }
+
+
+def ler_concluidos(caminho_saida):
+    """
+    Processos já presentes na saída (para retomar uma execução interrompida).
+    Uma última linha incompleta é ignorada e o processo correspondente é refeito.
+    """
+    concluidos = set()
+    if not os.path.exists(caminho_saida):
+        return concluidos
+    with open(caminho_saida, encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            try:
+                concluidos.add(chave_processo(json.loads(linha)))
+            except (ValueError, KeyError):
+                continue
+    return concluidos
+
+
+def reparar_final_da_saida(caminho_saida):
+    """
+    Remove uma última linha incompleta (execução interrompida durante a escrita),
+    para que os próximos resultados não sejam acrescentados colados a ela.
+    """
+    if not os.path.exists(caminho_saida):
+        return
+    with open(caminho_saida, "r+b") as arquivo:
+        conteudo = arquivo.read()
+        if conteudo and not conteudo.endswith(b"\n"):
+            arquivo.truncate(conteudo.rfind(b"\n") + 1)
+
+
+def ler_processos(caminho_entrada, concluidos):
+    with open(caminho_entrada, encoding="utf-8") as arquivo:
+        for numero, linha in enumerate(arquivo, start=1):
+            if not linha.strip():
+                continue
+            processo = json.loads(linha)
+            if not all(chave in processo for chave in ("nome_processo", "dominio_processo", "afos")):
+                raise ValueError(f"Linha {numero}: esperado nome_processo, dominio_processo e afos")
+            if chave_processo(processo) not in concluidos:
+                yield processo
+
+
+def executar_lote(especialista, caminho_entrada, caminho_saida, concorrencia=4, pares_por_lote=0,
+                  ao_concluir=None):
+    """
+    Executa as entrevistas do arquivo de entrada com no máximo `concorrencia` em paralelo,
+    acrescentando cada resultado à saída assim que fica pronto. Processos já presentes
+    na saída são pulados. Retorna (concluídos, falhas).
+    """
+    reparar_final_da_saida(caminho_saida)
+    concluidos = ler_concluidos(caminho_saida)
+    processos = ler_processos(caminho_entrada, concluidos)
+    total_ok, falhas = 0, []
+
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor, \
+            open(caminho_saida, "a", encoding="utf-8") as saida:
+        em_andamento = {}
+        while True:
+            # A entrada é lida aos poucos: no máximo 2x a concorrência fica na fila
+            while len(em_andamento) < 2 * concorrencia:
+                processo = next(processos, None)
+                if processo is None:
+                    break
+                futuro = executor.submit(executar_entrevista, especialista, processo, pares_por_lote)
+                em_andamento[futuro] = processo
+            if not em_andamento:
+                break
+
+            prontos, _ = wait(em_andamento, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                processo = em_andamento.pop(futuro)
+                try:
+                    resultado = futuro.result()
+                except Exception as e:
+                    falhas.append((processo["nome_processo"], str(e)))
+                    continue
+                # Só esta thread escreve na saída; cada linha é um processo concluído
+                saida.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+                saida.flush()
+                total_ok += 1
+                if ao_concluir is not None:
+                    ao_concluir(resultado)
+    return total_ok, falhas
+
+
+def exportar_parquet(caminho_jsonl, caminho_parquet):
+    """
+    Converte a saída em uma tabela Parquet com uma linha por pergunta respondida.
+    Requer o pyarrow instalado.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Para exportar em Parquet instale o pyarrow (pip install pyarrow).")
+
+    escritor = None
+    with open(caminho_jsonl, encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            try:
+                resultado = json.loads(linha)
+            except ValueError:
+                continue
+            linhas = [
+                dict(resposta, nome_processo=resultado["nome_processo"],
+                     dominio_processo=resultado["dominio_processo"], modelo=resultado["modelo"])
+                for resposta in resultado["respostas"]
+            ]
+            if not linhas:
+                continue
+            tabela = pa.Table.from_pylist(linhas)
+            if escritor is None:
+                escritor = pq.ParquetWriter(caminho_parquet, tabela.schema)
+            escritor.write_table(tabela)
+    if escritor is not None:
+        escritor.close()
+
+
+def criar_backend(argumentos):
+    if argumentos.backend == "simulado":
+        return motor_sbmn.BackendSimulado(semente=argumentos.semente)
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        raise SystemExit("Defina a variável de ambiente GEMINI_API_KEY para usar o Gemini.")
+    backend = motor_sbmn.BackendGemini(argumentos.modelo, api_key=api_key)
+    # As entrevistas em paralelo dividem a cota: taxa limitada e novas tentativas em 429/5xx
+    return AgendadorLLM(backend, requisicoes_por_minuto=argumentos.rpm, max_em_voo=argumentos.concorrencia)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Executa entrevistas SBMN em lote, sem interface.")
+    parser.add_argument("entrada", help="JSONL com nome_processo, dominio_processo e afos por linha")
+    parser.add_argument("saida", help="JSONL de resultados (também usado para retomar a execução)")
+    parser.add_argument("--concorrencia", type=int, default=4, help="Entrevistas em paralelo (padrão: 4)")
+    parser.add_argument("--backend", choices=["gemini", "simulado"], default="gemini")
+    parser.add_argument("--modelo", default="gemini-2.0-flash", help="Modelo do Gemini")
+    parser.add_argument("--rpm", type=int, default=60, help="Requisições por minuto ao Gemini (padrão: 60)")
+    parser.add_argument("--semente", type=int, default=0, help="Semente do backend simulado")
+    parser.add_argument("--cache-dir", default=".cache_sbmn",
+                        help="Diretório do cache de respostas (o mesmo do app, para reaproveitá-las)")
+    parser.add_argument("--sem-cache", action="store_true", help="Não usa o cache de respostas")
+    parser.add_argument("--cache-max-entradas", type=int, default=50000,
+                        help="Máximo de respostas no cache em disco (padrão: 50000, o mesmo do app)")
+    parser.add_argument("--cache-ttl", type=int, default=7 * 24 * 3600,
+                        help="Validade das respostas no cache, em segundos (0: não expiram; padrão: 7 dias)")
+    parser.add_argument("--lote-pares", type=int, default=0,
+                        help="Pede as perguntas de N pares em uma única chamada (0 desativa)")
+    parser.add_argument("--parquet", help="Também exporta as respostas para este arquivo Parquet")
+    argumentos = parser.parse_args(argv)
+
+    cache = None
+    if not argumentos.sem_cache:
+        cache = CacheRespostas(argumentos.cache_dir, max_entradas_disco=argumentos.cache_max_entradas,
+                               ttl_segundos=argumentos.cache_ttl or None)
+    especialista = motor_sbmn.EspecialistaIA(criar_backend(argumentos), cache=cache)
+    perguntas = 0
+
+    def ao_concluir(resultado):
+        nonlocal perguntas
+        perguntas += len(resultado["respostas"])
+        print(f"Concluído: {resultado['nome_processo']} ({len(resultado['respostas'])} perguntas, "
+              f"{len(resultado['sem_resposta'])} sem resposta reconhecível)", file=sys.stderr)
+
+    total_ok, falhas = executar_lote(
+        especialista, argumentos.entrada, argumentos.saida,
+        concorrencia=argumentos.concorrencia, pares_por_lote=argumentos.lote_pares, ao_concluir=ao_concluir,
+    )
+    for nome, erro in falhas:
+        print(f"Falha: {nome}: {erro}", file=sys.stderr)
+    print(f"{total_ok} processo(s) concluído(s), {len(falhas)} falha(s).", file=sys.stderr)
+    if cache is not None and perguntas > argumentos.cache_max_entradas:
+        print(f"Aviso: {perguntas} perguntas para um cache de {argumentos.cache_max_entradas} entradas; "
+              "as mais antigas já foram removidas (aumente --cache-max-entradas).", file=sys.stderr)
+
+    if argumentos.parquet:
+        exportar_parquet(argumentos.saida, argumentos.parquet)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
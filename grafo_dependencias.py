@@ -0,0 +1,75 @@
+import collections
+
+
+class GrafoDependencias:
+    """
+    Fecho transitivo das dependências estritas (DEP) entre AFOs, mantido de forma incremental.
+    Uma aresta origem -> destino significa que o destino só ocorre se a origem tiver ocorrido.
+    Só as arestas diretas guardam o id da relação; o caminho (os ids das relações) que justifica
+    um par alcançável é reconstruído sob demanda, apenas quando vai ser mostrado.
+    """
+
+    def __init__(self):
+        self._arestas = {} # origem -> {destino: id da relação DEP}
+        self._ancestrais = {} # afo -> conjunto de AFOs das quais depende (direta ou indiretamente)
+        self._descendentes = {} # afo -> conjunto de AFOs que dependem dela (direta ou indiretamente)
+
+    def alcanca(self, x, y):
+        """
+        Indica se y depende (direta ou indiretamente) de x.
+        """
+        return y in self._descendentes.get(x, ())
+
+    def ancestrais(self, afo):
+        return self._ancestrais.get(afo, set())
+
+    def descendentes(self, afo):
+        return self._descendentes.get(afo, set())
+
+    def caminho(self, x, y):
+        """
+        Ids das relações no caminho mais curto x -> ... -> y (lista vazia se x == y ou não houver caminho).
+        A busca em largura só segue AFOs que alcançam y, então visita apenas os caminhos até y.
+        """
+        if x == y or not self.alcanca(x, y):
+            return []
+        anterior = {x: None} # afo -> (afo anterior no caminho, id da aresta)
+        fila = collections.deque([x])
+        while fila and y not in anterior:
+            a = fila.popleft()
+            for b, id_relacao in self._arestas.get(a, {}).items():
+                if b not in anterior and (b == y or self.alcanca(b, y)):
+                    anterior[b] = (a, id_relacao)
+                    fila.append(b)
+        if y not in anterior:
+            return []
+        resultado = []
+        while anterior[y] is not None:
+            y, id_relacao = anterior[y]
+            resultado.append(id_relacao)
+        resultado.reverse()
+        return resultado
+
+    def adicionar(self, origem, destino, id_relacao):
+        """
+        Adiciona a aresta origem -> destino e retorna a lista de (x, novos) com, para cada x
+        que passou a alcançar outras AFOs, o conjunto dessas AFOs.
+        Todo x que alcança a origem passa a alcançar todo y alcançado pelo destino; as
+        diferenças e uniões são feitas por conjunto, sem percorrer os pares um a um em Python.
+        """
+        self._arestas.setdefault(origem, {})[destino] = id_relacao
+        antes = self._ancestrais.get(origem, set()) | {origem}
+        depois = self._descendentes.get(destino, set()) | {destino}
+        novos = []
+        for x in antes:
+            descendentes_x = self._descendentes.setdefault(x, set())
+            novos_x = depois - descendentes_x
+            novos_x.discard(x) # Ciclos não entram no fecho; quem chama os detecta antes
+            if novos_x:
+                descendentes_x |= novos_x
+                novos.append((x, novos_x))
+        for y in depois:
+            ancestrais_y = self._ancestrais.setdefault(y, set())
+            ancestrais_y |= antes
+            ancestrais_y.discard(y)
+        return novos
@@ -0,0 +1,156 @@
+from grafo_dependencias import GrafoDependencias
+
+
+class DetectorInconsistencias:
+    """
+    Detector incremental de inconsistências SBMN sobre o grafo de dependências das AFOs.
+    Cada relação confirmada atualiza o fecho transitivo das DEP estritas e só os
+    pares afetados são verificados, sem recalcular o modelo inteiro. Detecta:
+
+    - Ciclo de dependência: A -> B -> ... -> A, nenhuma delas pode começar.
+    - Operadores equivalentes: DEP estrita e XOR no mesmo par.
+    - Bloqueio de dependência indireta: C depende (por uma cadeia de DEP) de A, mas A XOR C.
+    - Dependência dual: C depende de A e de B, mas A XOR B.
+    - Promiscuidade: o par é XOR, mas a UNI indica que ambos podem ocorrer juntos.
+
+    Cada inconsistência traz os ids do conjunto mínimo de relações que a causam.
+    O grafo `dependencias` é o mesmo consultado pelo MotorInferencia; só o detector o atualiza.
+    """
+
+    def __init__(self):
+        self.inconsistencias = [] # Todas as inconsistências encontradas, em ordem de detecção
+        self.dependencias = GrafoDependencias()
+        self._xor = {} # afo -> {afo exclusiva: id da relação XOR}
+        self._uni_ambos = {} # (afo, afo) ordenado por nome -> id da relação UNI com "ambos"
+        self._reportadas = set() # (tipo, AFOs envolvidas), para não repetir a mesma inconsistência
+
+    def registrar(self, relacao, opcoes_uni=None):
+        """
+        Atualiza o grafo com a relação confirmada e retorna a lista das novas inconsistências.
+        `opcoes_uni` é a tupla (apenas_a, apenas_b, ambos) das relações UNI/NÃO_UNI.
+        """
+        afo1, afo2, tipo, id_relacao = relacao["afo1"], relacao["afo2"], relacao["tipo"], relacao["id"]
+        novas = []
+        if tipo == "DEP":
+            novas = self._registrar_dep(afo1, afo2, id_relacao)
+        elif tipo == "XOR":
+            novas = self._registrar_xor(afo1, afo2, id_relacao)
+        elif tipo in ("UNI", "NÃO_UNI") and opcoes_uni is not None and opcoes_uni[2]:
+            par = tuple(sorted((afo1, afo2)))
+            self._uni_ambos.setdefault(par, id_relacao)
+            id_xor = self._xor.get(afo1, {}).get(afo2)
+            if id_xor is not None:
+                novas.append(self._promiscuidade(afo1, afo2, [id_xor, id_relacao]))
+        ineditas = []
+        for inconsistencia in novas:
+            chave = (inconsistencia["tipo"], frozenset(inconsistencia["afos"]))
+            if chave in self._reportadas:
+                continue
+            self._reportadas.add(chave)
+            # Caminhos que compartilham arestas não repetem a relação
+            inconsistencia["relacoes"] = list(dict.fromkeys(inconsistencia["relacoes"]))
+            ineditas.append(inconsistencia)
+        self.inconsistencias.extend(ineditas)
+        return ineditas
+
+    def _registrar_dep(self, origem, destino, id_relacao):
+        novas = []
+        # Ciclo: a origem já depende (direta ou indiretamente) do destino
+        if origem == destino or self.dependencias.alcanca(destino, origem):
+            ciclo = self.dependencias.caminho(destino, origem) + [id_relacao]
+            novas.append({
+                "tipo": "Ciclo de dependência",
+                "afos": [origem, destino],
+                "relacoes": ciclo,
+                "descricao": (
+                    f"As tarefas '{origem}' e '{destino}' fazem parte de um ciclo de dependências estritas: "
+                    "nenhuma tarefa do ciclo pode começar, pois cada uma espera pela outra."
+                ),
+            })
+
+        # Só as AFOs com alguma XOR precisam ser verificadas, e por conjunto (não par a par)
+        for x, novos_x in self.dependencias.adicionar(origem, destino, id_relacao):
+            for z, id_xor in self._xor.get(x, {}).items():
+                # z passou a depender de x, mas x e z não podem ocorrer juntas
+                if z in novos_x:
+                    novas.append(self._bloqueio(x, z, self.dependencias.caminho(x, z) + [id_xor]))
+                # y passou a depender de x e também depende de z, mas x e z não podem ocorrer juntas
+                for y in novos_x & self.dependencias.descendentes(z):
+                    if self._dual_reportada(y, x, z):
+                        continue
+                    novas.append(self._dependencia_dual(
+                        y, x, z, self.dependencias.caminho(x, y) + self.dependencias.caminho(z, y) + [id_xor]
+                    ))
+        return novas
+
+    def _registrar_xor(self, afo1, afo2, id_relacao):
+        if afo2 in self._xor.get(afo1, {}):
+            return [] # Par já registrado como XOR
+        self._xor.setdefault(afo1, {})[afo2] = id_relacao
+        self._xor.setdefault(afo2, {})[afo1] = id_relacao
+
+        novas = []
+        for x, y in ((afo1, afo2), (afo2, afo1)):
+            if self.dependencias.alcanca(x, y):
+                novas.append(self._bloqueio(x, y, self.dependencias.caminho(x, y) + [id_relacao]))
+        # Toda AFO que depende das duas nunca poderá ocorrer
+        descendentes_1 = self.dependencias.descendentes(afo1)
+        descendentes_2 = self.dependencias.descendentes(afo2)
+        menor, maior = sorted((descendentes_1, descendentes_2), key=len)
+        for y in menor:
+            if y in maior and y not in (afo1, afo2) and not self._dual_reportada(y, afo1, afo2):
+                novas.append(self._dependencia_dual(
+                    y, afo1, afo2,
+                    self.dependencias.caminho(afo1, y) + self.dependencias.caminho(afo2, y) + [id_relacao],
+                ))
+        id_uni = self._uni_ambos.get(tuple(sorted((afo1, afo2))))
+        if id_uni is not None:
+            novas.append(self._promiscuidade(afo1, afo2, [id_relacao, id_uni]))
+        return novas
+
+    def _bloqueio(self, x, y, relacoes):
+        if len(relacoes) == 2:
+            return {
+                "tipo": "Equivalent Operators",
+                "afos": [x, y],
+                "relacoes": relacoes,
+                "descricao": (
+                    f"As tarefas '{x}' e '{y}' possuem uma Dependência Estrita E uma Não-Coexistência (XOR). "
+                    "Isso significa que uma depende da outra E elas não podem ocorrer juntas, o que é contraditório."
+                ),
+            }
+        return {
+            "tipo": "Bloqueio de dependência indireta",
+            "afos": [x, y],
+            "relacoes": relacoes,
+            "descricao": (
+                f"A tarefa '{y}' depende indiretamente de '{x}', mas as duas não podem ocorrer juntas (XOR): "
+                f"'{y}' nunca poderá ocorrer."
+            ),
+        }
+
+    def _dual_reportada(self, y, x, z):
+        # Verificada antes de montar os caminhos, que são a parte cara de cada inconsistência
+        return ("Dependência dual", frozenset((y, x, z))) in self._reportadas
+
+    def _dependencia_dual(self, y, x, z, relacoes):
+        return {
+            "tipo": "Dependência dual",
+            "afos": [y, x, z],
+            "relacoes": relacoes,
+            "descricao": (
+                f"A tarefa '{y}' depende de '{x}' e de '{z}', mas '{x}' e '{z}' não podem ocorrer juntas (XOR): "
+                f"'{y}' nunca poderá ocorrer."
+            ),
+        }
+
+    def _promiscuidade(self, afo1, afo2, relacoes):
+        return {
+            "tipo": "Promiscuidade",
+            "afos": [afo1, afo2],
+            "relacoes": relacoes,
+            "descricao": (
+                f"As tarefas '{afo1}' e '{afo2}' foram marcadas como exclusivas (XOR), "
+                "mas na União Inclusiva (UNI) foi indicado que ambas podem ocorrer juntas."
+            ),
+        }
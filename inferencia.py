@@ -0,0 +1,68 @@
+class MotorInferencia:
+    """
+    Motor de inferência baseado em regras sobre as relações SBMN já validadas.
+    A cada relação registrada, deduz as respostas de perguntas futuras que já
+    estão determinadas, para que não sejam feitas ao analista nem à IA:
+
+    - XOR é simétrica: a resposta de (A, B) vale também para (B, A).
+    - UNI é espelhada: "apenas A" em (A, B) é "apenas B" em (B, A).
+    - DEP estrita A -> B (B só ocorre se A ocorreu) impede DEP estrita B -> A,
+      e A e B podem ocorrer juntas (não há XOR entre elas).
+    - Cadeias de DEP estritas A -> B -> C implicam coexistência de A e C
+      (e, pelo mesmo motivo, C -> A não pode ser estrita).
+
+    As respostas simétricas (XOR e UNI) são guardadas com os ids das relações que as
+    justificam. As deduzidas das cadeias de DEP não são guardadas par a par: são lidas do
+    fecho transitivo na consulta, e o caminho que as justifica só é montado em `justificativa`.
+    O fecho é o grafo `dependencias` do DetectorInconsistencias, que o atualiza a cada DEP
+    registrada; o motor só o consulta, então ele é calculado e guardado uma única vez.
+    """
+
+    def __init__(self, dependencias):
+        self.respostas_inferidas = {} # (afo_a, afo_b, tipo_pergunta) -> (resposta, [ids das relações])
+        self._dependencias = dependencias # GrafoDependencias compartilhado com o detector
+
+    def resposta_inferida(self, afo_a, afo_b, tipo_pergunta):
+        """
+        Retorna a resposta se a pergunta já estiver determinada, ou None.
+        Para UNI a resposta é a tupla (apenas_a, apenas_b, ambos).
+        """
+        inferida = self.respostas_inferidas.get((afo_a, afo_b, tipo_pergunta))
+        if inferida is not None:
+            return inferida[0]
+        if tipo_pergunta == "XOR" and (self._dependencias.alcanca(afo_a, afo_b)
+                                       or self._dependencias.alcanca(afo_b, afo_a)):
+            return "Sim" # Uma depende estritamente da outra: coexistem
+        if tipo_pergunta == "DEP_COMPLEMENTAR" and self._dependencias.alcanca(afo_b, afo_a):
+            return "Não" # afo_a depende estritamente de afo_b, então afo_b -> afo_a não pode ser estrita
+        return None
+
+    def justificativa(self, afo_a, afo_b, tipo_pergunta):
+        """
+        Ids das relações das quais a resposta inferida foi deduzida (só chamada quando ela é usada).
+        """
+        inferida = self.respostas_inferidas.get((afo_a, afo_b, tipo_pergunta))
+        if inferida is not None:
+            return inferida[1]
+        if self._dependencias.alcanca(afo_a, afo_b):
+            return self._dependencias.caminho(afo_a, afo_b)
+        return self._dependencias.caminho(afo_b, afo_a)
+
+    def registrar(self, relacao, opcoes_uni=None):
+        """
+        Aplica as regras a uma relação recém registrada (validada pelo analista ou inferida).
+        `opcoes_uni` é a tupla (apenas_a, apenas_b, ambos) das relações UNI/NÃO_UNI.
+        """
+        afo1, afo2, tipo = relacao["afo1"], relacao["afo2"], relacao["tipo"]
+        ids = [relacao["id"]]
+
+        if tipo in ("XOR", "NÃO_XOR"):
+            self._inferir(afo2, afo1, "XOR", relacao["sua_validacao"], ids)
+        elif tipo in ("UNI", "NÃO_UNI") and opcoes_uni is not None:
+            apenas_a, apenas_b, ambos = opcoes_uni
+            self._inferir(afo2, afo1, "UNI", (apenas_b, apenas_a, ambos), ids)
+        # As DEP entram no grafo pelo detector; as perguntas que elas determinam são respondidas em `resposta_inferida`
+
+    def _inferir(self, afo_a, afo_b, tipo_pergunta, resposta, justificativa):
+        # A primeira dedução vale; as seguintes para a mesma pergunta são redundantes
+        self.respostas_inferidas.setdefault((afo_a, afo_b, tipo_pergunta), (resposta, justificativa))
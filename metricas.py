@@ -0,0 +1,203 @@
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Limites dos intervalos dos histogramas, em segundos (de 1 ms a 5 min)
+LIMITES_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+class Histograma:
+    """
+    Histograma com intervalos fixos, no formato do Prometheus (contagens acumuladas por limite).
+    Registrar um valor custa uma busca binária e dois incrementos.
+    """
+
+    __slots__ = ("limites", "contagens", "soma", "total")
+
+    def __init__(self, limites=LIMITES_SEGUNDOS):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1) # O último intervalo é o +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect.bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def quantil(self, q):
+        """
+        Estimativa do quantil por interpolação dentro do intervalo, como o histogram_quantile do Prometheus.
+        """
+        if not self.total:
+            return None
+        alvo = q * self.total
+        acumulado = 0
+        for indice, contagem in enumerate(self.contagens):
+            if acumulado + contagem >= alvo and contagem:
+                inicio = self.limites[indice - 1] if indice else 0.0
+                if indice == len(self.limites):
+                    return inicio # Acima do último limite não há como interpolar
+                return inicio + (self.limites[indice] - inicio) * (alvo - acumulado) / contagem
+            acumulado += contagem
+        return self.limites[-1]
+
+
+class RegistroMetricas:
+    """
+    Métricas do processo (contadores e histogramas com rótulos), compartilhadas pelas sessões.
+    O custo de registrar é de poucos microssegundos, para ficar sempre ligado em produção.
+    Exporta no formato de texto do Prometheus e em JSON lines.
+    """
+
+    def __init__(self):
+        self._contadores = {} # (nome, rótulos) -> valor
+        self._histogramas = {} # (nome, rótulos) -> Histograma
+        self._lock = threading.Lock()
+
+    def incrementar(self, nome, valor=1, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def observar(self, nome, valor, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = Histograma()
+            histograma.observar(valor)
+
+    def cronometrar(self, nome, **rotulos):
+        """
+        Gerenciador de contexto que registra a duração do bloco no histograma `nome`.
+        """
+        return _Cronometro(self, nome, rotulos)
+
+    def contadores(self):
+        with self._lock:
+            return {chave: valor for chave, valor in self._contadores.items()}
+
+    def histogramas(self):
+        """
+        Cópia dos histogramas, para exibição sem segurar o lock.
+        """
+        with self._lock:
+            copias = {}
+            for chave, histograma in self._histogramas.items():
+                copia = Histograma(histograma.limites)
+                copia.contagens = list(histograma.contagens)
+                copia.soma, copia.total = histograma.soma, histograma.total
+                copias[chave] = copia
+            return copias
+
+    def como_prometheus(self):
+        """
+        Todas as métricas no formato de texto de exposição do Prometheus.
+        """
+        linhas, declaradas = [], set()
+        for (nome, rotulos), valor in sorted(self.contadores().items()):
+            if nome not in declaradas:
+                declaradas.add(nome)
+                linhas.append(f"# TYPE {nome} counter")
+            linhas.append(f"{nome}{_formatar_rotulos(rotulos)} {valor}")
+        for (nome, rotulos), histograma in sorted(self.histogramas().items()):
+            if nome not in declaradas:
+                declaradas.add(nome)
+                linhas.append(f"# TYPE {nome} histogram")
+            acumulado = 0
+            for limite, contagem in zip(histograma.limites + (float("inf"),), histograma.contagens):
+                acumulado += contagem
+                le = "+Inf" if limite == float("inf") else repr(limite)
+                linhas.append(f"{nome}_bucket{_formatar_rotulos(rotulos + (('le', le),))} {acumulado}")
+            linhas.append(f"{nome}_sum{_formatar_rotulos(rotulos)} {histograma.soma}")
+            linhas.append(f"{nome}_count{_formatar_rotulos(rotulos)} {histograma.total}")
+        return "\n".join(linhas) + "\n"
+
+    def como_jsonl(self):
+        """
+        Gera uma linha JSON por série (contador ou histograma), com o instante da coleta.
+        """
+        instante = time.time()
+        for (nome, rotulos), valor in sorted(self.contadores().items()):
+            yield json.dumps({"instante": instante, "metrica": nome, "rotulos": dict(rotulos),
+                              "tipo": "contador", "valor": valor}, ensure_ascii=False) + "\n"
+        for (nome, rotulos), histograma in sorted(self.histogramas().items()):
+            yield json.dumps({
+                "instante": instante, "metrica": nome, "rotulos": dict(rotulos), "tipo": "histograma",
+                "total": histograma.total, "soma": histograma.soma,
+                "limites": list(histograma.limites), "contagens": histograma.contagens,
+            }, ensure_ascii=False) + "\n"
+
+
+class _Cronometro:
+    __slots__ = ("registro", "nome", "rotulos", "inicio")
+
+    def __init__(self, registro, nome, rotulos):
+        self.registro = registro
+        self.nome = nome
+        self.rotulos = rotulos
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excecao):
+        self.registro.observar(self.nome, time.perf_counter() - self.inicio, **self.rotulos)
+
+
+def _formatar_rotulos(rotulos):
+    if not rotulos:
+        return ""
+    return "{" + ",".join(f'{chave}="{_escapar(valor)}"' for chave, valor in rotulos) + "}"
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Servidores já abertos, por (endereço, porta): o st.cache_resource recria o registro quando o
+# cache é limpo, e abrir a mesma porta de novo falharia com "address already in use"
+_servidores = {}
+_servidores_lock = threading.Lock()
+
+def servir_metricas(registro, porta, endereco="127.0.0.1"):
+    """
+    Servidor HTTP em segundo plano com /metrics (texto do Prometheus) e /metrics.jsonl.
+    Por padrão só atende conexões locais; as métricas não têm autenticação.
+    Se o processo já serve métricas no mesmo endereço e porta, o servidor existente passa
+    a servir o `registro` dado e é retornado.
+    """
+    with _servidores_lock:
+        servidor = _servidores.get((endereco, porta))
+        if servidor is not None:
+            servidor.registro = registro
+            return servidor
+
+        class Tratador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                atual = self.server.registro
+                if self.path == "/metrics":
+                    corpo, tipo = atual.como_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.jsonl":
+                    corpo, tipo = "".join(atual.como_jsonl()), "application/jsonl"
+                else:
+                    self.send_error(404)
+                    return
+                dados = corpo.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", f"{tipo}; charset=utf-8")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def log_message(self, *argumentos):
+                pass # Sem uma linha no log a cada coleta
+
+        servidor = ThreadingHTTPServer((endereco, porta), Tratador)
+        servidor.registro = registro
+        # Com a porta 0 o sistema escolhe a porta; ela é a que vale para as próximas chamadas
+        _servidores[(endereco, servidor.server_address[1])] = servidor
+        threading.Thread(target=servidor.serve_forever, name="metricas_http", daemon=True).start()
+        return servidor
@@ -0,0 +1,596 @@
+# Motor da entrevista SBMN, independente da interface.
+# Reúne a formulação das perguntas, a máquina de estados DEP_INICIAL -> DEP_COMPLEMENTAR
+# -> XOR -> UNI, o registro das relações e a consulta ao especialista (IA).
+# É usado pelo app Streamlit (com st.session_state como estado) e pela CLI em lote
+# (com EstadoEntrevista), e o modelo de linguagem é plugável (Gemini ou simulado).
+import hashlib
+import itertools
+import json
+import re
+import time
+from concurrent.futures import Future
+
+from agendador_llm import PRIORIDADE_ATUAL, encadear
+from cache_respostas import CacheRespostas
+from consulta_lote import ESQUEMA_RESPOSTA_LOTE, INSTRUCAO_LOTE, montar_pedido_lote, interpretar_resposta_lote
+from inconsistencias import DetectorInconsistencias
+from inferencia import MotorInferencia
+from repositorio_relacoes import RepositorioRelacoes
+
+# Ordem das perguntas SBMN feitas para cada par de AFOs
+TIPOS_PERGUNTA = ["DEP_INICIAL", "DEP_COMPLEMENTAR", "XOR", "UNI"]
+
+
+# --- Perguntas e Respostas ---
+
+def formular_pergunta(afo_a, afo_b, tipo_pergunta_sbm):
+    """
+    Formula a pergunta feita ao especialista (IA) para o par de AFOs e o tipo de relação SBMN.
+    """
+    if tipo_pergunta_sbm == "DEP_INICIAL":
+        return f"A tarefa '{afo_b}' depende de '{afo_a}' para ocorrer?"
+    elif tipo_pergunta_sbm == "DEP_COMPLEMENTAR":
+        return f"Essa dependência é obrigatória? Ou seja, '{afo_b}' só pode começar se '{afo_a}' tiver ocorrido?"
+    elif tipo_pergunta_sbm == "XOR":
+        return f"As tarefas '{afo_a}' e '{afo_b}' **podem ocorrer juntas** no mesmo fluxo de processo?"
+    elif tipo_pergunta_sbm == "UNI":
+        return (
+            f"Considerando as tarefas '{afo_a}' e '{afo_b}', por favor, me diga qual (ou quais) das seguintes situações são possíveis neste processo: \n"
+            f"- Apenas '{afo_a}' ocorre \n"
+            f"- Apenas '{afo_b}' ocorre \n"
+            f"- Ambos '{afo_a}' e '{afo_b}' ocorrem"
+        )
+    return ""
+
+def texto_opcoes_uni(afo_a, afo_b, opcoes_uni):
+    """
+    Converte as opções da UNI (apenas_a, apenas_b, ambos) na string usada para registro.
+    """
+    apenas_a, apenas_b, ambos = opcoes_uni
+    partes = []
+    if apenas_a:
+        partes.append(f"Apenas {afo_a}")
+    if apenas_b:
+        partes.append(f"Apenas {afo_b}")
+    if ambos:
+        partes.append(f"Ambos {afo_a} e {afo_b}")
+    return ", ".join(partes) if partes else "Nenhuma das opções selecionadas"
+
+def extrair_sim_nao(texto):
+    """
+    Extrai "Sim" ou "Não" do início da resposta livre da IA. Retorna None se não for possível.
+    """
+    palavra = re.match(r"\W*(\w+)", texto or "")
+    if palavra is None:
+        return None
+    palavra = palavra.group(1).lower()
+    if palavra == "sim":
+        return "Sim"
+    if palavra in ("não", "nao"):
+        return "Não"
+    return None
+
+# Palavras que negam a opção citada na mesma oração ("ambas nunca ocorrem", "não apenas B")
+_NEGACAO = re.compile(r"\b(?:não|nao|nunca|jamais|nem|impossível|impossivel)\b", re.IGNORECASE)
+# Fim de oração: vírgula, ponto e vírgula, dois-pontos, ponto final, "!", "?", quebra de linha ou "mas"
+_FIM_ORACAO = re.compile(r"[,;:!?\n]|\.(?=\s|$)|\bmas\b", re.IGNORECASE)
+_AMBOS = re.compile(r"\b(?:ambos|ambas)\b", re.IGNORECASE)
+
+def _padrao_apenas(afo, letra):
+    # "apenas A" com a letra maiúscula da instrução (não o artigo "a") ou "apenas <nome da AFO>",
+    # com ou sem aspas e com ou sem "a tarefa" antes do nome
+    return re.compile(
+        rf"(?i:\b(?:apenas|somente|só)\s+)(?:['\"]?{letra}(?!\w)['\"]?|"
+        rf"(?i:(?:(?:a|o)\s+(?:tarefa|atividade|evento)\s+)?['\"]?{re.escape(afo)}(?!\w)['\"]?))"
+    )
+
+def _citada_sem_negacao(padrao, texto):
+    """
+    Indica se alguma ocorrência do padrão está em uma oração sem palavra de negação.
+    """
+    for ocorrencia in padrao.finditer(texto):
+        inicio = max((m.end() for m in _FIM_ORACAO.finditer(texto, 0, ocorrencia.start())), default=0)
+        fim = _FIM_ORACAO.search(texto, ocorrencia.end())
+        oracao = texto[inicio:ocorrencia.start()] + " " + texto[ocorrencia.end():fim.start() if fim else len(texto)]
+        if _NEGACAO.search(oracao) is None:
+            return True
+    return False
+
+def extrair_opcoes_uni(texto, afo_a, afo_b):
+    """
+    Extrai as opções (apenas_a, apenas_b, ambos) de uma resposta livre da IA para a pergunta UNI.
+    Aceita os nomes das AFOs e as opções 'apenas A' / 'apenas B' da instrução (a letra em
+    maiúscula, para não confundir com o artigo "a"). Uma opção citada em oração com negação
+    ("ambas nunca ocorrem") não conta.
+    """
+    texto = texto or ""
+    return (
+        _citada_sem_negacao(_padrao_apenas(afo_a, "A"), texto),
+        _citada_sem_negacao(_padrao_apenas(afo_b, "B"), texto),
+        _citada_sem_negacao(_AMBOS, texto),
+    )
+
+def extrair_resposta_parcial(texto, tipo_pergunta_sbm, afo_a, afo_b, completo=False):
+    """
+    Extrai a resposta normalizada de um trecho inicial da resposta da IA, assim que ela já
+    estiver determinada: "Sim"/"Não" quando a primeira palavra termina, ou as opções da UNI
+    quando a primeira frase termina. Retorna None enquanto não for possível decidir.
+    Com `completo`, o texto é a resposta inteira.
+    """
+    texto = texto or ""
+    if tipo_pergunta_sbm == "UNI":
+        fim_frase = re.search(r"[!\n]|\.(?=\s)", texto) # Ponto dentro de um nome ("N.F.") não encerra a frase
+        if fim_frase is None and not completo:
+            return None
+        opcoes = extrair_opcoes_uni(texto[:fim_frase.start()] if fim_frase else texto, afo_a, afo_b)
+        return opcoes if any(opcoes) else None
+    if not completo and re.match(r"\W*\w+\W", texto) is None:
+        return None # A primeira palavra ainda pode continuar na próxima parte
+    return extrair_sim_nao(texto)
+
+
+# --- Estado e Máquina de Estados da Entrevista ---
+
+class EstadoEntrevista:
+    """
+    Estado de uma entrevista fora do Streamlit, com os mesmos campos usados em st.session_state.
+    """
+
+    def __init__(self):
+        self.fase = "introducao"
+        self.nome_processo = ""
+        self.dominio_processo = ""
+        self.afos = []
+        self.pares_pendentes = []
+        self.indice_par_atual = 0
+        self.pergunta_tipo = "DEP_INICIAL"
+        self.resposta_dep_inicial = None
+        self.relacoes = RepositorioRelacoes()
+        self.detector_inconsistencias = DetectorInconsistencias()
+        self.motor_inferencia = MotorInferencia(self.detector_inconsistencias.dependencias)
+
+def iniciar_entrevista(estado, nome_processo, dominio_processo, afos):
+    """
+    Prepara o estado de uma entrevista nova a partir dos dados da Fase 1.
+    """
+    estado.nome_processo = nome_processo
+    estado.dominio_processo = dominio_processo
+    estado.afos = afos
+    # Gera todos os pares possíveis (A, B) para as perguntas de dependência/exclusão
+    # itertools.permutations(lista, 2) cria pares ordenados (A,B) e (B,A)
+    estado.pares_pendentes = list(itertools.permutations(afos, 2))
+    estado.indice_par_atual = 0
+    estado.pergunta_tipo = "DEP_INICIAL" # Começa com a primeira pergunta para o primeiro par
+    estado.resposta_dep_inicial = None # Reseta a resposta inicial da DEP
+    estado.relacoes = RepositorioRelacoes()
+    # Um único grafo de dependências: o detector o atualiza e o motor de inferência o consulta
+    estado.detector_inconsistencias = DetectorInconsistencias()
+    estado.motor_inferencia = MotorInferencia(estado.detector_inconsistencias.dependencias)
+    estado.fase = "entrevista" if estado.pares_pendentes else "encerramento"
+
+def pergunta_atual(estado):
+    """
+    Retorna (afo_a, afo_b, tipo) da pergunta atual, ou None se a entrevista terminou.
+    """
+    if estado.indice_par_atual >= len(estado.pares_pendentes):
+        return None
+    afo_a, afo_b = estado.pares_pendentes[estado.indice_par_atual]
+    return afo_a, afo_b, estado.pergunta_tipo
+
+def avancar_pergunta_sbm_para_proximo_par(estado):
+    """
+    Controla o fluxo das perguntas SBMN (DEP_INICIAL, DEP_COMPLEMENTAR, XOR, UNI)
+    e avança para o próximo par de AFOs quando todas as perguntas são feitas.
+    """
+    if estado.pergunta_tipo == "DEP_INICIAL":
+        if estado.resposta_dep_inicial == "Sim":
+            estado.pergunta_tipo = "DEP_COMPLEMENTAR"
+        else: # Respondeu "Não" para a DEP_INICIAL, então não há DEPC. Vai direto para XOR.
+            estado.pergunta_tipo = "XOR"
+    elif estado.pergunta_tipo == "DEP_COMPLEMENTAR":
+        estado.pergunta_tipo = "XOR"
+    elif estado.pergunta_tipo == "XOR":
+        estado.pergunta_tipo = "UNI"
+    elif estado.pergunta_tipo == "UNI":
+        # Todas as perguntas para o par atual foram feitas, avança para o próximo par
+        estado.indice_par_atual += 1
+        estado.pergunta_tipo = "DEP_INICIAL" # Reinicia o ciclo de perguntas para o novo par
+        estado.resposta_dep_inicial = None # Reset para o novo par
+
+    # Verifica se ainda há pares antes de tentar acessar
+    # (no app, quem chama faz o st.rerun, o que permite reaplicar respostas do diário sem recarregar a página)
+    if estado.indice_par_atual >= len(estado.pares_pendentes):
+        estado.fase = "encerramento"
+
+def verificar_inconsistencia(estado, relacao, opcoes_uni=None):
+    """
+    Verificação de inconsistências SBMN sobre o grafo de dependências das AFOs.
+    O detector do estado é atualizado de forma incremental a cada relação confirmada e
+    aponta ciclos de dependência, operadores equivalentes (DEP + XOR), bloqueio de
+    dependência indireta, dependência dual e promiscuidade, com as relações que os causam.
+    Retorna a lista das novas inconsistências.
+    """
+    return estado.detector_inconsistencias.registrar(relacao, opcoes_uni)
+
+def registrar_resposta(estado, afo_a, afo_b, tipo_pergunta, resposta_ia, resposta_para_registro, observacao,
+                       opcoes_uni=None, origem="analista", justificativa=None):
+    """
+    Classifica a resposta no tipo de relação SBMN, registra a relação e alimenta o motor de inferência.
+    Relações deduzidas pelo motor usam origem "inferido" e guardam os ids das relações que as justificam.
+    Retorna a lista das novas inconsistências.
+    """
+    # Lógica para classificar o tipo de relação SBMN e registrar
+    if tipo_pergunta == "DEP_INICIAL":
+        estado.resposta_dep_inicial = resposta_para_registro # Armazena a resposta para a próxima etapa
+        if resposta_para_registro != "Não":
+            return [] # "Sim" só define se a DEP_COMPLEMENTAR será feita
+        tipo_sbmn = "SEM_DEPENDÊNCIA"
+    elif tipo_pergunta == "DEP_COMPLEMENTAR":
+        if resposta_para_registro == "Sim":
+            tipo_sbmn = "DEP" # Dependência Estrita
+        else:
+            tipo_sbmn = "DEPC" # Dependência Circunstancial
+    elif tipo_pergunta == "XOR":
+        # 'Sim' para "podem ocorrer juntas?" significa que NÃO é XOR.
+        # 'Não' para "podem ocorrer juntas?" significa que É XOR.
+        if resposta_para_registro == "Não":
+            tipo_sbmn = "XOR"
+        else:
+            tipo_sbmn = "NÃO_XOR" # AFOs podem coexistir
+    elif tipo_pergunta == "UNI":
+        # A classificação da UNI depende das opções marcadas
+        if all(opcoes_uni):
+            tipo_sbmn = "UNI"
+        else:
+            tipo_sbmn = "NÃO_UNI" # Não é uma UNI completa
+
+    id_relacao = estado.relacoes.adicionar(
+        afo_a, afo_b, tipo_sbmn,
+        resposta_ia=resposta_ia,
+        sua_validacao=resposta_para_registro, # A string construída das checkboxes ou Sim/Não
+        observacao=observacao,
+        origem=origem, # "analista", "especialista" (CLI em lote) ou "inferido"
+        justificativa=justificativa, # Ids das relações que levaram à inferência
+    )
+    relacao_registrada = estado.relacoes.obter(id_relacao)
+    novas = verificar_inconsistencia(estado, relacao_registrada, opcoes_uni) # Verifica inconsistências após registrar a relação
+    estado.motor_inferencia.registrar(relacao_registrada, opcoes_uni)
+    return novas
+
+def aplicar_respostas_inferidas(estado):
+    """
+    Enquanto a pergunta atual já tiver resposta deduzida pelo motor de inferência,
+    registra a relação como "inferido" e avança sem perguntar à IA nem ao analista.
+    """
+    novas = []
+    while estado.indice_par_atual < len(estado.pares_pendentes):
+        afo_a, afo_b = estado.pares_pendentes[estado.indice_par_atual]
+        tipo_pergunta = estado.pergunta_tipo
+        resposta = estado.motor_inferencia.resposta_inferida(afo_a, afo_b, tipo_pergunta)
+        if resposta is None:
+            break
+        # O caminho das relações que justificam a dedução só é montado agora, quando ela é usada
+        justificativa = estado.motor_inferencia.justificativa(afo_a, afo_b, tipo_pergunta)
+        opcoes_uni = None
+        if tipo_pergunta == "UNI":
+            opcoes_uni = resposta
+            resposta = texto_opcoes_uni(afo_a, afo_b, opcoes_uni)
+        novas += registrar_resposta(estado, afo_a, afo_b, tipo_pergunta, "", resposta, "",
+                                    opcoes_uni=opcoes_uni, origem="inferido", justificativa=justificativa)
+        avancar_pergunta_sbm_para_proximo_par(estado)
+    return novas
+
+def aplicar_resposta_confirmada(estado, evento, origem="analista"):
+    """
+    Aplica uma resposta confirmada: registra, avança e pula as perguntas inferidas.
+    `evento` tem indice_par, tipo_pergunta, resposta_ia, resposta, observacao e opcoes_uni
+    (o mesmo formato gravado no diário da entrevista). Retorna as novas inconsistências.
+    """
+    estado.indice_par_atual = evento["indice_par"]
+    estado.pergunta_tipo = evento["tipo_pergunta"]
+    afo_a, afo_b = estado.pares_pendentes[evento["indice_par"]]
+    opcoes_uni = tuple(evento["opcoes_uni"]) if evento["opcoes_uni"] is not None else None
+    novas = registrar_resposta(estado, afo_a, afo_b, evento["tipo_pergunta"], evento["resposta_ia"],
+                               evento["resposta"], evento["observacao"], opcoes_uni=opcoes_uni, origem=origem)
+    avancar_pergunta_sbm_para_proximo_par(estado)
+    novas += aplicar_respostas_inferidas(estado) # Pula as perguntas cuja resposta já foi deduzida
+    return novas
+
+def pular_pergunta(estado):
+    """
+    Avança sem registrar relação, quando a resposta não pôde ser interpretada: nenhuma resposta
+    é inventada, e a pergunta fica para o analista. Uma DEP_INICIAL pulada também pula a
+    DEP_COMPLEMENTAR. Retorna as novas inconsistências das perguntas inferidas em seguida.
+    """
+    if estado.pergunta_tipo == "DEP_INICIAL":
+        estado.resposta_dep_inicial = None
+    avancar_pergunta_sbm_para_proximo_par(estado)
+    return aplicar_respostas_inferidas(estado)
+
+
+# --- Especialista (IA) e Modelos de Linguagem ---
+
+def montar_prompt_sistema(nome_processo, dominio_processo):
+    """
+    Parte comum do prompt de sistema, que orienta a IA sobre seu papel.
+    """
+    return (
+        f"Você é um especialista de domínio do processo '{nome_processo}' "
+        f"no setor de '{dominio_processo}'. "
+        "Eu farei perguntas sobre dependências e exclusões de tarefas (AFOs) para modelar um processo. "
+    )
+
+def montar_historico(system_prompt, pergunta_ao_especialista):
+    """
+    Monta o histórico enviado ao modelo: prompt de sistema, confirmação do modelo e a pergunta.
+    """
+    return [
+        {"role": "user", "parts": [{ "text": system_prompt }]},
+        {"role": "model", "parts": [{ "text": "Entendido. Estou pronto para ajudar como especialista de domínio." }]},
+        {"role": "user", "parts": [{ "text": pergunta_ao_especialista }]},
+    ]
+
+class BackendGemini:
+    """
+    Modelo de linguagem do Google Gemini.
+    """
+
+    def __init__(self, nome_modelo="gemini-2.0-flash", api_key=None, metricas=None):
+        import google.generativeai as genai # Só é necessário quando o Gemini é de fato usado
+        self._genai = genai
+        if api_key is not None:
+            genai.configure(api_key=api_key)
+        self.nome_modelo = nome_modelo
+        self.metricas = metricas # RegistroMetricas opcional: tokens do prompt e da resposta
+        self._modelo = genai.GenerativeModel(nome_modelo)
+
+    def _contar_tokens(self, response):
+        uso = getattr(response, "usage_metadata", None)
+        if self.metricas is None or uso is None:
+            return
+        self.metricas.incrementar("sbmn_llm_tokens_total", uso.prompt_token_count or 0, tipo="prompt")
+        self.metricas.incrementar("sbmn_llm_tokens_total", uso.candidates_token_count or 0, tipo="resposta")
+
+    def gerar(self, historico, esquema_json=None):
+        """
+        Envia o histórico e retorna o texto da resposta. Com `esquema_json`, exige resposta em JSON.
+        """
+        if esquema_json is None:
+            response = self._modelo.generate_content(historico)
+        else:
+            response = self._modelo.generate_content(
+                historico,
+                generation_config=self._genai.GenerationConfig(
+                    response_mime_type="application/json",
+                    response_schema=esquema_json,
+                ),
+            )
+        self._contar_tokens(response)
+        return response.text
+
+    def gerar_fluxo(self, historico):
+        """
+        Envia o histórico e retorna as partes do texto da resposta à medida que são geradas.
+        Fechar o gerador deixa de ler o fluxo, o que encerra a geração no servidor.
+        """
+        response = self._modelo.generate_content(historico, stream=True)
+        ultima = None
+        try:
+            for parte in response:
+                ultima = parte
+                try:
+                    texto = parte.text
+                except ValueError:
+                    continue # Parte sem texto (por exemplo, só com o motivo de término)
+                if texto:
+                    yield texto
+        finally:
+            if ultima is not None:
+                self._contar_tokens(ultima) # A contagem de cada parte é a acumulada até ela
+
+class BackendSimulado:
+    """
+    Modelo de linguagem local e determinístico, para testes e execuções sem a API.
+    A resposta depende só do texto da pergunta (e da semente). No modo streaming a
+    resposta vem seguida de uma explicação, palavra a palavra, com `atraso_parte`
+    segundos entre as partes.
+    """
+
+    EXPLICACAO = "Essa é a situação usual neste tipo de processo, considerando as regras do domínio informado."
+
+    def __init__(self, semente=0, atraso_parte=0.0):
+        self.nome_modelo = f"simulado-{semente}"
+        self.semente = semente
+        self.atraso_parte = atraso_parte
+
+    def _sorteio(self, texto):
+        resumo = hashlib.sha256(f"{self.semente}:{texto}".encode("utf-8")).digest()
+        return resumo[0]
+
+    def _responder(self, pergunta, tipo):
+        sorteio = self._sorteio(pergunta)
+        if tipo == "UNI":
+            return ["apenas A", "apenas B", "ambos A e B", "apenas A e ambos"][sorteio % 4]
+        return "Sim" if sorteio % 2 == 0 else "Não"
+
+    def gerar(self, historico, esquema_json=None):
+        pergunta = historico[-1]["parts"][0]["text"]
+        if esquema_json is not None:
+            perguntas = json.loads(pergunta)["perguntas"]
+            return json.dumps({"respostas": [
+                {"id": item["id"], "resposta": self._responder(item["pergunta"], item["tipo"])}
+                for item in perguntas
+            ]}, ensure_ascii=False)
+        tipo = "UNI" if "'apenas A'" in historico[0]["parts"][0]["text"] else "BINARIA"
+        return self._responder(pergunta, tipo)
+
+    def gerar_fluxo(self, historico):
+        texto = f"{self.gerar(historico)}. {self.EXPLICACAO}"
+        for parte in re.findall(r"\S+\s*", texto):
+            if self.atraso_parte:
+                time.sleep(self.atraso_parte)
+            yield parte
+
+class EspecialistaIA:
+    """
+    Consulta o modelo de linguagem como "especialista de domínio", passando antes pelo cache.
+    Não depende do Streamlit, então pode rodar em threads (pré-busca, CLI em lote).
+    """
+
+    def __init__(self, backend, cache=None, metricas=None):
+        self.backend = backend
+        self.cache = cache
+        self.metricas = metricas # RegistroMetricas opcional: acertos e faltas no cache
+
+    def _buscar_no_cache(self, chave_cache):
+        if self.cache is None:
+            return None
+        resposta = self.cache.obter(chave_cache)
+        if self.metricas is not None:
+            self.metricas.incrementar("sbmn_cache_consultas_total", resultado="falta" if resposta is None else "acerto")
+        return resposta
+
+    def _chave(self, nome_processo, dominio_processo, pergunta, tipo_pergunta_sbm):
+        return CacheRespostas.gerar_chave(
+            nome_processo, dominio_processo, pergunta, tipo_pergunta_sbm, self.backend.nome_modelo,
+        )
+
+    def consultar(self, nome_processo, dominio_processo, pergunta_ao_especialista, tipo_pergunta_sbm):
+        """
+        Responde uma pergunta SBMN. Levanta a exceção original em caso de erro na comunicação.
+        """
+        chave_cache = self._chave(nome_processo, dominio_processo, pergunta_ao_especialista, tipo_pergunta_sbm)
+        resposta_em_cache = self._buscar_no_cache(chave_cache)
+        if resposta_em_cache is not None:
+            return resposta_em_cache
+
+        # Faz a chamada ao modelo e extrai a resposta
+        chat_history = self._historico(nome_processo, dominio_processo, pergunta_ao_especialista, tipo_pergunta_sbm)
+        return self._guardar(chave_cache, self.backend.gerar(chat_history))
+
+    def consultar_futuro(self, nome_processo, dominio_processo, pergunta_ao_especialista, tipo_pergunta_sbm,
+                         prioridade=PRIORIDADE_ATUAL):
+        """
+        Como `consultar`, mas sem esperar: retorna um Future com a resposta. Com o agendador
+        (backend com `enviar`), a chamada entra na fila com a `prioridade` dada e cancelar o
+        Future a retira da fila; com os demais backends, a consulta é feita antes de retornar.
+        """
+        chave_cache = self._chave(nome_processo, dominio_processo, pergunta_ao_especialista, tipo_pergunta_sbm)
+        futuro = Future()
+        resposta_em_cache = self._buscar_no_cache(chave_cache)
+        if resposta_em_cache is not None:
+            futuro.set_result(resposta_em_cache)
+            return futuro
+
+        chat_history = self._historico(nome_processo, dominio_processo, pergunta_ao_especialista, tipo_pergunta_sbm)
+        enviar = getattr(self.backend, "enviar", None)
+        if enviar is not None:
+            return encadear(enviar(chat_history, prioridade=prioridade),
+                            lambda resposta: self._guardar(chave_cache, resposta))
+        try:
+            futuro.set_result(self._guardar(chave_cache, self.backend.gerar(chat_history)))
+        except Exception as e:
+            futuro.set_exception(e)
+        return futuro
+
+    def _guardar(self, chave_cache, resposta):
+        resposta_especialista = resposta.strip()
+        if self.cache is not None:
+            self.cache.guardar(chave_cache, resposta_especialista) # Erros não são guardados, para serem tentados de novo
+        return resposta_especialista
+
+    def consultar_fluxo(self, nome_processo, dominio_processo, afo_a, afo_b, tipo_pergunta_sbm, ao_receber=None):
+        """
+        Como `consultar`, mas recebe a resposta em partes: `ao_receber(texto_parcial)` é chamado a
+        cada parte. Assim que a resposta normalizada (Sim/Não ou opções da UNI) está determinada,
+        o restante da geração é cancelado. Retorna (texto recebido, resposta normalizada ou None).
+        """
+        pergunta_ao_especialista = formular_pergunta(afo_a, afo_b, tipo_pergunta_sbm)
+        chave_cache = self._chave(nome_processo, dominio_processo, pergunta_ao_especialista, tipo_pergunta_sbm)
+        resposta_em_cache = self._buscar_no_cache(chave_cache)
+        if resposta_em_cache is not None:
+            if ao_receber is not None:
+                ao_receber(resposta_em_cache)
+            return resposta_em_cache, extrair_resposta_parcial(
+                resposta_em_cache, tipo_pergunta_sbm, afo_a, afo_b, completo=True,
+            )
+
+        chat_history = self._historico(nome_processo, dominio_processo, pergunta_ao_especialista, tipo_pergunta_sbm)
+        texto, decidida = "", None
+        partes = self.backend.gerar_fluxo(chat_history)
+        try:
+            for parte in partes:
+                texto += parte
+                if ao_receber is not None:
+                    ao_receber(texto)
+                decidida = extrair_resposta_parcial(texto, tipo_pergunta_sbm, afo_a, afo_b)
+                if decidida is not None:
+                    break # O resto da geração não muda a resposta
+        finally:
+            partes.close() # Cancela a geração restante
+        texto = texto.strip()
+        if decidida is None:
+            decidida = extrair_resposta_parcial(texto, tipo_pergunta_sbm, afo_a, afo_b, completo=True)
+        if self.cache is not None and texto:
+            self.cache.guardar(chave_cache, texto) # O trecho recebido já contém a resposta
+        return texto, decidida
+
+    def _historico(self, nome_processo, dominio_processo, pergunta_ao_especialista, tipo_pergunta_sbm):
+        # O prompt de sistema orienta a IA sobre seu papel
+        system_prompt = montar_prompt_sistema(nome_processo, dominio_processo)
+
+        # Ajusta a instrução para a IA dependendo do tipo de pergunta
+        if tipo_pergunta_sbm == "UNI":
+            # Para UNI, a IA deve responder com uma combinação das opções
+            system_prompt += "Para a próxima pergunta, você deve responder indicando quais das opções são possíveis: 'apenas A', 'apenas B', 'ambos A e B', ou uma combinação dessa (por exemplo, 'apenas A e ambos')."
+        else:
+            # Para DEP e XOR, a IA deve responder Sim ou Não
+            system_prompt += "Responda apenas 'Sim' ou 'Não' quando a pergunta for binária. Se precisar de mais contexto ou achar a pergunta ambígua, peça esclarecimentos."
+
+        # Histórico da conversa para manter o contexto, com a pergunta atual no final
+        return montar_historico(system_prompt, pergunta_ao_especialista)
+
+    def consultar_lote(self, nome_processo, dominio_processo, itens):
+        """
+        Faz uma única chamada ao modelo para várias perguntas SBMN (lista de (afo_a, afo_b, tipo)),
+        com resposta em JSON validada pelo esquema do lote.
+        Cada resposta válida vai para o cache com a mesma chave da pergunta individual;
+        as malformadas ficam de fora e serão feitas pelo caminho individual.
+        """
+        self.consultar_lote_futuro(nome_processo, dominio_processo, itens).result()
+
+    def consultar_lote_futuro(self, nome_processo, dominio_processo, itens, prioridade=PRIORIDADE_ATUAL):
+        """
+        Como `consultar_lote`, mas sem esperar: retorna um Future que termina quando as respostas
+        válidas do lote já estão no cache. Com o agendador, a chamada entra na fila com a `prioridade`
+        dada, como em `consultar_futuro`.
+        """
+        futuro = Future()
+        if self.cache is None:
+            futuro.set_result(None) # Sem cache não há onde deixar as respostas para o caminho individual
+            return futuro
+        perguntas = [(formular_pergunta(afo_a, afo_b, tipo), tipo) for afo_a, afo_b, tipo in itens]
+        chaves = [self._chave(nome_processo, dominio_processo, pergunta, tipo) for pergunta, tipo in perguntas]
+        # Só entram no lote as perguntas que ainda não estão no cache
+        faltantes = [indice for indice, chave in enumerate(chaves) if self.cache.obter(chave) is None]
+        if not faltantes:
+            futuro.set_result(None)
+            return futuro
+
+        itens_lote = [perguntas[indice] for indice in faltantes]
+        afos_lote = [itens[indice][:2] for indice in faltantes]
+        system_prompt = montar_prompt_sistema(nome_processo, dominio_processo) + INSTRUCAO_LOTE
+        chat_history = montar_historico(system_prompt, montar_pedido_lote(itens_lote))
+
+        def guardar(texto):
+            for indice, resposta in interpretar_resposta_lote(texto, itens_lote, afos_lote).items():
+                self.cache.guardar(chaves[faltantes[indice]], resposta)
+
+        enviar = getattr(self.backend, "enviar", None)
+        if enviar is not None:
+            return encadear(enviar(chat_history, esquema_json=ESQUEMA_RESPOSTA_LOTE, prioridade=prioridade), guardar)
+        try:
+            futuro.set_result(guardar(self.backend.gerar(chat_history, esquema_json=ESQUEMA_RESPOSTA_LOTE)))
+        except Exception as e:
+            futuro.set_exception(e)
+        return futuro
@@ -0,0 +1,123 @@
+import json
+import os
+import pickle
+import re
+import threading
+import uuid
+
+
+class DiarioEntrevista:
+    """
+    Persistência de uma entrevista à prova de falhas.
+    Cada resposta confirmada é acrescentada a um diário (JSON lines, com fsync), e de
+    tempos em tempos é gravado um snapshot compactado do estado com a posição do diário
+    que ele já cobre. Para retomar, carrega-se o snapshot e só os eventos posteriores
+    são reaplicados, então o tempo de retomada acompanha o delta e não o histórico todo.
+    A entrevista é identificada por um id (hexadecimal), usado para retomá-la.
+    """
+
+    def __init__(self, diretorio, id_entrevista, intervalo_snapshot=50):
+        if not re.fullmatch(r"[0-9a-f]{32}", id_entrevista or ""):
+            raise ValueError(f"ID de entrevista inválido: {id_entrevista!r}")
+        self.id_entrevista = id_entrevista
+        self.intervalo_snapshot = intervalo_snapshot
+        self._pasta = os.path.join(diretorio, id_entrevista)
+        self._caminho_diario = os.path.join(self._pasta, "diario.jsonl")
+        self._caminho_snapshot = os.path.join(self._pasta, "snapshot.pickle")
+        self._eventos_desde_snapshot = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def novo_id():
+        return uuid.uuid4().hex
+
+    def existe(self):
+        return os.path.exists(self._caminho_diario)
+
+    def registrar_inicio(self, nome_processo, dominio_processo, afos):
+        """
+        Primeiro evento do diário: os dados da Fase 1, dos quais os pares de AFOs são regenerados.
+        """
+        os.makedirs(self._pasta, exist_ok=True)
+        self._acrescentar({
+            "evento": "inicio",
+            "nome_processo": nome_processo,
+            "dominio_processo": dominio_processo,
+            "afos": afos,
+        })
+
+    def registrar_resposta(self, dados):
+        """
+        Acrescenta uma resposta confirmada pelo analista ao diário.
+        """
+        self._acrescentar(dict(dados, evento="resposta"))
+        self._eventos_desde_snapshot += 1
+
+    def precisa_snapshot(self):
+        return self._eventos_desde_snapshot >= self.intervalo_snapshot
+
+    def salvar_snapshot(self, estado):
+        """
+        Grava o estado completo junto com a posição do diário já coberta por ele.
+        A escrita é atômica (arquivo temporário + os.replace).
+        """
+        with self._lock:
+            posicao = os.path.getsize(self._caminho_diario)
+            temporario = self._caminho_snapshot + ".tmp"
+            with open(temporario, "wb") as arquivo:
+                pickle.dump({"posicao_diario": posicao, "estado": estado}, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+            os.replace(temporario, self._caminho_snapshot)
+            self._eventos_desde_snapshot = 0
+
+    def carregar(self):
+        """
+        Retorna (estado do snapshot ou None, lista dos eventos do diário posteriores ao snapshot).
+        Sem snapshot, o primeiro evento da lista é sempre o de início.
+        Só a última linha do diário, se estiver incompleta (queda durante a escrita), é descartada.
+        Levanta FileNotFoundError se a entrevista não existir e ValueError se o snapshot não puder
+        ser lido (arquivo corrompido ou de outra versão do código), se uma linha completa do diário
+        estiver corrompida (o arquivo não é alterado) ou se, sem snapshot, o diário não tiver o
+        evento de início completo (queda durante a primeira escrita).
+        """
+        if not self.existe():
+            raise FileNotFoundError(f"Entrevista não encontrada: {self.id_entrevista}")
+        estado, posicao = None, 0
+        if os.path.exists(self._caminho_snapshot):
+            try:
+                with open(self._caminho_snapshot, "rb") as arquivo:
+                    snapshot = pickle.load(arquivo)
+                estado, posicao = snapshot["estado"], snapshot["posicao_diario"]
+            except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError, KeyError,
+                    TypeError, ValueError) as e:
+                raise ValueError(f"O snapshot da entrevista {self.id_entrevista} não pode ser lido: {e!r}") from e
+
+        eventos = []
+        with open(self._caminho_diario, "r+b") as arquivo:
+            arquivo.seek(posicao)
+            for linha in arquivo:
+                if not linha.endswith(b"\n"):
+                    # Só a última linha pode não ter a quebra: é descartada do arquivo, para que
+                    # os próximos eventos não fiquem depois dela
+                    arquivo.truncate(posicao)
+                    break
+                try:
+                    eventos.append(json.loads(linha))
+                except ValueError as e:
+                    raise ValueError(
+                        f"O diário da entrevista {self.id_entrevista} tem uma linha corrompida na posição {posicao}"
+                    ) from e
+                posicao += len(linha)
+        if estado is None and (not eventos or eventos[0].get("evento") != "inicio"):
+            raise ValueError(f"O diário da entrevista {self.id_entrevista} não tem os dados iniciais completos")
+        self._eventos_desde_snapshot = len(eventos)
+        return estado, eventos
+
+    def _acrescentar(self, evento):
+        linha = (json.dumps(evento, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            with open(self._caminho_diario, "ab") as arquivo:
+                arquivo.write(linha)
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
@@ -0,0 +1,212 @@
+import functools
+import itertools
+import threading
+from concurrent.futures import Future
+
+from agendador_llm import PRIORIDADE_ATUAL, PRIORIDADE_ESPECULATIVA, PRIORIDADE_PRE_BUSCA, encadear
+from motor_sbmn import TIPOS_PERGUNTA, extrair_sim_nao
+
+
+class PreBuscaPerguntas:
+    """
+    Pré-busca das próximas perguntas da entrevista.
+    Enquanto o analista valida a pergunta atual, as próximas N perguntas
+    (seguindo a ordem DEP_INICIAL -> DEP_COMPLEMENTAR -> XOR -> UNI) já são
+    enviadas à IA em segundo plano. A DEP_COMPLEMENTAR só é usada quando a DEP_INICIAL
+    for respondida com "Sim": ela espera a resposta da IA à DEP_INICIAL e só é pedida,
+    com a menor prioridade, se essa resposta não for "Não".
+    Cada sessão tem a sua instância. Os pedidos vão direto para a fila do agendador, sem
+    ocupar threads: a pergunta atual com prioridade sobre as demais, e as que saem do plano
+    são retiradas da fila se ainda não começaram.
+
+    Com `consultar_lote`, as perguntas são agrupadas em blocos de `pares_por_lote`
+    pares e cada bloco vai para a IA em uma única chamada. O bloco atual e o
+    seguinte ficam sempre agendados, também na fila do agendador: o atual com a prioridade
+    da pergunta atual e o seguinte com a da pré-busca.
+    """
+
+    def __init__(self, consultar, formular_pergunta, profundidade=4, consultar_lote=None, pares_por_lote=1):
+        self.consultar = consultar # consultar(pergunta, tipo, prioridade) -> Future com a resposta
+        self.formular_pergunta = formular_pergunta # formular_pergunta(afo_a, afo_b, tipo) -> texto
+        self.profundidade = profundidade
+        # consultar_lote([(afo_a, afo_b, tipo), ...], prioridade) -> Future que termina com as respostas no cache
+        self.consultar_lote = consultar_lote
+        self.pares_por_lote = max(1, pares_por_lote)
+        self._futuros = {} # (afo_a, afo_b, tipo) -> Future
+        self._prioridades = {} # (afo_a, afo_b, tipo) -> prioridade com que a pergunta foi pedida
+        # DEP_COMPLEMENTAR -> Future da DEP_INICIAL do par que ela espera, ou None se a IA respondeu "Não"
+        self._aguardando = {}
+        self._lotes = {} # Future do lote -> (bloco, [((afo_a, afo_b, tipo), Future da pergunta)], prioridade)
+        # Reentrante: add_done_callback chama a função na hora se a DEP_INICIAL já terminou
+        self._lock = threading.RLock()
+
+    def planejar(self, pares, indice_par, tipo_atual, pular=None):
+        """
+        Lista as próximas perguntas (afo_a, afo_b, tipo) a partir da pergunta atual, inclusive.
+        `pular(afo_a, afo_b, tipo)` permite ignorar perguntas que não serão feitas ao especialista.
+        """
+        return [chave for _, chave in self._planejar(pares, indice_par, tipo_atual, pular)]
+
+    def _planejar(self, pares, indice_par, tipo_atual, pular):
+        # No modo em lote o plano vai até o fim do bloco seguinte; senão, até a profundidade
+        if self.consultar_lote is not None:
+            fim_pares = (indice_par // self.pares_por_lote + 2) * self.pares_por_lote
+            limite = None
+        else:
+            fim_pares = len(pares)
+            limite = self.profundidade + 1 # A pergunta atual mais as N próximas
+
+        plano = []
+        tipos = TIPOS_PERGUNTA[TIPOS_PERGUNTA.index(tipo_atual):]
+        for indice in range(indice_par, min(fim_pares, len(pares))):
+            afo_a, afo_b = pares[indice]
+            for tipo in tipos:
+                if pular is not None and pular(afo_a, afo_b, tipo):
+                    continue
+                plano.append((indice, (afo_a, afo_b, tipo)))
+                if limite is not None and len(plano) >= limite:
+                    return plano
+            tipos = TIPOS_PERGUNTA
+        return plano
+
+    def atualizar(self, pares, indice_par, tipo_atual, pular=None, incluir_atual=True):
+        """
+        Agenda as perguntas do plano que ainda não foram pedidas e cancela as que
+        saíram do plano (ramo errado da DEP_COMPLEMENTAR ou pares já respondidos).
+        Com `incluir_atual=False` a pergunta atual não é pedida aqui (quem chama a pede em
+        streaming), mas continua valendo se já tinha sido agendada antes.
+        """
+        plano = self._planejar(pares, indice_par, tipo_atual, pular)
+        no_plano = {chave for _, chave in plano}
+        atual = (*pares[indice_par], tipo_atual) if indice_par < len(pares) else None
+        with self._lock:
+            for chave in list(self._futuros):
+                if chave not in no_plano:
+                    self._futuros.pop(chave).cancel() # Só cancela se ainda não começou a executar
+                    self._prioridades.pop(chave, None)
+            for chave in list(self._aguardando):
+                if chave not in no_plano:
+                    del self._aguardando[chave]
+            novos = [
+                (indice, chave) for indice, chave in plano
+                if chave not in self._futuros and (incluir_atual or chave != atual)
+            ]
+
+            if self.consultar_lote is None:
+                # A pergunta atual pedida antes como pré-busca passa à frente na fila do agendador
+                if self._prioridades.get(atual, PRIORIDADE_ATUAL) != PRIORIDADE_ATUAL and not self._futuros[atual].done():
+                    anterior = self._futuros[atual]
+                    self._pedir(atual, PRIORIDADE_ATUAL) # O agendador junta os dois pedidos em uma chamada
+                    anterior.cancel()
+                for _, chave in novos:
+                    afo_a, afo_b, tipo = chave
+                    if tipo == "DEP_COMPLEMENTAR" and (afo_a, afo_b, "DEP_INICIAL") in no_plano:
+                        inicial = self._futuros.get((afo_a, afo_b, "DEP_INICIAL"))
+                        # Sem o pedido da DEP_INICIAL (pedida em streaming) não há o que esperar
+                        if inicial is not None and chave not in self._aguardando:
+                            self._aguardando[chave] = inicial
+                            inicial.add_done_callback(functools.partial(self._depois_da_inicial, chave))
+                        continue
+                    self._aguardando.pop(chave, None)
+                    self._pedir(chave, PRIORIDADE_ATUAL if chave == atual else PRIORIDADE_PRE_BUSCA)
+                return
+
+            bloco_atual = indice_par // self.pares_por_lote
+            for lote, (bloco, itens, prioridade) in list(self._lotes.items()):
+                itens = [(chave, futuro) for chave, futuro in itens if not futuro.cancelled()]
+                if not itens:
+                    # Todas as perguntas do bloco saíram do plano: o lote sai da fila, se ainda não começou
+                    del self._lotes[lote]
+                    lote.cancel()
+                elif bloco == bloco_atual and prioridade != PRIORIDADE_ATUAL and not lote.done():
+                    # O bloco seguinte virou o atual: passa à frente (o agendador junta os dois pedidos)
+                    del self._lotes[lote]
+                    self._pedir_lote(bloco, itens, PRIORIDADE_ATUAL)
+                    lote.cancel()
+
+            # Um pedido por bloco de pares; os futuros de cada pergunta são resolvidos pelo próprio bloco
+            for bloco, itens_bloco in itertools.groupby(novos, key=lambda item: item[0] // self.pares_por_lote):
+                itens = []
+                for _, chave in itens_bloco:
+                    futuro = Future()
+                    self._futuros[chave] = futuro
+                    itens.append((chave, futuro))
+                self._pedir_lote(bloco, itens, PRIORIDADE_ATUAL if bloco == bloco_atual else PRIORIDADE_PRE_BUSCA)
+
+    def _pedir(self, chave, prioridade):
+        # Chamado com self._lock adquirido
+        afo_a, afo_b, tipo = chave
+        self._futuros[chave] = self.consultar(self.formular_pergunta(afo_a, afo_b, tipo), tipo, prioridade)
+        self._prioridades[chave] = prioridade
+
+    def _depois_da_inicial(self, chave, inicial):
+        # Roda na thread do agendador que respondeu a DEP_INICIAL (ou na hora, se já tinha terminado)
+        with self._lock:
+            if self._aguardando.get(chave) is not inicial:
+                return # Saiu do plano enquanto esperava
+            if inicial.cancelled():
+                # A DEP_INICIAL saiu do plano ou foi pedida de novo: a próxima atualização decide
+                del self._aguardando[chave]
+                return
+            if inicial.exception() is None and extrair_sim_nao(inicial.result()) == "Não":
+                self._aguardando[chave] = None # Se o analista discordar, é pedida como pergunta atual
+                return
+            del self._aguardando[chave]
+            self._pedir(chave, PRIORIDADE_ESPECULATIVA)
+
+    def _pedir_lote(self, bloco, itens, prioridade):
+        # Chamado com self._lock adquirido; o lote entra em _lotes antes do callback, que pode rodar na hora
+        lote = self.consultar_lote([chave for chave, _ in itens], prioridade)
+        self._lotes[lote] = (bloco, itens, prioridade)
+        lote.add_done_callback(self._depois_do_lote)
+
+    def _depois_do_lote(self, lote):
+        # Roda na thread do agendador que fez a chamada do lote (ou na hora, se já tinha terminado)
+        with self._lock:
+            registro = self._lotes.pop(lote, None)
+            if registro is None:
+                return # Substituído por um pedido mais prioritário, ou a pré-busca foi cancelada
+            _, itens, prioridade = registro
+            for (afo_a, afo_b, tipo), futuro in itens:
+                if futuro.cancelled():
+                    continue # Saiu do plano enquanto o lote rodava (ramo especulativo descartado)
+                if lote.cancelled():
+                    futuro.cancel() # O agendador foi encerrado
+                    continue
+                # A resposta vem do cache quando o lote foi válido (mesmo que só em parte);
+                # senão, a pergunta vai para a fila individualmente
+                individual = self.consultar(self.formular_pergunta(afo_a, afo_b, tipo), tipo, prioridade)
+                encadear(individual, lambda resposta: resposta, resultado=futuro)
+
+    def agendada(self, afo_a, afo_b, tipo):
+        with self._lock:
+            return (afo_a, afo_b, tipo) in self._futuros
+
+    def obter(self, afo_a, afo_b, tipo):
+        """
+        Espera e retorna a resposta pré-buscada. Levanta KeyError se a pergunta não foi agendada.
+        Em caso de erro o futuro é descartado, para que a pergunta seja tentada de novo.
+        """
+        chave = (afo_a, afo_b, tipo)
+        with self._lock:
+            futuro = self._futuros[chave]
+        try:
+            return futuro.result()
+        except Exception: # Inclui CancelledError
+            with self._lock:
+                if self._futuros.get(chave) is futuro:
+                    del self._futuros[chave]
+                    self._prioridades.pop(chave, None)
+            raise
+
+    def cancelar_tudo(self):
+        with self._lock:
+            lotes = list(self._lotes)
+            self._lotes.clear()
+            for lote in lotes:
+                lote.cancel()
+            for futuro in self._futuros.values():
+                futuro.cancel()
+            self._futuros.clear()
+            self._prioridades.clear()
+            self._aguardando.clear()
@@ -0,0 +1,195 @@
+class Relacao:
+    """
+    Registro compacto de uma relação SBMN. As AFOs ficam como ids inteiros internados
+    pelo RepositorioRelacoes; os nomes só são resolvidos na visão em dicionário.
+    """
+
+    __slots__ = ("id", "afo1", "afo2", "tipo", "resposta_ia", "sua_validacao", "observacao",
+                 "origem", "justificativa")
+
+    def __init__(self, id, afo1, afo2, tipo, resposta_ia, sua_validacao, observacao, origem, justificativa):
+        self.id = id
+        self.afo1 = afo1
+        self.afo2 = afo2
+        self.tipo = tipo
+        self.resposta_ia = resposta_ia
+        self.sua_validacao = sua_validacao
+        self.observacao = observacao
+        self.origem = origem
+        self.justificativa = justificativa
+
+
+class RepositorioRelacoes:
+    """
+    Repositório indexado das relações SBMN da entrevista.
+    Mantém índices por par ordenado, por par não ordenado e por tipo, para responder
+    "o que já se sabe sobre (A, B)" em O(1), e permite corrigir ou retirar relações
+    quando o analista revisa uma resposta. `como_lista()` devolve a mesma lista de
+    dicionários usada antes, para exibição e exportação.
+
+    A entrevista ainda não oferece revisão de respostas: `atualizar` e `retirar` só mantêm
+    este repositório e seus índices, sem desfazer o que o DetectorInconsistencias e o
+    MotorInferencia já derivaram da relação.
+    """
+
+    def __init__(self):
+        self._ids_afo = {} # nome da AFO -> id inteiro
+        self._nomes_afo = [] # id inteiro -> nome da AFO
+        self._relacoes = {} # id da relação -> Relacao (em ordem de inserção)
+        self._por_par_ordenado = {} # (afo1, afo2) -> {tipo: id da relação}
+        self._por_par = {} # (menor afo, maior afo) -> {id da relação: None}
+        self._por_tipo = {} # tipo -> {id da relação: None}
+        self._proximo_id = 0
+
+    def __len__(self):
+        return len(self._relacoes)
+
+    def __iter__(self):
+        # Um dicionário por vez, sem montar a lista inteira (exportação de modelos grandes)
+        return (self._como_dict(relacao) for relacao in self._relacoes.values())
+
+    def id_afo(self, nome):
+        """
+        Interna o nome da AFO e retorna o seu id inteiro.
+        """
+        id_afo = self._ids_afo.get(nome)
+        if id_afo is None:
+            id_afo = len(self._nomes_afo)
+            self._ids_afo[nome] = id_afo
+            self._nomes_afo.append(nome)
+        return id_afo
+
+    def nome_afo(self, id_afo):
+        return self._nomes_afo[id_afo]
+
+    def adicionar(self, afo1, afo2, tipo, resposta_ia="", sua_validacao="", observacao="",
+                  origem="analista", justificativa=None):
+        """
+        Registra uma nova relação e retorna o seu id.
+        Uma relação anterior do mesmo tipo para o mesmo par ordenado é substituída.
+        """
+        a, b = self.id_afo(afo1), self.id_afo(afo2)
+        anterior = self._por_par_ordenado.get((a, b), {}).get(tipo)
+        if anterior is not None:
+            self.retirar(anterior)
+
+        relacao = Relacao(self._proximo_id, a, b, tipo, resposta_ia, sua_validacao, observacao,
+                          origem, list(justificativa or []))
+        self._proximo_id += 1
+        self._relacoes[relacao.id] = relacao
+        self._indexar(relacao)
+        return relacao.id
+
+    def atualizar(self, id_relacao, **campos):
+        """
+        Altera os campos de uma relação (por exemplo, quando o analista revisa a resposta).
+        Um campo inexistente levanta KeyError sem alterar nada.
+        """
+        relacao = self._relacoes[id_relacao]
+        for campo in campos:
+            if campo == "id" or campo not in Relacao.__slots__:
+                raise KeyError(campo)
+        self._desindexar(relacao)
+        for campo, valor in campos.items():
+            if campo in ("afo1", "afo2"):
+                valor = self.id_afo(valor)
+            setattr(relacao, campo, valor)
+        anterior = self._por_par_ordenado.get((relacao.afo1, relacao.afo2), {}).get(relacao.tipo)
+        if anterior is not None:
+            self.retirar(anterior)
+        self._indexar(relacao)
+
+    def retirar(self, id_relacao):
+        """
+        Remove a relação do repositório e de todos os índices.
+        """
+        relacao = self._relacoes.pop(id_relacao)
+        self._desindexar(relacao)
+
+    def obter(self, id_relacao):
+        """
+        Retorna a relação como dicionário, ou None se não existir.
+        """
+        relacao = self._relacoes.get(id_relacao)
+        return None if relacao is None else self._como_dict(relacao)
+
+    def buscar(self, afo1, afo2, tipo):
+        """
+        Retorna a relação do tipo para o par ordenado (afo1, afo2) como dicionário, ou None.
+        """
+        a, b = self._ids_afo.get(afo1), self._ids_afo.get(afo2)
+        id_relacao = self._por_par_ordenado.get((a, b), {}).get(tipo)
+        return None if id_relacao is None else self._como_dict(self._relacoes[id_relacao])
+
+    def existe(self, afo1, afo2, tipo, qualquer_ordem=False):
+        """
+        Indica se existe relação do tipo para o par; com `qualquer_ordem`, vale (afo1, afo2) ou (afo2, afo1).
+        """
+        a, b = self._ids_afo.get(afo1), self._ids_afo.get(afo2)
+        if tipo in self._por_par_ordenado.get((a, b), {}):
+            return True
+        return qualquer_ordem and tipo in self._por_par_ordenado.get((b, a), {})
+
+    def relacoes_do_par(self, afo1, afo2):
+        """
+        Tudo o que se sabe sobre o par, nas duas ordens, como lista de dicionários.
+        """
+        a, b = self._ids_afo.get(afo1), self._ids_afo.get(afo2)
+        if a is None or b is None:
+            return []
+        ids = self._por_par.get((min(a, b), max(a, b)), {})
+        return [self._como_dict(self._relacoes[id_relacao]) for id_relacao in ids]
+
+    def por_tipo(self, tipo):
+        return [self._como_dict(self._relacoes[id_relacao]) for id_relacao in self._por_tipo.get(tipo, {})]
+
+    def como_lista(self):
+        """
+        Visão em lista de dicionários, na ordem de registro, para exibição e exportação.
+        """
+        return [self._como_dict(relacao) for relacao in self._relacoes.values()]
+
+    def como_colunas(self):
+        """
+        Visão colunar, com uma lista por campo, em uma única passada sobre as relações.
+        As AFOs vêm como códigos (ids internados) em "afo1"/"afo2", e os nomes em "nomes_afo",
+        para montar tabelas categóricas sem criar um dicionário por relação.
+        """
+        colunas = {campo: [] for campo in Relacao.__slots__}
+        for relacao in self._relacoes.values():
+            for campo, valores in colunas.items():
+                valores.append(getattr(relacao, campo))
+        colunas["nomes_afo"] = list(self._nomes_afo)
+        return colunas
+
+    def _como_dict(self, relacao):
+        return {
+            "id": relacao.id,
+            "afo1": self._nomes_afo[relacao.afo1],
+            "afo2": self._nomes_afo[relacao.afo2],
+            "tipo": relacao.tipo,
+            "resposta_ia": relacao.resposta_ia,
+            "sua_validacao": relacao.sua_validacao,
+            "observacao": relacao.observacao,
+            "origem": relacao.origem,
+            "justificativa": list(relacao.justificativa),
+        }
+
+    def _indexar(self, relacao):
+        a, b = relacao.afo1, relacao.afo2
+        self._por_par_ordenado.setdefault((a, b), {})[relacao.tipo] = relacao.id
+        self._por_par.setdefault((min(a, b), max(a, b)), {})[relacao.id] = None
+        self._por_tipo.setdefault(relacao.tipo, {})[relacao.id] = None
+
+    def _desindexar(self, relacao):
+        a, b = relacao.afo1, relacao.afo2
+        por_tipo = self._por_par_ordenado.get((a, b), {})
+        if por_tipo.get(relacao.tipo) == relacao.id:
+            del por_tipo[relacao.tipo]
+            if not por_tipo:
+                del self._por_par_ordenado[(a, b)]
+        par = (min(a, b), max(a, b))
+        self._por_par.get(par, {}).pop(relacao.id, None)
+        if par in self._por_par and not self._por_par[par]:
+            del self._por_par[par]
+        self._por_tipo.get(relacao.tipo, {}).pop(relacao.id, None)
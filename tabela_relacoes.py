@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+
+import pandas as pd # Já vem com o Streamlit
+
+# Colunas da tabela de relações, na ordem de exibição e de exportação
+COLUNAS = ["id", "afo1", "tipo", "afo2", "origem", "resposta_ia", "sua_validacao", "observacao", "justificativa"]
+
+
+def quadro_relacoes(relacoes):
+    """
+    Monta o DataFrame das relações a partir da visão colunar do repositório.
+    AFOs, tipos e origens ficam como categorias, então filtros e contagens são vetorizados.
+    """
+    colunas = relacoes.como_colunas()
+    nomes_afo = colunas["nomes_afo"]
+    return pd.DataFrame({
+        "id": pd.array(colunas["id"], dtype="int64"),
+        "afo1": pd.Categorical.from_codes(colunas["afo1"], categories=nomes_afo),
+        "tipo": pd.Categorical(colunas["tipo"]),
+        "afo2": pd.Categorical.from_codes(colunas["afo2"], categories=nomes_afo),
+        "origem": pd.Categorical(colunas["origem"]),
+        "resposta_ia": colunas["resposta_ia"],
+        "sua_validacao": colunas["sua_validacao"],
+        "observacao": colunas["observacao"],
+        "justificativa": [", ".join(f"#{i}" for i in ids) for ids in colunas["justificativa"]],
+    }, columns=COLUNAS)
+
+def filtrar_relacoes(quadro, tipos=None, afos=None):
+    """
+    Filtra por tipos SBMN e por AFOs (em qualquer um dos lados da relação).
+    Listas vazias ou None não filtram.
+    """
+    mascara = pd.Series(True, index=quadro.index)
+    if tipos:
+        mascara &= quadro["tipo"].isin(tipos)
+    if afos:
+        mascara &= quadro["afo1"].isin(afos) | quadro["afo2"].isin(afos)
+    return quadro[mascara]
+
+def contagem_por_tipo(quadro):
+    """
+    Quantidade de relações por tipo SBMN, em uma única passada.
+    """
+    return quadro["tipo"].value_counts(sort=False)
+
+def pagina(quadro, numero_pagina, tamanho_pagina):
+    """
+    Linhas da página (começando em 1); só elas são enviadas ao navegador.
+    """
+    inicio = (numero_pagina - 1) * tamanho_pagina
+    return quadro.iloc[inicio:inicio + tamanho_pagina]
+
+
+# --- Exportação do Modelo ---
+# Cada formato é um gerador de trechos de texto, gravados um a um no arquivo de destino,
+# para que o modelo inteiro nunca fique em memória como uma única string.
+
+def _linha_exportada(relacao):
+    return {coluna: relacao[coluna] for coluna in COLUNAS}
+
+def exportar_csv(relacoes, linhas_por_trecho=1000):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUNAS)
+    for numero, relacao in enumerate(relacoes, start=1):
+        linha = _linha_exportada(relacao)
+        linha["justificativa"] = " ".join(str(i) for i in linha["justificativa"])
+        escritor.writerow(linha.values())
+        if numero % linhas_por_trecho == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def exportar_jsonl(relacoes):
+    for relacao in relacoes:
+        yield json.dumps(_linha_exportada(relacao), ensure_ascii=False) + "\n"
+
+def exportar_json(relacoes, nome_processo, dominio_processo, afos, inconsistencias):
+    """
+    Modelo completo em um objeto JSON: dados do processo, relações e inconsistências.
+    """
+    cabecalho = {"nome_processo": nome_processo, "dominio_processo": dominio_processo, "afos": afos}
+    yield json.dumps(cabecalho, ensure_ascii=False)[:-1] + ', "relacoes": [\n'
+    for numero, relacao in enumerate(relacoes):
+        yield (",\n" if numero else "") + json.dumps(_linha_exportada(relacao), ensure_ascii=False)
+    yield '\n], "inconsistencias": ' + json.dumps(inconsistencias, ensure_ascii=False) + "}\n"
+
+def gravar_exportacao(trechos, caminho):
+    """
+    Grava os trechos de uma exportação no arquivo, à medida que são gerados.
+    """
+    with open(caminho, "w", encoding="utf-8", newline="") as arquivo:
+        for trecho in trechos:
+            arquivo.write(trecho)
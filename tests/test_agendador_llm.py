@@ -0,0 +1,171 @@
+import threading
+from concurrent.futures import CancelledError
+
+import pytest
+
+from agendador_llm import PRIORIDADE_ESPECULATIVA, PRIORIDADE_PRE_BUSCA, AgendadorLLM, encadear
+
+
+class ErroHttp(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class BackendControlado:
+    """
+    Backend que responde com o próprio histórico. Enquanto `liberado` não é sinalizado,
+    as chamadas ficam presas (para montar a fila do agendador); `erros` são levantados antes.
+    """
+
+    nome_modelo = "falso"
+
+    def __init__(self, erros=()):
+        self.erros = list(erros)
+        self.chamadas = []
+        self.liberado = threading.Event()
+        self.liberado.set()
+        self.em_andamento = threading.Event()
+        self._lock = threading.Lock()
+
+    def gerar(self, historico, esquema_json=None):
+        with self._lock:
+            self.chamadas.append(historico)
+            erro = self.erros.pop(0) if self.erros else None
+        self.em_andamento.set()
+        self.liberado.wait(5)
+        if erro is not None:
+            raise erro
+        return historico
+
+
+@pytest.fixture
+def criar_agendador():
+    agendadores = []
+
+    def criar(backend, **opcoes):
+        opcoes = {"requisicoes_por_minuto": 60000, "rajada": 1000, "max_em_voo": 1,
+                  "espera_inicial": 0.001, **opcoes}
+        agendadores.append(AgendadorLLM(backend, **opcoes))
+        return agendadores[-1]
+
+    yield criar
+    for agendador in agendadores:
+        agendador.encerrar()
+
+
+def ocupar(agendador, backend):
+    """
+    Prende a única thread do agendador em uma chamada, para os próximos pedidos ficarem na fila.
+    """
+    backend.liberado.clear()
+    futuro = agendador.enviar("ocupada")
+    assert backend.em_andamento.wait(5)
+    return futuro
+
+
+def test_erro_transitorio_e_repetido(criar_agendador):
+    backend = BackendControlado(erros=[ErroHttp(429), ErroHttp(503)])
+    agendador = criar_agendador(backend)
+    assert agendador.gerar("pergunta") == "pergunta"
+    assert backend.chamadas == ["pergunta"] * 3
+
+
+def test_erro_permanente_nao_e_repetido(criar_agendador):
+    backend = BackendControlado(erros=[ErroHttp(400)])
+    agendador = criar_agendador(backend)
+    with pytest.raises(ErroHttp):
+        agendador.gerar("pergunta")
+    assert len(backend.chamadas) == 1
+
+
+def test_desiste_depois_de_max_tentativas(criar_agendador):
+    backend = BackendControlado(erros=[ErroHttp(500)] * 5)
+    agendador = criar_agendador(backend, max_tentativas=3)
+    with pytest.raises(ErroHttp):
+        agendador.gerar("pergunta")
+    assert len(backend.chamadas) == 3
+
+
+def test_pedidos_iguais_viram_uma_chamada(criar_agendador):
+    backend = BackendControlado()
+    agendador = criar_agendador(backend)
+    ocupada = ocupar(agendador, backend)
+    futuros = [agendador.enviar("pergunta", sessao=sessao) for sessao in range(3)]
+    backend.liberado.set()
+    assert [futuro.result(5) for futuro in futuros] == ["pergunta"] * 3
+    assert ocupada.result(5) == "ocupada"
+    assert backend.chamadas == ["ocupada", "pergunta"]
+
+
+def test_pergunta_atual_passa_a_frente_e_rodizio_entre_sessoes(criar_agendador):
+    backend = BackendControlado()
+    agendador = criar_agendador(backend)
+    ocupar(agendador, backend)
+    futuros = [
+        agendador.enviar("especulativa", sessao=1, prioridade=PRIORIDADE_ESPECULATIVA),
+        agendador.enviar("pre_busca 1a", sessao=1, prioridade=PRIORIDADE_PRE_BUSCA),
+        agendador.enviar("pre_busca 1b", sessao=1, prioridade=PRIORIDADE_PRE_BUSCA),
+        agendador.enviar("pre_busca 2a", sessao=2, prioridade=PRIORIDADE_PRE_BUSCA),
+        agendador.enviar("atual 2", sessao=2),
+    ]
+    backend.liberado.set()
+    for futuro in futuros:
+        futuro.result(5)
+    assert backend.chamadas[1:] == ["atual 2", "pre_busca 1a", "pre_busca 2a", "pre_busca 1b", "especulativa"]
+
+
+def test_pedir_de_novo_com_prioridade_maior_adianta_o_pedido(criar_agendador):
+    backend = BackendControlado()
+    agendador = criar_agendador(backend)
+    ocupar(agendador, backend)
+    agendador.enviar("outra", prioridade=PRIORIDADE_PRE_BUSCA)
+    agendador.enviar("adiantada", prioridade=PRIORIDADE_ESPECULATIVA)
+    adiantada = agendador.enviar("adiantada")
+    backend.liberado.set()
+    assert adiantada.result(5) == "adiantada"
+    agendador.gerar("fim", sessao="outra sessão")
+    assert backend.chamadas[1:3] == ["adiantada", "outra"]
+
+
+def test_pedido_cancelado_na_fila_nao_e_chamado(criar_agendador):
+    backend = BackendControlado()
+    agendador = criar_agendador(backend)
+    ocupar(agendador, backend)
+    cancelado = agendador.enviar("cancelada", prioridade=PRIORIDADE_PRE_BUSCA)
+    compartilhado = [agendador.enviar("compartilhada", sessao=sessao) for sessao in range(2)]
+    assert cancelado.cancel()
+    assert compartilhado[0].cancel() # Outra sessão ainda espera a mesma chamada
+    backend.liberado.set()
+    assert compartilhado[1].result(5) == "compartilhada"
+    agendador.gerar("fim")
+    assert backend.chamadas == ["ocupada", "compartilhada", "fim"]
+    with pytest.raises(CancelledError):
+        cancelado.result()
+
+
+def test_encadear_transforma_o_resultado_e_repassa_o_cancelamento(criar_agendador):
+    backend = BackendControlado()
+    agendador = criar_agendador(backend)
+    ocupar(agendador, backend)
+    maiusculas = encadear(agendador.enviar("texto"), str.upper)
+    descartada = encadear(agendador.enviar("descartada"), str.upper)
+    assert descartada.cancel()
+    backend.liberado.set()
+    assert maiusculas.result(5) == "TEXTO"
+    agendador.gerar("fim")
+    assert "descartada" not in backend.chamadas
+
+
+def test_encerrar_cancela_a_fila_e_termina_as_threads():
+    backend = BackendControlado()
+    agendador = AgendadorLLM(backend, max_em_voo=1)
+    ocupada = ocupar(agendador, backend)
+    na_fila = agendador.enviar("na fila")
+    threading.Timer(0.05, backend.liberado.set).start()
+    agendador.encerrar()
+    assert ocupada.result() == "ocupada" # A chamada em andamento termina
+    assert na_fila.cancelled()
+    assert not any(thread.is_alive() for thread in agendador._threads)
+    with pytest.raises(RuntimeError):
+        agendador.enviar("depois")
@@ -0,0 +1,89 @@
+import pytest
+
+import base_conhecimento
+from base_conhecimento import BaseConhecimento, IndiceNgramas, normalizar_nome
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(base_conhecimento.time, "time", relogio)
+    return relogio
+
+
+@pytest.fixture
+def base(tmp_path, relogio):
+    return BaseConhecimento(str(tmp_path))
+
+
+def test_normalizacao_ignora_acentos_caixa_e_pontuacao():
+    assert normalizar_nome("Emitir Nota-Fiscal ") == "emitir nota fiscal"
+    assert normalizar_nome("  Aprovação   do PEDIDO!") == "aprovacao do pedido"
+    assert normalizar_nome("Não aprovar") == "nao aprovar"
+
+
+def test_indice_respeita_o_limiar():
+    indice = IndiceNgramas()
+    indice.adicionar("aprovar pedido")
+    assert indice.mais_parecido("aprovar pedido") == ("aprovar pedido", 1.0)
+    nome, similaridade = indice.mais_parecido("aprovar o pedido")
+    assert nome == "aprovar pedido" and 0.8 <= similaridade < 1
+    assert indice.mais_parecido("aprovar o pedido", limiar=similaridade + 0.01) is None
+    assert indice.mais_parecido("emitir boleto") is None
+
+
+def test_indice_nao_confunde_nomes_com_negacoes_diferentes():
+    indice = IndiceNgramas()
+    indice.adicionar("aprovar pedido")
+    assert indice.mais_parecido("nao aprovar pedido", limiar=0.5) is None
+    indice.adicionar("nao aprovar pedidos")
+    assert indice.mais_parecido("nao aprovar pedido")[0] == "nao aprovar pedidos"
+
+
+def test_mesmos_nomes_normalizados_geram_proposta_exata(base):
+    base.registrar("Vendas", "Pedido", "e1", "Aprovar pedido", "Emitir nota", "DEP", "Sim")
+    propostas = base.propostas("vendas", ["APROVAR PEDIDO", "emitir nota", "Arquivar"])
+    assert list(propostas) == [("APROVAR PEDIDO", "emitir nota", "DEP")]
+    proposta = propostas[("APROVAR PEDIDO", "emitir nota", "DEP")]
+    assert proposta["resposta"] == "Sim" and proposta["similaridade"] == 1
+    assert (proposta["id_entrevista"], proposta["afo_a_original"]) == ("e1", "Aprovar pedido")
+    assert base.propostas("Compras", ["Aprovar pedido", "Emitir nota"]) == {} # Outro domínio
+
+
+def test_nomes_parecidos_geram_proposta_com_similaridade_menor_que_1(base):
+    base.registrar("Vendas", "Pedido", "e1", "Aprovar pedido", "Emitir nota fiscal", "XOR", "Não")
+    propostas = base.propostas("Vendas", ["Aprovar o pedido", "Emitir nota fiscal"])
+    assert propostas[("Aprovar o pedido", "Emitir nota fiscal", "XOR")]["similaridade"] < 1
+    # Uma negação muda o sentido, então não há proposta
+    assert base.propostas("Vendas", ["Nao aprovar pedido", "Emitir nota fiscal"]) == {}
+
+
+def test_vale_a_validacao_mais_recente(base, relogio):
+    base.registrar("Vendas", "Pedido", "e1", "A", "B", "UNI", "Sim", opcoes_uni=(True, False, False))
+    relogio.agora += 10
+    base.registrar("Vendas", "Pedido", "e2", "A", "B", "UNI", "Sim", opcoes_uni=(False, False, True))
+    relogio.agora += 10
+    # Validar de novo na mesma entrevista substitui a anterior e passa a ser a mais recente
+    base.registrar("Vendas", "Pedido", "e1", "A", "B", "UNI", "Sim", opcoes_uni=(True, True, False))
+    proposta = base.propostas("Vendas", ["A", "B"])[("A", "B", "UNI")]
+    assert proposta["id_entrevista"] == "e1"
+    assert proposta["opcoes_uni"] == (True, True, False)
+
+
+def test_cada_nome_conhecido_corresponde_a_uma_so_afo(base):
+    base.registrar("Vendas", "Pedido", "e1", "Emitir nota fiscal", "Aprovar pedido", "DEP", "Sim")
+    propostas = base.propostas("Vendas", ["Emitir nota fiscal de saida", "Emitir nota fiscal", "Aprovar pedido"])
+    # Só a AFO idêntica herda a validação; a parecida fica sem proposta
+    assert list(propostas) == [("Emitir nota fiscal", "Aprovar pedido", "DEP")]
+    assert propostas[("Emitir nota fiscal", "Aprovar pedido", "DEP")]["similaridade"] == 1
+
+    propostas = base.propostas("Vendas", ["Emitir notas fiscais", "Emitir a nota fiscal", "Aprovar pedido"])
+    assert len(propostas) == 1
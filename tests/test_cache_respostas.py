@@ -0,0 +1,101 @@
+import pytest
+
+import cache_respostas
+from cache_respostas import CacheRespostas
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(cache_respostas.time, "time", relogio)
+    return relogio
+
+
+def chaves_no_disco(cache):
+    return {chave for (chave,) in cache._conexao.execute("SELECT chave FROM respostas")}
+
+
+def test_chave_depende_de_tudo_que_muda_a_resposta():
+    chave = CacheRespostas.gerar_chave("Processo", "Domínio", "Pergunta?", "XOR", "modelo")
+    assert chave == CacheRespostas.gerar_chave("Processo", "Domínio", "Pergunta?", "XOR", "modelo")
+    assert chave != CacheRespostas.gerar_chave("Processo", "Domínio", "Pergunta?", "XOR", "outro modelo")
+    assert chave != CacheRespostas.gerar_chave("Processo", "Domínio", "Pergunta?", "UNI", "modelo")
+
+
+def test_lru_em_memoria_remove_a_usada_ha_mais_tempo(tmp_path, relogio):
+    cache = CacheRespostas(str(tmp_path), capacidade_memoria=2)
+    cache.guardar("a", "Sim")
+    cache.guardar("b", "Não")
+    assert cache.obter("a") == "Sim" # "a" passa a ser a mais recente
+    cache.guardar("c", "Sim")
+    assert list(cache._memoria) == ["a", "c"]
+    # A removida da memória continua no disco e volta para a memória ao ser lida
+    assert cache.obter("b") == "Não"
+    assert list(cache._memoria) == ["c", "b"]
+
+
+def test_respostas_sobrevivem_a_uma_nova_instancia(tmp_path, relogio):
+    CacheRespostas(str(tmp_path)).guardar("a", "Sim")
+    assert CacheRespostas(str(tmp_path)).obter("a") == "Sim"
+
+
+def test_ttl_expira_na_memoria_e_no_disco(tmp_path, relogio):
+    cache = CacheRespostas(str(tmp_path), ttl_segundos=60)
+    cache.guardar("a", "Sim")
+    relogio.agora += 30
+    assert cache.obter("a") == "Sim"
+    relogio.agora += 31
+    assert cache.obter("a") is None
+    assert "a" not in cache._memoria
+    assert chaves_no_disco(cache) == set()
+
+    # Só no disco (outra instância, memória vazia): também expira
+    cache.guardar("b", "Não")
+    relogio.agora += 61
+    assert CacheRespostas(str(tmp_path), ttl_segundos=60).obter("b") is None
+    assert chaves_no_disco(cache) == set()
+
+
+def test_limite_do_disco_aplicado_a_cada_intervalo_de_gravacoes(tmp_path, relogio):
+    cache = CacheRespostas(str(tmp_path), max_entradas_disco=3, intervalo_limpeza=4)
+    for chave in "abc":
+        relogio.agora += 1
+        cache.guardar(chave, "Sim")
+    relogio.agora += 1
+    cache._memoria.clear()
+    assert cache.obter("a") == "Sim" # Lida do disco: "a" passa a ser acessada depois de "b" e "c"
+    relogio.agora += 1
+    cache.guardar("d", "Sim") # 4ª gravação: limpeza
+    assert chaves_no_disco(cache) == {"a", "c", "d"}
+
+    for chave in "efg": # Entre limpezas o disco pode passar do limite
+        relogio.agora += 1
+        cache.guardar(chave, "Sim")
+    assert len(chaves_no_disco(cache)) == 6
+    relogio.agora += 1
+    cache.guardar("h", "Sim")
+    assert chaves_no_disco(cache) == {"f", "g", "h"}
+
+
+def test_limpeza_periodica_remove_as_expiradas(tmp_path, relogio):
+    cache = CacheRespostas(str(tmp_path), ttl_segundos=60, intervalo_limpeza=2)
+    cache.guardar("a", "Sim")
+    relogio.agora += 61
+    cache.guardar("b", "Sim")
+    assert chaves_no_disco(cache) == {"b"}
+
+
+def test_limpar(tmp_path, relogio):
+    cache = CacheRespostas(str(tmp_path))
+    cache.guardar("a", "Sim")
+    cache.limpar()
+    assert cache.obter("a") is None
+    assert chaves_no_disco(cache) == set()
@@ -0,0 +1,93 @@
+import json
+from concurrent.futures import Future
+
+import motor_sbmn
+from agendador_llm import PRIORIDADE_ATUAL, PRIORIDADE_PRE_BUSCA
+from cache_respostas import CacheRespostas
+from consulta_lote import ESQUEMA_RESPOSTA_LOTE, interpretar_resposta_lote, montar_pedido_lote
+
+ITENS = [("Pergunta 0", "DEP_INICIAL"), ("Pergunta 1", "XOR"), ("Pergunta 2", "UNI")]
+AFOS = [("Aprovar", "Emitir")] * len(ITENS)
+
+
+def test_pedido_numera_as_perguntas_pela_posicao():
+    pedido = json.loads(montar_pedido_lote(ITENS))
+    assert [pergunta["id"] for pergunta in pedido["perguntas"]] == [0, 1, 2]
+    assert pedido["perguntas"][2] == {"id": 2, "tipo": "UNI", "pergunta": "Pergunta 2"}
+
+
+def test_respostas_validas_sao_normalizadas():
+    texto = json.dumps({"respostas": [
+        {"id": 0, "resposta": " sim. "},
+        {"id": 1, "resposta": "NAO"},
+        {"id": 2, "resposta": " apenas A e ambos "},
+    ]})
+    assert interpretar_resposta_lote(texto, ITENS, AFOS) == {0: "Sim", 1: "Não", 2: "apenas A e ambos"}
+
+
+def test_itens_malformados_ficam_de_fora():
+    texto = json.dumps({"respostas": [
+        {"id": 0, "resposta": "Talvez"}, # Não é Sim/Não
+        {"id": True, "resposta": "Sim"}, # bool não é id
+        {"id": 7, "resposta": "Sim"}, # Fora da lista
+        {"id": 1}, # Sem resposta
+        {"id": 2, "resposta": "   "},
+        "Sim",
+    ]})
+    assert interpretar_resposta_lote(texto, ITENS, AFOS) == {}
+
+
+def test_id_repetido_vale_a_primeira_resposta():
+    texto = json.dumps({"respostas": [{"id": 1, "resposta": "Sim"}, {"id": 1, "resposta": "Não"}]})
+    assert interpretar_resposta_lote(texto, ITENS, AFOS) == {1: "Sim"}
+
+
+def test_json_invalido_ou_fora_do_esquema_nao_tem_respostas():
+    assert interpretar_resposta_lote("não é JSON", ITENS, AFOS) == {}
+    assert interpretar_resposta_lote(None, ITENS, AFOS) == {}
+    assert interpretar_resposta_lote(json.dumps([{"id": 0, "resposta": "Sim"}]), ITENS, AFOS) == {}
+    assert interpretar_resposta_lote(json.dumps({"respostas": {"0": "Sim"}}), ITENS, AFOS) == {}
+
+
+def test_uni_sem_opcao_reconhecivel_fica_de_fora():
+    for resposta, valida in [
+        ("apenas A e ambos", True),
+        ("Somente Emitir.", True),
+        ("Ambas nunca ocorrem juntas", False), # A única opção citada está negada
+        ("Depende do cliente", False),
+        ("apenas a tarefa seguinte", False), # "a" minúsculo é artigo, não a opção A
+    ]:
+        texto = json.dumps({"respostas": [{"id": 2, "resposta": resposta}]})
+        assert (2 in interpretar_resposta_lote(texto, ITENS, AFOS)) is valida, resposta
+
+
+class BackendComFila:
+    """
+    BackendSimulado com a interface do agendador: guarda a prioridade e o esquema de cada pedido.
+    """
+
+    def __init__(self):
+        self.simulado = motor_sbmn.BackendSimulado()
+        self.nome_modelo = self.simulado.nome_modelo
+        self.pedidos = []
+
+    def enviar(self, historico, esquema_json=None, prioridade=PRIORIDADE_ATUAL):
+        self.pedidos.append((esquema_json, prioridade))
+        futuro = Future()
+        futuro.set_result(self.simulado.gerar(historico, esquema_json=esquema_json))
+        return futuro
+
+
+def test_lote_vai_para_a_fila_e_deixa_as_respostas_no_cache(tmp_path):
+    backend = BackendComFila()
+    especialista = motor_sbmn.EspecialistaIA(backend, cache=CacheRespostas(str(tmp_path)))
+    itens = [("Pedir", "Aprovar", tipo) for tipo in motor_sbmn.TIPOS_PERGUNTA]
+    especialista.consultar_lote_futuro("Compra", "Compras", itens, prioridade=PRIORIDADE_PRE_BUSCA).result()
+    assert backend.pedidos == [(ESQUEMA_RESPOSTA_LOTE, PRIORIDADE_PRE_BUSCA)]
+
+    for afo_a, afo_b, tipo in itens:
+        especialista.consultar("Compra", "Compras", motor_sbmn.formular_pergunta(afo_a, afo_b, tipo), tipo)
+    assert len(backend.pedidos) == 1 # Todas as respostas vieram do cache
+    # Com tudo no cache, o lote seguinte nem chega à fila
+    assert especialista.consultar_lote_futuro("Compra", "Compras", itens).done()
+    assert len(backend.pedidos) == 1
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+import motor_sbmn
+from cache_respostas import CacheRespostas
+from entrevistas_lote import executar_lote, main
+
+PROCESSOS = [
+    {"nome_processo": f"Processo {numero}", "dominio_processo": "Compras", "afos": ["Pedir", "Aprovar", "Pagar"]}
+    for numero in range(3)
+]
+
+
+class Interrompido(Exception):
+    pass
+
+
+@pytest.fixture
+def entrada(tmp_path):
+    caminho = tmp_path / "processos.jsonl"
+    caminho.write_text("".join(json.dumps(processo) + "\n" for processo in PROCESSOS), encoding="utf-8")
+    return str(caminho)
+
+
+def especialista(cache=None):
+    return motor_sbmn.EspecialistaIA(motor_sbmn.BackendSimulado(semente=1), cache=cache)
+
+
+def ler_saida(caminho):
+    with open(caminho, encoding="utf-8") as arquivo:
+        return [json.loads(linha) for linha in arquivo]
+
+
+def test_execucao_completa(entrada, tmp_path):
+    saida = str(tmp_path / "resultados.jsonl")
+    assert executar_lote(especialista(), entrada, saida, concorrencia=2) == (3, [])
+    resultados = ler_saida(saida)
+    assert sorted(r["nome_processo"] for r in resultados) == [p["nome_processo"] for p in PROCESSOS]
+    for resultado in resultados:
+        assert resultado["modelo"] == "simulado-1"
+        assert resultado["respostas"]
+        # Relações e respostas são as mesmas em todos os processos: o backend só depende da pergunta
+        assert resultado["relacoes"] == resultados[0]["relacoes"]
+
+
+def test_retomada_pula_os_concluidos_e_repara_a_ultima_linha(entrada, tmp_path):
+    saida = str(tmp_path / "resultados.jsonl")
+
+    def interromper(resultado):
+        raise Interrompido(resultado["nome_processo"])
+
+    with pytest.raises(Interrompido) as interrupcao:
+        executar_lote(especialista(), entrada, saida, concorrencia=1, ao_concluir=interromper)
+    primeiro = interrupcao.value.args[0]
+    with open(saida, "a", encoding="utf-8") as arquivo:
+        arquivo.write('{"nome_processo": "Processo 2", "dominio_proc') # Queda no meio da escrita
+
+    refeitos = []
+    total_ok, falhas = executar_lote(especialista(), entrada, saida, concorrencia=2,
+                                     ao_concluir=lambda resultado: refeitos.append(resultado["nome_processo"]))
+    assert (total_ok, falhas) == (2, [])
+    assert primeiro not in refeitos
+    resultados = ler_saida(saida) # Todas as linhas são JSON válido
+    assert sorted(r["nome_processo"] for r in resultados) == [p["nome_processo"] for p in PROCESSOS]
+
+    # Nada a refazer numa terceira execução
+    assert executar_lote(especialista(), entrada, saida) == (0, [])
+
+
+def test_respostas_ficam_no_cache_para_o_app(entrada, tmp_path):
+    cache = CacheRespostas(str(tmp_path / "cache"))
+    saida = str(tmp_path / "resultados.jsonl")
+    executar_lote(especialista(cache), entrada, saida)
+    resultado = ler_saida(saida)[0]
+    resposta = resultado["respostas"][0]
+    chave = CacheRespostas.gerar_chave(resultado["nome_processo"], resultado["dominio_processo"],
+                                       resposta["pergunta"], resposta["tipo_pergunta"], "simulado-1")
+    assert cache.obter(chave) == resposta["resposta_ia"]
+
+
+def test_linha_de_comando_avisa_quando_o_cache_nao_comporta_as_respostas(entrada, tmp_path, capsys):
+    saida = str(tmp_path / "resultados.jsonl")
+    codigo = main([entrada, saida, "--backend", "simulado", "--semente", "1",
+                   "--cache-dir", str(tmp_path / "cache"), "--cache-max-entradas", "5", "--cache-ttl", "0"])
+    assert codigo == 0
+    assert "aumente --cache-max-entradas" in capsys.readouterr().err
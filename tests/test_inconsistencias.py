@@ -0,0 +1,93 @@
+from inconsistencias import DetectorInconsistencias
+from inferencia import MotorInferencia
+
+
+def relacao(id_relacao, afo1, afo2, tipo):
+    return {"id": id_relacao, "afo1": afo1, "afo2": afo2, "tipo": tipo}
+
+
+def test_ciclo_de_dependencia_traz_o_caminho():
+    detector = DetectorInconsistencias()
+    assert detector.registrar(relacao(1, "A", "B", "DEP")) == []
+    assert detector.registrar(relacao(2, "B", "C", "DEP")) == []
+    [ciclo] = detector.registrar(relacao(3, "C", "A", "DEP"))
+    assert ciclo["tipo"] == "Ciclo de dependência"
+    assert ciclo["relacoes"] == [1, 2, 3]
+
+
+def test_dep_e_xor_no_mesmo_par_sao_operadores_equivalentes():
+    detector = DetectorInconsistencias()
+    detector.registrar(relacao(1, "A", "B", "DEP"))
+    [inconsistencia] = detector.registrar(relacao(2, "B", "A", "XOR"))
+    assert inconsistencia["tipo"] == "Equivalent Operators"
+    assert inconsistencia["relacoes"] == [1, 2]
+
+
+def test_bloqueio_de_dependencia_indireta_com_xor_antes_ou_depois():
+    # XOR registrada depois da cadeia
+    detector = DetectorInconsistencias()
+    detector.registrar(relacao(1, "A", "B", "DEP"))
+    detector.registrar(relacao(2, "B", "C", "DEP"))
+    [bloqueio] = detector.registrar(relacao(3, "A", "C", "XOR"))
+    assert bloqueio["tipo"] == "Bloqueio de dependência indireta"
+    assert bloqueio["relacoes"] == [1, 2, 3]
+
+    # XOR registrada antes: a aresta que fecha a cadeia é a que revela o bloqueio
+    detector = DetectorInconsistencias()
+    detector.registrar(relacao(1, "A", "C", "XOR"))
+    detector.registrar(relacao(2, "B", "C", "DEP"))
+    [bloqueio] = detector.registrar(relacao(3, "A", "B", "DEP"))
+    assert bloqueio["tipo"] == "Bloqueio de dependência indireta"
+    assert bloqueio["afos"] == ["A", "C"]
+    assert bloqueio["relacoes"] == [3, 2, 1]
+
+
+def test_dependencia_dual():
+    detector = DetectorInconsistencias()
+    detector.registrar(relacao(1, "A", "C", "DEP"))
+    detector.registrar(relacao(2, "B", "C", "DEP"))
+    [dual] = detector.registrar(relacao(3, "A", "B", "XOR"))
+    assert dual["tipo"] == "Dependência dual"
+    assert dual["afos"] == ["C", "A", "B"]
+    assert dual["relacoes"] == [1, 2, 3]
+
+    # Quando as cadeias se juntam depois da XOR, a dependência dual é encontrada pela nova DEP
+    detector = DetectorInconsistencias()
+    detector.registrar(relacao(1, "A", "B", "XOR"))
+    detector.registrar(relacao(2, "A", "C", "DEP"))
+    detector.registrar(relacao(3, "C", "D", "DEP"))
+    [dual] = detector.registrar(relacao(4, "B", "D", "DEP"))
+    assert dual["tipo"] == "Dependência dual"
+    assert sorted(dual["relacoes"]) == [1, 2, 3, 4]
+
+
+def test_promiscuidade_em_qualquer_ordem():
+    detector = DetectorInconsistencias()
+    detector.registrar(relacao(1, "A", "B", "XOR"))
+    [promiscuidade] = detector.registrar(relacao(2, "A", "B", "UNI"), opcoes_uni=(False, False, True))
+    assert promiscuidade["tipo"] == "Promiscuidade"
+    assert promiscuidade["relacoes"] == [1, 2]
+
+    detector = DetectorInconsistencias()
+    assert detector.registrar(relacao(1, "A", "B", "UNI"), opcoes_uni=(True, True, False)) == []
+    detector.registrar(relacao(2, "B", "A", "UNI"), opcoes_uni=(False, False, True))
+    [promiscuidade] = detector.registrar(relacao(3, "B", "A", "XOR"))
+    assert promiscuidade["tipo"] == "Promiscuidade"
+
+
+def test_mesma_inconsistencia_nao_e_reportada_de_novo():
+    detector = DetectorInconsistencias()
+    detector.registrar(relacao(1, "A", "B", "DEP"))
+    assert len(detector.registrar(relacao(2, "A", "B", "XOR"))) == 1
+    assert detector.registrar(relacao(3, "B", "A", "XOR")) == []
+    assert len(detector.inconsistencias) == 1
+
+
+def test_motor_de_inferencia_le_o_grafo_do_detector():
+    detector = DetectorInconsistencias()
+    motor = MotorInferencia(detector.dependencias)
+    detector.registrar(relacao(1, "A", "B", "DEP"))
+    detector.registrar(relacao(2, "B", "C", "DEP"))
+    assert motor.resposta_inferida("A", "C", "XOR") == "Sim"
+    assert motor.resposta_inferida("A", "C", "DEP_COMPLEMENTAR") is None
+    assert motor.resposta_inferida("C", "A", "DEP_COMPLEMENTAR") == "Não"
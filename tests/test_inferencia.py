@@ -0,0 +1,116 @@
+from concurrent.futures import Future
+
+import motor_sbmn
+from pre_busca import PreBuscaPerguntas
+
+
+def iniciar(afos):
+    estado = motor_sbmn.EstadoEntrevista()
+    motor_sbmn.iniciar_entrevista(estado, "Processo", "Domínio", afos)
+    return estado
+
+
+def responder(estado, resposta=None, opcoes_uni=None):
+    """
+    Confirma a pergunta atual como o analista; na UNI a resposta vem das opções.
+    """
+    afo_a, afo_b, tipo = motor_sbmn.pergunta_atual(estado)
+    if tipo == "UNI":
+        resposta = motor_sbmn.texto_opcoes_uni(afo_a, afo_b, opcoes_uni)
+    evento = {
+        "indice_par": estado.indice_par_atual, "tipo_pergunta": tipo, "resposta_ia": "",
+        "resposta": resposta, "observacao": "", "opcoes_uni": opcoes_uni,
+    }
+    assert motor_sbmn.aplicar_resposta_confirmada(estado, evento) == []
+
+
+def pular(estado):
+    # O mesmo critério do app, sem as propostas da base de conhecimento
+    return lambda a, b, tipo: estado.motor_inferencia.resposta_inferida(a, b, tipo) is not None
+
+
+def pedidos_da_pre_busca(estado):
+    """
+    Perguntas que a pré-busca enviaria à IA a partir da pergunta atual.
+    """
+    pedidos = []
+
+    def consultar(pergunta, tipo, prioridade):
+        pedidos.append(pergunta)
+        return Future()
+
+    pre_busca = PreBuscaPerguntas(consultar, lambda a, b, tipo: (a, b, tipo), profundidade=100)
+    pre_busca.atualizar(estado.pares_pendentes, estado.indice_par_atual, estado.pergunta_tipo, pular=pular(estado))
+    return pedidos
+
+
+def inferida(estado, afo_a, afo_b, tipo_relacao):
+    relacao = estado.relacoes.buscar(afo_a, afo_b, tipo_relacao)
+    assert relacao is not None and relacao["origem"] == "inferido"
+    return relacao
+
+
+def test_xor_simetrica_e_uni_espelhada():
+    estado = iniciar(["A", "B"])
+    responder(estado, "Não") # DEP_INICIAL (A, B)
+    responder(estado, "Não") # XOR (A, B): não podem ocorrer juntas
+    responder(estado, opcoes_uni=(True, False, False))
+    xor = estado.relacoes.buscar("A", "B", "XOR")["id"]
+    uni = estado.relacoes.buscar("A", "B", "NÃO_UNI")["id"]
+
+    # No par (B, A) só a DEP ainda é perguntada
+    assert motor_sbmn.pergunta_atual(estado) == ("B", "A", "DEP_INICIAL")
+    assert pedidos_da_pre_busca(estado) == [("B", "A", "DEP_INICIAL")]
+
+    responder(estado, "Não")
+    assert motor_sbmn.pergunta_atual(estado) is None
+    relacao_xor = inferida(estado, "B", "A", "XOR")
+    assert (relacao_xor["sua_validacao"], relacao_xor["justificativa"]) == ("Não", [xor])
+    relacao_uni = inferida(estado, "B", "A", "NÃO_UNI")
+    assert relacao_uni["sua_validacao"] == motor_sbmn.texto_opcoes_uni("B", "A", (False, True, False))
+    assert relacao_uni["justificativa"] == [uni]
+
+
+def test_dep_estrita_responde_a_complementar_inversa_com_nao():
+    estado = iniciar(["A", "B"])
+    responder(estado, "Sim") # DEP_INICIAL (A, B)
+    responder(estado, "Sim") # DEP_COMPLEMENTAR (A, B): dependência estrita A -> B
+    dep = estado.relacoes.buscar("A", "B", "DEP")["id"]
+    # A XOR do mesmo par também é deduzida: quem depende estritamente coexiste
+    assert inferida(estado, "A", "B", "NÃO_XOR")["justificativa"] == [dep]
+    responder(estado, opcoes_uni=(False, False, True))
+
+    assert motor_sbmn.pergunta_atual(estado) == ("B", "A", "DEP_INICIAL")
+    assert pedidos_da_pre_busca(estado) == [("B", "A", "DEP_INICIAL")]
+    responder(estado, "Sim")
+    relacao = inferida(estado, "B", "A", "DEPC")
+    assert (relacao["sua_validacao"], relacao["justificativa"]) == ("Não", [dep])
+    assert motor_sbmn.pergunta_atual(estado) is None
+
+
+def test_cadeia_de_dep_implica_coexistencia():
+    # Os pares começam por (B, A) e (B, C), então a cadeia A -> B -> C se fecha antes do par (A, C)
+    estado = iniciar(["B", "A", "C"])
+    responder(estado, "Não") # DEP_INICIAL (B, A)
+    responder(estado, "Sim") # XOR (B, A): podem ocorrer juntas
+    responder(estado, opcoes_uni=(False, False, True))
+    responder(estado, "Sim") # DEP_INICIAL (B, C)
+    responder(estado, "Sim") # DEP_COMPLEMENTAR (B, C): B -> C
+    responder(estado, opcoes_uni=(False, False, True))
+    assert motor_sbmn.pergunta_atual(estado) == ("A", "B", "DEP_INICIAL")
+    responder(estado, "Sim")
+    responder(estado, "Sim") # DEP_COMPLEMENTAR (A, B): A -> B, e a cadeia A -> B -> C está fechada
+    # XOR e UNI de (A, B) vêm espelhadas de (B, A)
+    assert inferida(estado, "A", "B", "NÃO_UNI")["justificativa"] == [estado.relacoes.buscar("B", "A", "NÃO_UNI")["id"]]
+    dep_ab = estado.relacoes.buscar("A", "B", "DEP")["id"]
+    dep_bc = estado.relacoes.buscar("B", "C", "DEP")["id"]
+
+    assert motor_sbmn.pergunta_atual(estado) == ("A", "C", "DEP_INICIAL")
+    pedidos = pedidos_da_pre_busca(estado)
+    assert ("A", "C", "XOR") not in pedidos
+    assert ("A", "C", "UNI") in pedidos
+
+    responder(estado, "Não") # DEP_INICIAL (A, C): a XOR é deduzida da cadeia
+    relacao = inferida(estado, "A", "C", "NÃO_XOR")
+    assert (relacao["sua_validacao"], relacao["justificativa"]) == ("Sim", [dep_ab, dep_bc])
+    assert motor_sbmn.pergunta_atual(estado) == ("A", "C", "UNI")
@@ -0,0 +1,94 @@
+import json
+import urllib.request
+
+import pytest
+
+import metricas
+from metricas import Histograma, RegistroMetricas, servir_metricas
+
+
+def histograma(*valores, limites=(1.0, 2.0, 4.0)):
+    resultado = Histograma(limites)
+    for valor in valores:
+        resultado.observar(valor)
+    return resultado
+
+
+def test_quantil_de_histograma_vazio():
+    assert histograma().quantil(0.5) is None
+
+
+def test_quantil_interpola_dentro_do_intervalo():
+    # Intervalos (0, 1], (1, 2], (2, 4]: contagens 1, 2 e 1
+    dados = histograma(0.5, 1.5, 1.5, 3.0)
+    assert dados.contagens == [1, 2, 1, 0]
+    assert dados.quantil(0.25) == pytest.approx(1.0)
+    assert dados.quantil(0.5) == pytest.approx(1.5)
+    assert dados.quantil(1.0) == pytest.approx(4.0)
+    # O limite pertence ao intervalo que ele fecha, como o "le" do Prometheus
+    assert histograma(1.0).contagens == [1, 0, 0, 0]
+
+
+def test_quantil_no_intervalo_infinito_e_o_ultimo_limite():
+    dados = histograma(0.5, 10.0, 20.0)
+    assert dados.contagens == [1, 0, 0, 2]
+    assert dados.quantil(0.9) == 4.0
+    assert dados.quantil(0.1) == pytest.approx(0.3)
+
+
+def test_prometheus_com_intervalos_acumulados_e_rotulos_escapados():
+    registro = RegistroMetricas()
+    registro.incrementar("sbmn_chamadas_total", resultado='erro "grave"\\ em\nduas linhas')
+    registro.incrementar("sbmn_chamadas_total", 2, resultado="ok")
+    for valor in (0.0005, 0.5, 1000.0):
+        registro.observar("sbmn_rerun_segundos", valor, fase="entrevista")
+    linhas = registro.como_prometheus().splitlines()
+
+    assert linhas[:3] == [
+        "# TYPE sbmn_chamadas_total counter",
+        'sbmn_chamadas_total{resultado="erro \\"grave\\"\\\\ em\\nduas linhas"} 1',
+        'sbmn_chamadas_total{resultado="ok"} 2',
+    ]
+    assert linhas[3] == "# TYPE sbmn_rerun_segundos histogram"
+    intervalos = [linha for linha in linhas if linha.startswith("sbmn_rerun_segundos_bucket")]
+    assert len(intervalos) == len(metricas.LIMITES_SEGUNDOS) + 1
+    assert intervalos[0] == 'sbmn_rerun_segundos_bucket{fase="entrevista",le="0.001"} 1'
+    assert 'sbmn_rerun_segundos_bucket{fase="entrevista",le="0.5"} 2' in intervalos
+    assert intervalos[-2] == 'sbmn_rerun_segundos_bucket{fase="entrevista",le="300.0"} 2'
+    assert intervalos[-1] == 'sbmn_rerun_segundos_bucket{fase="entrevista",le="+Inf"} 3'
+    acumulados = [int(linha.rsplit(" ", 1)[1]) for linha in intervalos]
+    assert acumulados == sorted(acumulados)
+    assert linhas[-2] == 'sbmn_rerun_segundos_sum{fase="entrevista"} 1000.5005'
+    assert linhas[-1] == 'sbmn_rerun_segundos_count{fase="entrevista"} 3'
+
+
+def test_jsonl_tem_uma_linha_por_serie():
+    registro = RegistroMetricas()
+    registro.incrementar("sbmn_cache_consultas_total", resultado="acerto")
+    registro.observar("sbmn_llm_chamada_segundos", 0.2, modo="normal")
+    linhas = [json.loads(linha) for linha in registro.como_jsonl()]
+
+    assert [(linha["metrica"], linha["tipo"]) for linha in linhas] == [
+        ("sbmn_cache_consultas_total", "contador"), ("sbmn_llm_chamada_segundos", "histograma"),
+    ]
+    assert linhas[0]["rotulos"] == {"resultado": "acerto"} and linhas[0]["valor"] == 1
+    assert linhas[1]["limites"] == list(metricas.LIMITES_SEGUNDOS)
+    assert (linhas[1]["total"], sum(linhas[1]["contagens"])) == (1, 1)
+    assert linhas[0]["instante"] == linhas[1]["instante"]
+
+
+def test_servir_de_novo_na_mesma_porta_reaproveita_o_servidor():
+    primeiro = RegistroMetricas()
+    servidor = servir_metricas(primeiro, 0)
+    try:
+        porta = servidor.server_address[1]
+        # Como ao limpar o st.cache_resource: um registro novo para a mesma porta
+        segundo = RegistroMetricas()
+        segundo.incrementar("sbmn_novo_total")
+        assert servir_metricas(segundo, porta) is servidor
+        with urllib.request.urlopen(f"http://127.0.0.1:{porta}/metrics", timeout=5) as resposta:
+            assert resposta.read().decode("utf-8") == segundo.como_prometheus()
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+        metricas._servidores.pop(("127.0.0.1", servidor.server_address[1]), None)
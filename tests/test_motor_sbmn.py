@@ -0,0 +1,101 @@
+import pytest
+
+import motor_sbmn
+from entrevistas_lote import interpretar_resposta
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("Sim.", "Sim"),
+    ("  **não**, pois depende", "Não"),
+    ("Nao", "Não"),
+    ("Depende do contexto", None),
+    ("", None),
+    (None, None),
+])
+def test_extrair_sim_nao(texto, esperado):
+    assert motor_sbmn.extrair_sim_nao(texto) == esperado
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("Apenas A e ambos.", (True, False, True)),
+    ("Somente B.", (False, True, False)),
+    ("Apenas 'Emitir nota' pode ocorrer.", (True, False, False)),
+    ("Só a tarefa Pagar ocorre sozinha.", (False, True, False)),
+    # O artigo "a" não é a opção A
+    ("Apenas a tarefa de pagamento ocorre, e ambas podem ocorrer juntas.", (False, False, True)),
+    # Opções negadas na mesma oração não contam
+    ("Ambas nunca ocorrem juntas; apenas B.", (False, True, False)),
+    ("Não apenas A, mas apenas B.", (False, True, False)),
+    ("Nenhuma das opções.", (False, False, False)),
+])
+def test_extrair_opcoes_uni(texto, esperado):
+    assert motor_sbmn.extrair_opcoes_uni(texto, "Emitir nota", "Pagar") == esperado
+
+
+def test_interpretar_resposta_nao_inventa_resposta():
+    assert interpretar_resposta("Sim, sempre.", "XOR", "A1", "B1") == ("Sim", None)
+    assert interpretar_resposta("Depende.", "DEP_INICIAL", "A1", "B1") == (None, None)
+    assert interpretar_resposta("Nenhuma das opções.", "UNI", "A1", "B1") == (None, None)
+    resposta, opcoes = interpretar_resposta("Apenas A.", "UNI", "A1", "B1")
+    assert opcoes == (True, False, False)
+    assert resposta == motor_sbmn.texto_opcoes_uni("A1", "B1", opcoes)
+
+
+def test_pular_pergunta_nao_registra_relacao():
+    estado = motor_sbmn.EstadoEntrevista()
+    motor_sbmn.iniciar_entrevista(estado, "Processo", "Domínio", ["A1", "B1", "C1"])
+    par = estado.indice_par_atual
+    motor_sbmn.pular_pergunta(estado) # DEP_INICIAL sem resposta também pula a DEP_COMPLEMENTAR
+    assert len(estado.relacoes) == 0
+    assert (estado.indice_par_atual, estado.pergunta_tipo) == (par, "XOR")
+
+
+@pytest.mark.parametrize("texto, completo, esperado", [
+    ("Si", False, None), # A primeira palavra pode continuar
+    ("Sim", False, None),
+    ("Sim,", False, "Sim"),
+    ("Sim", True, "Sim"),
+    ("Não ", False, "Não"),
+    ("Talvez ", False, None),
+])
+def test_extrair_resposta_parcial_binaria(texto, completo, esperado):
+    assert motor_sbmn.extrair_resposta_parcial(texto, "XOR", "A1", "B1", completo=completo) == esperado
+
+
+def test_extrair_resposta_parcial_uni_espera_o_fim_da_primeira_frase():
+    parcial = lambda texto, completo=False: motor_sbmn.extrair_resposta_parcial(
+        texto, "UNI", "Emitir N.F.", "Pagar", completo=completo,
+    )
+    assert parcial("Apenas A e") is None
+    assert parcial("Apenas A e ambos. Porque") == (True, False, True)
+    assert parcial("Apenas Emitir N.F.") is None # O ponto dentro do nome não encerra a frase
+    assert parcial("Apenas Emitir N.F.", completo=True) == (True, False, False)
+    assert parcial("Nenhuma delas.\n") is None
+
+
+class BackendEmPartes:
+    nome_modelo = "falso"
+
+    def __init__(self, partes):
+        self.partes = partes
+        self.enviadas = 0
+        self.fechado = False
+
+    def gerar_fluxo(self, historico):
+        try:
+            for parte in self.partes:
+                self.enviadas += 1
+                yield parte
+        finally:
+            self.fechado = True
+
+
+def test_consultar_fluxo_para_a_geracao_quando_a_resposta_esta_decidida():
+    backend = BackendEmPartes(["Nã", "o, ", "porque ", "as tarefas ", "são independentes."])
+    recebidos = []
+    texto, resposta = motor_sbmn.EspecialistaIA(backend).consultar_fluxo(
+        "Processo", "Domínio", "A1", "B1", "DEP_INICIAL", ao_receber=recebidos.append,
+    )
+    assert (texto, resposta) == ("Não,", "Não")
+    assert recebidos == ["Nã", "Não, "]
+    assert backend.enviadas == 2 and backend.fechado
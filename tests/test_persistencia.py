@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+from persistencia import DiarioEntrevista
+
+
+@pytest.fixture
+def diario(tmp_path):
+    diario = DiarioEntrevista(str(tmp_path), DiarioEntrevista.novo_id(), intervalo_snapshot=2)
+    diario.registrar_inicio("Processo", "Domínio", ["A", "B"])
+    return diario
+
+
+def caminho_diario(diario):
+    return diario._caminho_diario
+
+
+def test_id_invalido_e_recusado(tmp_path):
+    with pytest.raises(ValueError):
+        DiarioEntrevista(str(tmp_path), "../outra_pasta")
+
+
+def test_entrevista_inexistente(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        DiarioEntrevista(str(tmp_path), DiarioEntrevista.novo_id()).carregar()
+
+
+def test_sem_snapshot_todos_os_eventos_sao_reaplicados(diario):
+    diario.registrar_resposta({"indice_par": 0, "resposta": "Sim"})
+    estado, eventos = diario.carregar()
+    assert estado is None
+    assert [evento["evento"] for evento in eventos] == ["inicio", "resposta"]
+    assert eventos[0]["afos"] == ["A", "B"]
+
+
+def test_linha_incompleta_e_descartada_e_o_diario_continua_valido(diario):
+    diario.registrar_resposta({"indice_par": 0, "resposta": "Sim"})
+    tamanho = os.path.getsize(caminho_diario(diario))
+    with open(caminho_diario(diario), "ab") as arquivo:
+        arquivo.write(b'{"evento": "resposta", "indice_par": 1, "resp') # Queda no meio da escrita
+
+    _, eventos = diario.carregar()
+    assert len(eventos) == 2
+    assert os.path.getsize(caminho_diario(diario)) == tamanho
+
+    diario.registrar_resposta({"indice_par": 1, "resposta": "Não"})
+    _, eventos = diario.carregar()
+    assert [evento.get("indice_par") for evento in eventos] == [None, 0, 1]
+
+
+def test_snapshot_mais_delta(diario, tmp_path):
+    diario.registrar_resposta({"indice_par": 0, "resposta": "Sim"})
+    diario.registrar_resposta({"indice_par": 1, "resposta": "Não"})
+    assert diario.precisa_snapshot()
+    diario.salvar_snapshot({"relacoes": 2})
+    assert not diario.precisa_snapshot()
+    diario.registrar_resposta({"indice_par": 2, "resposta": "Sim"})
+
+    retomado = DiarioEntrevista(str(tmp_path), diario.id_entrevista, intervalo_snapshot=2)
+    estado, eventos = retomado.carregar()
+    assert estado == {"relacoes": 2}
+    assert [evento["indice_par"] for evento in eventos] == [2] # Só o que veio depois do snapshot
+    retomado.registrar_resposta({"indice_par": 3, "resposta": "Sim"})
+    assert retomado.precisa_snapshot() # O delta reaplicado conta para o próximo snapshot
+
+
+def test_inicio_incompleto_sem_snapshot(tmp_path):
+    diario = DiarioEntrevista(str(tmp_path), DiarioEntrevista.novo_id())
+    os.makedirs(os.path.dirname(caminho_diario(diario)))
+    with open(caminho_diario(diario), "wb") as arquivo:
+        arquivo.write(b'{"evento": "inicio", "nome_pro') # Queda durante a primeira escrita
+    with pytest.raises(ValueError):
+        diario.carregar()
+
+
+def test_linha_corrompida_no_meio_nao_apaga_as_seguintes(diario):
+    for indice in range(3):
+        diario.registrar_resposta({"indice_par": indice, "resposta": "Sim"})
+    with open(caminho_diario(diario), "rb") as arquivo:
+        linhas = arquivo.readlines()
+    linhas[2] = b'{"evento": "resposta", "indi\n'
+    with open(caminho_diario(diario), "wb") as arquivo:
+        arquivo.writelines(linhas)
+
+    with pytest.raises(ValueError):
+        diario.carregar()
+    with open(caminho_diario(diario), "rb") as arquivo:
+        assert arquivo.readlines() == linhas
+
+
+@pytest.mark.parametrize("conteudo", [
+    b"", # Vazio
+    b"\x80\x05\x95lixo", # Truncado
+    b"cmodulo_removido\nClasse\n.", # Classe de um módulo que não existe mais
+    b"cpersistencia\nClasseRemovida\n.", # Classe que saiu do módulo
+])
+def test_snapshot_ilegivel_vira_value_error(diario, conteudo):
+    diario.salvar_snapshot({"relacoes": 0})
+    with open(diario._caminho_snapshot, "wb") as arquivo:
+        arquivo.write(conteudo)
+    with pytest.raises(ValueError):
+        diario.carregar()
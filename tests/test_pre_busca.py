@@ -0,0 +1,144 @@
+from concurrent.futures import Future
+
+from agendador_llm import PRIORIDADE_ATUAL, PRIORIDADE_ESPECULATIVA, PRIORIDADE_PRE_BUSCA
+from pre_busca import PreBuscaPerguntas
+
+PARES = [("A", "B"), ("A", "C")]
+
+
+class ConsultaControlada:
+    """
+    Guarda cada pedido (pergunta, tipo, prioridade) com o seu Future, resolvido pelo teste.
+    """
+
+    def __init__(self):
+        self.pedidos = []
+
+    def __call__(self, pergunta, tipo, prioridade):
+        futuro = Future()
+        self.pedidos.append((pergunta, prioridade, futuro))
+        return futuro
+
+    def prioridades(self):
+        return [(pergunta, prioridade) for pergunta, prioridade, _ in self.pedidos]
+
+    def futuro(self, pergunta):
+        return [futuro for texto, _, futuro in self.pedidos if texto == pergunta][-1]
+
+
+def criar(profundidade=3):
+    consultar = ConsultaControlada()
+    pre_busca = PreBuscaPerguntas(consultar, lambda a, b, tipo: f"{a}{b} {tipo}", profundidade=profundidade)
+    return pre_busca, consultar
+
+
+def test_atual_tem_prioridade_e_complementar_espera_a_dep_inicial():
+    pre_busca, consultar = criar()
+    pre_busca.atualizar(PARES, 0, "DEP_INICIAL")
+    assert consultar.prioridades() == [
+        ("AB DEP_INICIAL", PRIORIDADE_ATUAL), ("AB XOR", PRIORIDADE_PRE_BUSCA), ("AB UNI", PRIORIDADE_PRE_BUSCA),
+    ]
+    assert not pre_busca.agendada("A", "B", "DEP_COMPLEMENTAR")
+
+    consultar.futuro("AB DEP_INICIAL").set_result("Sim, depende.")
+    assert consultar.prioridades()[-1] == ("AB DEP_COMPLEMENTAR", PRIORIDADE_ESPECULATIVA)
+    assert pre_busca.agendada("A", "B", "DEP_COMPLEMENTAR")
+
+
+def test_complementar_nao_e_pedida_quando_a_ia_responde_nao():
+    pre_busca, consultar = criar()
+    pre_busca.atualizar(PARES, 0, "DEP_INICIAL")
+    consultar.futuro("AB DEP_INICIAL").set_result("Não.")
+    pre_busca.atualizar(PARES, 0, "DEP_INICIAL")
+    assert "AB DEP_COMPLEMENTAR" not in [pergunta for pergunta, _ in consultar.prioridades()]
+
+    # O analista discordou da IA: a DEP_COMPLEMENTAR vira a pergunta atual e é pedida
+    pre_busca.atualizar(PARES, 0, "DEP_COMPLEMENTAR")
+    assert ("AB DEP_COMPLEMENTAR", PRIORIDADE_ATUAL) in consultar.prioridades()
+
+
+def test_perguntas_fora_do_plano_sao_canceladas():
+    pre_busca, consultar = criar()
+    pre_busca.atualizar(PARES, 0, "DEP_INICIAL")
+    consultar.futuro("AB DEP_INICIAL").set_result("Não")
+    pre_busca.atualizar(PARES, 1, "DEP_INICIAL") # Par (A, B) respondido
+    assert consultar.futuro("AB XOR").cancelled()
+    assert consultar.futuro("AB UNI").cancelled()
+    assert pre_busca.agendada("A", "C", "DEP_INICIAL")
+
+
+def test_pre_busca_que_vira_pergunta_atual_e_adiantada():
+    pre_busca, consultar = criar()
+    pre_busca.atualizar(PARES, 0, "DEP_INICIAL")
+    consultar.futuro("AB DEP_INICIAL").set_result("Não")
+    pre_busca.atualizar(PARES, 0, "XOR")
+    anterior = [futuro for pergunta, _, futuro in consultar.pedidos if pergunta == "AB XOR"][0]
+    assert anterior.cancelled()
+    assert consultar.prioridades()[-2:] == [("AB XOR", PRIORIDADE_ATUAL), ("AC DEP_INICIAL", PRIORIDADE_PRE_BUSCA)]
+
+    consultar.futuro("AB XOR").set_result("Sim")
+    assert pre_busca.obter("A", "B", "XOR") == "Sim"
+
+
+class LoteControlado:
+    """
+    Guarda cada pedido de lote (perguntas, prioridade) com o seu Future, resolvido pelo teste.
+    """
+
+    def __init__(self):
+        self.pedidos = []
+
+    def __call__(self, itens, prioridade):
+        futuro = Future()
+        self.pedidos.append((itens, prioridade, futuro))
+        return futuro
+
+
+PARES_LOTE = [("A", "B"), ("A", "C"), ("B", "C")]
+
+
+def criar_em_lote():
+    consultar, consultar_lote = ConsultaControlada(), LoteControlado()
+    pre_busca = PreBuscaPerguntas(consultar, lambda a, b, tipo: f"{a}{b} {tipo}",
+                                  consultar_lote=consultar_lote, pares_por_lote=1)
+    return pre_busca, consultar, consultar_lote
+
+
+def test_lote_atual_e_seguinte_vao_para_a_fila_com_prioridades_diferentes():
+    pre_busca, consultar, consultar_lote = criar_em_lote()
+    pre_busca.atualizar(PARES_LOTE, 0, "DEP_INICIAL")
+    assert [(itens[0], prioridade) for itens, prioridade, _ in consultar_lote.pedidos] == [
+        (("A", "B", "DEP_INICIAL"), PRIORIDADE_ATUAL), (("A", "C", "DEP_INICIAL"), PRIORIDADE_PRE_BUSCA),
+    ]
+    assert consultar.pedidos == [] # Nada é perguntado individualmente antes do lote terminar
+
+    # Com o lote pronto, cada pergunta é resolvida pelo caminho individual (o cache, no app)
+    consultar_lote.pedidos[0][2].set_result(None)
+    assert {prioridade for _, prioridade, _ in consultar.pedidos} == {PRIORIDADE_ATUAL}
+    consultar.futuro("AB XOR").set_result("Sim")
+    assert pre_busca.obter("A", "B", "XOR") == "Sim"
+
+
+def test_lote_seguinte_que_vira_o_atual_e_adiantado():
+    pre_busca, _, consultar_lote = criar_em_lote()
+    pre_busca.atualizar(PARES_LOTE, 0, "DEP_INICIAL")
+    seguinte = consultar_lote.pedidos[1][2]
+    pre_busca.atualizar(PARES_LOTE, 1, "DEP_INICIAL")
+    assert consultar_lote.pedidos[0][2].cancelled() # O bloco do par (A, B) saiu do plano
+    assert seguinte.cancelled()
+    assert [(itens[0], prioridade) for itens, prioridade, _ in consultar_lote.pedidos[2:]] == [
+        (("A", "C", "DEP_INICIAL"), PRIORIDADE_ATUAL), (("B", "C", "DEP_INICIAL"), PRIORIDADE_PRE_BUSCA),
+    ]
+
+
+def test_lote_que_falha_segue_pelo_caminho_individual():
+    pre_busca, consultar, consultar_lote = criar_em_lote()
+    pre_busca.atualizar(PARES_LOTE, 0, "DEP_INICIAL")
+    consultar_lote.pedidos[1][2].set_exception(ValueError("JSON inválido"))
+    assert {prioridade for _, prioridade, _ in consultar.pedidos} == {PRIORIDADE_PRE_BUSCA}
+    consultar.futuro("AC UNI").set_result("apenas A")
+    assert pre_busca.obter("A", "C", "UNI") == "apenas A"
+
+    pre_busca.cancelar_tudo()
+    assert consultar_lote.pedidos[0][2].cancelled()
+    assert consultar.futuro("AC XOR").cancelled()
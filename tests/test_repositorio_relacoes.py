@@ -0,0 +1,98 @@
+import pytest
+
+from repositorio_relacoes import RepositorioRelacoes
+
+
+def verificar_indices(repositorio):
+    """
+    Reconstrói os índices a partir das relações e compara com os mantidos pelo repositório.
+    """
+    por_par_ordenado, por_par, por_tipo = {}, {}, {}
+    for relacao in repositorio._relacoes.values():
+        a, b = relacao.afo1, relacao.afo2
+        por_par_ordenado.setdefault((a, b), {})[relacao.tipo] = relacao.id
+        por_par.setdefault((min(a, b), max(a, b)), {})[relacao.id] = None
+        por_tipo.setdefault(relacao.tipo, {})[relacao.id] = None
+    assert repositorio._por_par_ordenado == por_par_ordenado
+    assert repositorio._por_par == por_par
+    assert {tipo: ids for tipo, ids in repositorio._por_tipo.items() if ids} == por_tipo
+
+
+def ids(relacoes):
+    return [relacao["id"] for relacao in relacoes]
+
+
+def test_adicionar_indexa_por_par_e_por_tipo():
+    repositorio = RepositorioRelacoes()
+    dep = repositorio.adicionar("A", "B", "DEP", sua_validacao="Sim")
+    xor = repositorio.adicionar("B", "A", "XOR", sua_validacao="Sim")
+    uni = repositorio.adicionar("A", "C", "UNI", sua_validacao="Sim")
+    verificar_indices(repositorio)
+
+    assert repositorio.existe("A", "B", "DEP")
+    assert not repositorio.existe("B", "A", "DEP")
+    assert repositorio.existe("B", "A", "DEP", qualquer_ordem=True)
+    assert ids(repositorio.relacoes_do_par("B", "A")) == [dep, xor]
+    assert ids(repositorio.por_tipo("UNI")) == [uni]
+    assert repositorio.buscar("A", "B", "DEP")["sua_validacao"] == "Sim"
+    assert repositorio.buscar("A", "X", "DEP") is None
+
+
+def test_adicionar_o_mesmo_tipo_para_o_par_substitui_a_anterior():
+    repositorio = RepositorioRelacoes()
+    primeira = repositorio.adicionar("A", "B", "DEP", sua_validacao="Sim")
+    segunda = repositorio.adicionar("A", "B", "DEP", sua_validacao="Não")
+    verificar_indices(repositorio)
+    assert len(repositorio) == 1
+    assert repositorio.obter(primeira) is None
+    assert ids(repositorio.relacoes_do_par("A", "B")) == [segunda]
+
+
+def test_atualizar_reindexa_a_relacao():
+    repositorio = RepositorioRelacoes()
+    dep = repositorio.adicionar("A", "B", "DEP")
+    repositorio.atualizar(dep, tipo="DEPC", afo2="C", sua_validacao="Não")
+    verificar_indices(repositorio)
+    assert not repositorio.existe("A", "B", "DEP")
+    assert repositorio.relacoes_do_par("A", "B") == []
+    assert repositorio.buscar("A", "C", "DEPC")["sua_validacao"] == "Não"
+    assert repositorio.por_tipo("DEP") == []
+    assert ids(repositorio.por_tipo("DEPC")) == [dep]
+
+
+def test_atualizar_para_um_tipo_ja_registrado_substitui_o_outro():
+    repositorio = RepositorioRelacoes()
+    dep = repositorio.adicionar("A", "B", "DEP")
+    depc = repositorio.adicionar("A", "B", "DEPC")
+    repositorio.atualizar(dep, tipo="DEPC")
+    verificar_indices(repositorio)
+    assert repositorio.obter(depc) is None
+    assert ids(repositorio.relacoes_do_par("A", "B")) == [dep]
+
+
+def test_atualizar_com_campo_invalido_nao_altera_nada():
+    repositorio = RepositorioRelacoes()
+    dep = repositorio.adicionar("A", "B", "DEP")
+    antes = repositorio.obter(dep)
+    with pytest.raises(KeyError):
+        repositorio.atualizar(dep, tipo="XOR", bogus=1)
+    with pytest.raises(KeyError):
+        repositorio.atualizar(dep, id=99)
+    verificar_indices(repositorio)
+    assert repositorio.obter(dep) == antes
+    assert repositorio.existe("A", "B", "DEP")
+    assert ids(repositorio.por_tipo("DEP")) == [dep]
+
+
+def test_retirar_remove_de_todos_os_indices():
+    repositorio = RepositorioRelacoes()
+    dep = repositorio.adicionar("A", "B", "DEP")
+    xor = repositorio.adicionar("A", "B", "XOR")
+    repositorio.retirar(dep)
+    verificar_indices(repositorio)
+    assert not repositorio.existe("A", "B", "DEP", qualquer_ordem=True)
+    assert ids(repositorio.relacoes_do_par("A", "B")) == [xor]
+    repositorio.retirar(xor)
+    verificar_indices(repositorio)
+    assert repositorio._por_par == {} and repositorio._por_par_ordenado == {}
+    assert repositorio.como_lista() == []
@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+
+import pytest
+
+pd = pytest.importorskip("pandas") # Vem com o Streamlit
+
+import tabela_relacoes
+from repositorio_relacoes import RepositorioRelacoes
+
+
+@pytest.fixture
+def relacoes():
+    repositorio = RepositorioRelacoes()
+    repositorio.adicionar("Pedir", "Aprovar", "DEP", resposta_ia="Sim", sua_validacao="Sim")
+    repositorio.adicionar("Aprovar", "Pagar", "XOR", resposta_ia="Não", sua_validacao="Não",
+                          observacao='Nota com "aspas", vírgula\ne quebra de linha')
+    repositorio.adicionar("Pagar", "Aprovar", "XOR", sua_validacao="Não", origem="inferido", justificativa=[1])
+    repositorio.adicionar("Pedir", "Pagar", "NÃO_UNI", sua_validacao="Apenas Pedir", origem="inferido",
+                          justificativa=[0, 1])
+    return repositorio
+
+
+def test_quadro_relacoes_usa_categorias(relacoes):
+    quadro = tabela_relacoes.quadro_relacoes(relacoes)
+    assert list(quadro.columns) == tabela_relacoes.COLUNAS
+    assert list(quadro["id"]) == [0, 1, 2, 3]
+    assert list(quadro["afo1"]) == ["Pedir", "Aprovar", "Pagar", "Pedir"]
+    assert list(quadro["afo2"]) == ["Aprovar", "Pagar", "Aprovar", "Pagar"]
+    assert isinstance(quadro["afo1"].dtype, pd.CategoricalDtype)
+    assert isinstance(quadro["tipo"].dtype, pd.CategoricalDtype)
+    assert list(quadro["justificativa"]) == ["", "", "#1", "#0, #1"]
+    assert tabela_relacoes.contagem_por_tipo(quadro).to_dict() == {"DEP": 1, "NÃO_UNI": 1, "XOR": 2}
+
+
+def test_quadro_de_repositorio_vazio():
+    quadro = tabela_relacoes.quadro_relacoes(RepositorioRelacoes())
+    assert list(quadro.columns) == tabela_relacoes.COLUNAS
+    assert len(quadro) == 0
+
+
+def test_filtrar_relacoes_por_tipo_e_afo(relacoes):
+    quadro = tabela_relacoes.quadro_relacoes(relacoes)
+    assert list(tabela_relacoes.filtrar_relacoes(quadro)["id"]) == [0, 1, 2, 3]
+    assert list(tabela_relacoes.filtrar_relacoes(quadro, tipos=["XOR"])["id"]) == [1, 2]
+    # A AFO vale nos dois lados da relação
+    assert list(tabela_relacoes.filtrar_relacoes(quadro, afos=["Pedir"])["id"]) == [0, 3]
+    assert list(tabela_relacoes.filtrar_relacoes(quadro, tipos=["XOR", "DEP"], afos=["Pedir"])["id"]) == [0]
+    assert list(tabela_relacoes.filtrar_relacoes(quadro, tipos=[], afos=[])["id"]) == [0, 1, 2, 3]
+
+
+def test_pagina(relacoes):
+    quadro = tabela_relacoes.quadro_relacoes(relacoes)
+    assert list(tabela_relacoes.pagina(quadro, 1, 3)["id"]) == [0, 1, 2]
+    assert list(tabela_relacoes.pagina(quadro, 2, 3)["id"]) == [3]
+    assert len(tabela_relacoes.pagina(quadro, 3, 3)) == 0
+
+
+def test_exportar_csv_em_trechos(relacoes):
+    trechos = list(tabela_relacoes.exportar_csv(relacoes, linhas_por_trecho=2))
+    assert len(trechos) == 3 # Duas relações por trecho, mais o que sobrou (vazio)
+    linhas = list(csv.reader(io.StringIO("".join(trechos))))
+    assert linhas[0] == tabela_relacoes.COLUNAS
+    assert linhas[2][tabela_relacoes.COLUNAS.index("observacao")] == 'Nota com "aspas", vírgula\ne quebra de linha'
+    assert [linha[tabela_relacoes.COLUNAS.index("justificativa")] for linha in linhas[1:]] == ["", "", "1", "0 1"]
+
+
+def test_exportar_jsonl(relacoes):
+    linhas = "".join(tabela_relacoes.exportar_jsonl(relacoes)).splitlines()
+    assert [json.loads(linha) for linha in linhas] == [
+        {coluna: relacao[coluna] for coluna in tabela_relacoes.COLUNAS} for relacao in relacoes
+    ]
+
+
+@pytest.mark.parametrize("vazio", [False, True])
+def test_exportar_json_e_um_objeto_valido(relacoes, vazio):
+    if vazio:
+        relacoes = RepositorioRelacoes()
+    inconsistencias = [{"tipo": "Ciclo de dependência", "descricao": 'Com "aspas"', "relacoes": [0, 1]}]
+    texto = "".join(tabela_relacoes.exportar_json(relacoes, "Compra", "Compras", ["Pedir", "Aprovar"],
+                                                  inconsistencias))
+    modelo = json.loads(texto)
+    assert list(modelo) == ["nome_processo", "dominio_processo", "afos", "relacoes", "inconsistencias"]
+    assert (modelo["nome_processo"], modelo["afos"]) == ("Compra", ["Pedir", "Aprovar"])
+    assert modelo["relacoes"] == [{coluna: relacao[coluna] for coluna in tabela_relacoes.COLUNAS}
+                                  for relacao in relacoes]
+    assert modelo["inconsistencias"] == inconsistencias
+
+
+def test_gravar_exportacao(relacoes, tmp_path):
+    caminho = tmp_path / "modelo.csv"
+    tabela_relacoes.gravar_exportacao(tabela_relacoes.exportar_csv(relacoes), str(caminho))
+    assert caminho.read_bytes().decode("utf-8") == "".join(tabela_relacoes.exportar_csv(relacoes))